@@ -0,0 +1,110 @@
+'''
+Benchmarks reconciliation against a local fake GitHub API.
+
+For each org size, builds an org in which the main team administers every
+repo and other teams have random permissions, writes an access config that
+differs from that state for a fraction of repos, and reports the wall time,
+number of requests and peak Python memory of reconciling it (the fake server
+runs in the same process, so its transient allocations are included):
+
+    python -m benchmarks.reconcile --sizes 100x10 1000x50 5000x300
+'''
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import github_access.github
+from tests.fake_github import PERMISSIONS, FakeGitHub, FakeOrg
+
+MAIN_TEAM = 'Main Team'
+
+
+def build_scenario(repo_count, team_count, teams_per_repo, drift, seed):
+    rng = random.Random(seed)
+    org = FakeOrg('bench-org')
+    main_team = org.add_team(MAIN_TEAM)
+    teams = [org.add_team(f'Team {i}') for i in range(team_count)]
+    names = {slug: team['name'] for slug, team in org.teams.items()}
+    access_config = {}
+    for i in range(repo_count):
+        repo = f'repo-{i:05}'
+        org.add_repo(repo)
+        org.grant(main_team, repo, 'admin')
+        desired = {
+            team: rng.choice(PERMISSIONS[:4])
+            for team in rng.sample(teams, min(teams_per_repo, team_count))
+        }
+        for team, permission in desired.items():
+            org.grant(team, repo, permission)
+        if rng.random() < drift:
+            team = rng.choice(list(desired))
+            desired[team] = rng.choice(PERMISSIONS[:4])
+        access_config[repo] = {
+            'teams': {names[team]: p for team, p in desired.items()}
+        }
+    return org, access_config
+
+
+def run_scenario(org, access_config, arguments):
+    errors = []
+    with FakeGitHub(org, latency=arguments.latency) as fake:
+        tracemalloc.start()
+        start = time.perf_counter()
+        app = github_access.github.App(
+            org.login, MAIN_TEAM, 'bench-token', errors.append,
+            concurrency=arguments.concurrency, graphql=arguments.graphql,
+            base_url=fake.url
+        )
+        app.run(access_config)
+        wall_time = time.perf_counter() - start
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        'wall_time': round(wall_time, 3),
+        'requests': fake.request_count,
+        'not_modified': fake.not_modified,
+        'requests_by_endpoint': {
+            f'{method} {route}': count
+            for (method, route), count in sorted(fake.requests.items())
+        },
+        'peak_memory': peak_memory,
+        'errors': len(errors),
+    }
+
+
+def parse_size(size):
+    repos, teams = size.split('x')
+    return int(repos), int(teams)
+
+
+def main(args):
+    argument_parser = argparse.ArgumentParser('benchmarks.reconcile')
+    argument_parser.add_argument(
+        '--sizes', nargs='+', default=['100x10', '1000x50'], type=parse_size,
+        help='org sizes as <repos>x<teams>'
+    )
+    argument_parser.add_argument('--teams-per-repo', type=int, default=3)
+    argument_parser.add_argument('--drift', type=float, default=0.01)
+    argument_parser.add_argument('--latency', type=float, default=0.0)
+    argument_parser.add_argument('--concurrency', type=int, default=1)
+    argument_parser.add_argument('--graphql', action='store_true')
+    argument_parser.add_argument('--seed', type=int, default=0)
+    arguments = argument_parser.parse_args(args)
+
+    results = []
+    for repo_count, team_count in arguments.sizes:
+        org, access_config = build_scenario(
+            repo_count, team_count, arguments.teams_per_repo,
+            arguments.drift, arguments.seed
+        )
+        result = run_scenario(org, access_config, arguments)
+        results.append(dict(repos=repo_count, teams=team_count, **result))
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,9 +1,8 @@
-import sys
+import importlib
 import logging
+import sys
 
-from . import github
-
-logging.basicConfig(level=logging.INFO)
+from .cli import parse_command
 
 failed = False
 
@@ -14,7 +13,14 @@ def handle_error(err):
     failed = True
 
 
-github.repo_access(sys.argv[1:], handle_error)
+# arguments (and any access file) are checked before the command, and so
+# PyGithub, is imported
+(module_name, function_name), arguments = parse_command(sys.argv[1:])
+logging.basicConfig(level=logging.INFO)
+command = getattr(
+    importlib.import_module(module_name, __package__), function_name
+)
+command(arguments, handle_error)
 
 if failed:
     print('error(s) were encountered - see above', file=sys.stderr)
@@ -0,0 +1,339 @@
+'''
+Streaming loader for access files.
+
+Access files are read a chunk at a time and validated as they are parsed, so
+errors are reported with the line and column they occur at. Each teams object
+and repos list is decoded whole by the json module; only when one is invalid
+is it scanned again, token by token, to find where the problem is.
+
+The result maps each repo name to its config, with one config object shared
+by every repo listed in a level (and by levels with identical team
+permissions), rather than a copy per repo. Repo selectors in a level's
+`match` list are kept with the result (see selection).
+'''
+import json
+import re
+import sys
+from json.decoder import scanstring
+
+from .selection import SELECTOR_KINDS, AccessConfig, selector_problem
+
+PERMISSIONS = frozenset(['pull', 'triage', 'push', 'maintain', 'admin'])
+
+CHUNK_SIZE = 1 << 16
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+DECODER = json.JSONDecoder()
+
+# what could still be part of a number decoded at the end of the text read
+NUMBER_TAIL = re.compile(r'[0-9.eE+-]*\Z')
+
+
+def unique_pairs(pairs):
+    # the pairs (which fail validation) if a key is repeated, as the json
+    # module would otherwise silently keep the last
+    teams = dict(pairs)
+    return teams if len(teams) == len(pairs) else pairs
+
+
+TEAMS_DECODER = json.JSONDecoder(object_pairs_hook=unique_pairs)
+
+
+class AccessReader:
+    '''
+    Reads the JSON tokens of an access file from a file object, keeping only
+    the unconsumed part of the file in memory.
+    '''
+
+    def __init__(self, f, path):
+        self.f = f
+        self.path = path
+        self.text = ''
+        self.pos = 0
+        self.start = 0
+        self.eof = False
+        # position of the start of self.text within the file
+        self.line = 1
+        self.column = 1
+
+    def fill(self):
+        # read at least as much again as is buffered, so that values much
+        # larger than a chunk are not decoded over and over
+        chunk = '' if self.eof else self.f.read(
+            max(CHUNK_SIZE, len(self.text) - self.start)
+        )
+        self.eof = not chunk
+        if chunk:
+            self.discard()
+            self.text += chunk
+        return bool(chunk)
+
+    def discard(self):
+        # keep the current token, so that errors can still point at it
+        consumed = self.text[:self.start]
+        newlines = consumed.count('\n')
+        self.line += newlines
+        if newlines:
+            self.column = 1
+        self.column += len(consumed) - consumed.rfind('\n') - 1
+        self.text = self.text[self.start:]
+        self.pos -= self.start
+        self.start = 0
+
+    def peek(self):
+        while True:
+            self.pos = WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text) or not self.fill():
+                self.start = self.pos
+                return self.text[self.pos:self.pos + 1]
+
+    def expect(self, chars, description):
+        char = self.peek()
+        if not char or char not in chars:
+            self.error(f'expected {description}')
+        self.pos += 1
+        return char
+
+    def items(self, close, description):
+        '''
+        Yields once per item of an array or object whose opening bracket has
+        been read, consuming the separators and the closing bracket.
+        '''
+        if self.peek() == close:
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.expect(',' + close, description) == close:
+                return
+
+    def string(self, description='a string'):
+        self.expect('"', description)
+        value, self.pos = self.decode(lambda: scanstring(self.text, self.pos))
+        return sys.intern(value)
+
+    def value(self, decoder=DECODER):
+        self.peek()
+        while True:
+            value, end = self.decode(
+                lambda: decoder.raw_decode(self.text, self.pos)
+            )
+            # a number cut off by the end of a chunk still decodes, so it is
+            # decoded again with more of the file
+            if not NUMBER_TAIL.match(self.text, end) or not self.fill():
+                self.pos = end
+                return value
+
+    def rewind(self):
+        # back to the start of the value just read
+        self.pos = self.start
+
+    def decode(self, fn):
+        # a token may be cut off at the end of the text read so far
+        while True:
+            try:
+                return fn()
+            except json.JSONDecodeError as e:
+                self.fill_or_raise(e)
+
+    def fill_or_raise(self, e):
+        if not self.fill():
+            self.error(e.msg, e.pos)
+
+    def error(self, message, pos=None):
+        pos = self.start if pos is None else pos
+        newline = self.text.rfind('\n', 0, pos)
+        line = self.line + self.text.count('\n', 0, pos)
+        column = pos - newline if newline >= 0 else self.column + pos
+        raise Exception(f'{self.path}:{line}:{column}: {message}')
+
+
+class AccessIndex:
+    '''
+    Builds the repo to config mapping, checking for repos listed twice and
+    sharing one config between levels with the same team permissions.
+    '''
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.configs = {}
+        self.repos = AccessConfig()
+
+    def reserve(self, name):
+        if name in self.repos:
+            self.reader.error(f'repo {name} listed twice')
+        self.repos[name] = None
+        return name
+
+    def can_reserve(self, names):
+        return isinstance(names, list) and \
+            all(isinstance(name, str) for name in names) and \
+            len(set(names)) == len(names) and \
+            self.repos.keys().isdisjoint(names)
+
+    def reserve_all(self, names):
+        self.repos.update(dict.fromkeys(names))
+        return names
+
+    def add(self, names, teams, selectors=()):
+        config = self.configs.setdefault(
+            frozenset(teams.items()), {'teams': teams}
+        )
+        for name in names:
+            self.repos[name] = config
+        for selector in selectors:
+            self.repos.matcher.add(selector, config)
+
+
+def read_access_config(f, main_team, path='access file'):
+    reader = AccessReader(f, path)
+    index = AccessIndex(reader)
+    close, read_item, description = FORMATS[
+        reader.expect('[{', 'a list of levels')
+    ]
+    for _ in reader.items(close, description):
+        read_item(reader, main_team, index)
+    if reader.peek():
+        reader.error('unexpected content after access config')
+    index.repos.matcher.compile()
+    return index.repos
+
+
+def load_access_config(path, main_team):
+    with open(path, 'r') as f:
+        return read_access_config(f, main_team, path)
+
+
+def read_level(reader, main_team, index):
+    reader.expect('{', 'a level object')
+    fields = {}
+    for _ in reader.items('}', "',' or '}' in level"):
+        key = reader.string('a level key')
+        reader.expect(':', "':'")
+        fields[key] = LEVEL_FIELDS.get(key, skip)(reader, main_team, index)
+    if fields.get('teams') is None:
+        reader.error('level has no teams')
+    if fields.get('repos') is None and fields.get('match') is None:
+        reader.error('level has no repos')
+    index.add(
+        fields.get('repos') or [], fields['teams'], fields.get('match') or []
+    )
+
+
+def read_repo(reader, main_team, index):
+    # the deprecated format, mapping each repo name to its config
+    name = index.reserve(reader.string('a repo name'))
+    reader.expect(':', "':'")
+    reader.expect('{', 'a repo object')
+    fields = {}
+    for _ in reader.items('}', "',' or '}' in repo"):
+        key = reader.string('a repo key')
+        reader.expect(':', "':'")
+        read = read_teams if key == 'teams' else skip
+        fields[key] = read(reader, main_team, index)
+    if fields.get('teams') is None:
+        reader.error(f'repo {name} has no teams')
+    index.add([name], fields['teams'])
+
+
+def read_teams(reader, main_team, index):
+    teams = reader.value(TEAMS_DECODER)
+    if not valid_teams(teams, main_team):
+        reader.rewind()
+        scan_teams(reader, main_team)
+        teams = dict(teams)
+    return {
+        sys.intern(team): sys.intern(permission)
+        for team, permission in teams.items()
+    }
+
+
+def valid_teams(teams, main_team):
+    return isinstance(teams, dict) and main_team not in teams and all(
+        isinstance(permission, str) and permission in PERMISSIONS
+        for permission in teams.values()
+    )
+
+
+def scan_teams(reader, main_team):
+    reader.expect('{', 'an object of team permissions')
+    permissions = {}
+    for _ in reader.items('}', "',' or '}' in teams"):
+        team = reader.string('a team name')
+        if team == main_team:
+            reader.error(f'team {team} should not be listed - this is implied')
+        reader.expect(':', "':'")
+        permission = scan_permission(reader, team)
+        if permissions.setdefault(team, permission) != permission:
+            reader.error(
+                f'team {team} listed twice, with {permissions[team]} and '
+                f'{permission} permission'
+            )
+
+
+def scan_permission(reader, team):
+    permission = reader.string('a permission')
+    if permission not in PERMISSIONS:
+        reader.error(f'unknown permission {permission} for team {team}')
+    return permission
+
+
+def read_repos(reader, main_team, index):
+    repos = reader.value()
+    if not index.can_reserve(repos):
+        reader.rewind()
+        scan_repos(reader, index)
+    return index.reserve_all(repos)
+
+
+def scan_repos(reader, index):
+    reader.expect('[', 'a list of repos')
+    for _ in reader.items(']', "',' or ']' in repos"):
+        index.reserve(reader.string('a repo name'))
+
+
+def read_match(reader, main_team, index):
+    selectors = reader.value()
+    if not valid_selectors(selectors):
+        reader.rewind()
+        scan_selectors(reader)
+    return selectors
+
+
+def valid_selectors(selectors):
+    return isinstance(selectors, list) and all(
+        isinstance(selector, dict) and len(selector) == 1 and
+        selector_problem(*next(iter(selector.items()))) is None
+        for selector in selectors
+    )
+
+
+def scan_selectors(reader):
+    reader.expect('[', 'a list of selectors')
+    for _ in reader.items(']', "',' or ']' in match"):
+        reader.expect('{', 'a selector object')
+        kind = reader.string('a selector kind')
+        if kind not in SELECTOR_KINDS:
+            reader.error(selector_problem(kind, None))
+        reader.expect(':', "':'")
+        value = reader.string(f'a {kind} pattern')
+        problem = selector_problem(kind, value)
+        if problem is not None:
+            reader.error(problem)
+        reader.expect('}', "'}' after selector")
+
+
+def skip(reader, main_team, index):
+    reader.value()
+    return ()
+
+
+LEVEL_FIELDS = {
+    'teams': read_teams, 'repos': read_repos, 'match': read_match,
+}
+
+FORMATS = {
+    '[': (']', read_level, "',' or ']' after level"),
+    '{': ('}', read_repo, "',' or '}' after repo"),
+}
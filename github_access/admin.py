@@ -0,0 +1,117 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from github import Consts, GithubException
+
+from .credentials import credentials_budget, load_credentials
+from .github import create_github
+from .loaders import team_repo_permissions
+from .metrics import Metrics
+from .ratelimit import RateLimitScheduler
+from .teams import set_repo_permission
+
+PROGRESS_INTERVAL = 50
+
+
+class AdminGrants:
+    '''
+    Grants a team admin access to a list of repos.
+
+    The team's current repos are listed up front (one request per 100 repos,
+    each retried on its own) so that repos it already administers are
+    skipped, and the remaining grants are made on `concurrency` threads
+    through the scheduler, which paces them and retries on rate limits.
+    '''
+
+    def __init__(
+        self, github, team, org_name, scheduler, on_error, concurrency=1
+    ):
+        self.github = github
+        self.team = team
+        self.org_name = org_name
+        self.scheduler = scheduler
+        self.on_error = on_error
+        self.concurrency = concurrency
+
+    def run(self, repo_names):
+        existing = self.admin_repo_names()
+        pending = [name for name in repo_names if name not in existing]
+        logging.info(
+            f'team {self.team.name} already has admin access to '
+            f'{len(repo_names) - len(pending)} of {len(repo_names)} repos'
+        )
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            errors = list(self.progress(
+                executor.map(self.grant, pending), len(pending)
+            ))
+        summary = {
+            'granted': errors.count(None),
+            'unchanged': len(repo_names) - len(pending),
+            'failed': len(errors) - errors.count(None),
+        }
+        logging.info(
+            '{granted} granted, {unchanged} unchanged, {failed} failed'.format(
+                **summary
+            )
+        )
+        return summary
+
+    def admin_repo_names(self):
+        return {
+            name for name, permission in team_repo_permissions(
+                self.github, self.team, self.scheduler
+            )
+            if permission == 'admin'
+        }
+
+    def grant(self, repo_name):
+        try:
+            self.scheduler.call_write(
+                set_repo_permission, self.team,
+                f'{self.org_name}/{repo_name}', 'admin'
+            )
+        except GithubException as e:
+            return f'failed to grant admin access to repo {repo_name}: {e}'
+
+    def progress(self, errors, total):
+        # errors are reported in repo order, as results are yielded in order
+        for done, error in enumerate(errors, 1):
+            if error is not None:
+                self.on_error(error)
+            if done % PROGRESS_INTERVAL == 0 or done == total:
+                logging.info(f'processed {done} of {total} grants')
+            yield error
+
+
+def access_repo_names(access_config, path):
+    '''
+    The repos listed by name in an access config. Repos a level matches are
+    not known without listing the org's repos, so selectors are rejected.
+    '''
+    if access_config.matcher.rules:
+        raise Exception(
+            f'{path}: grant-admin needs every repo listed by name, '
+            'not matched by a selector'
+        )
+    return list(access_config)
+
+
+def grant_admin(arguments, handle_error):
+    repo_names = access_repo_names(arguments.access_config, arguments.access)
+
+    base_url = os.environ.get('GITHUB_API_URL', Consts.DEFAULT_BASE_URL)
+    credentials = load_credentials(os.environ, arguments.org, base_url)
+    github = create_github(
+        credentials, arguments.concurrency, None, base_url, Metrics()
+    )
+    scheduler = RateLimitScheduler(
+        credentials_budget(credentials, github),
+        write_interval=arguments.write_interval
+    )
+    org = github.get_organization(arguments.org)
+    team = scheduler.call(org.get_team_by_slug, arguments.team_slug)
+    AdminGrants(
+        github, team, arguments.org, scheduler, handle_error,
+        arguments.concurrency
+    ).run(repo_names)
@@ -0,0 +1,152 @@
+'''
+An asyncio engine for the per-repo team reads and the permission changes of
+a run, as an alternative to making them through PyGithub on threads.
+
+Requests share one keep-alive HTTP/2 client (httpx, imported only when the
+engine is used), at most `max_in_flight` are in flight at once, and they
+are paced and retried by the same RateLimitScheduler as PyGithub calls.
+'''
+import asyncio
+import time
+from urllib.parse import quote
+
+from github import RateLimitExceededException
+from github.Requester import Requester
+
+from .credentials import as_auth, credentials_observer
+from .loaders import REPO_PAGE_SIZE, TeamPermission, next_link
+
+ACCEPT = 'application/vnd.github.v3+json'
+
+
+class AsyncEngine:
+
+    def __init__(
+        self, base_url, credentials, scheduler, metrics, max_in_flight,
+        client_factory=None
+    ):
+        self.base_url = base_url
+        self.auth = as_auth(credentials)
+        # a TokenPool tracks the budget of each of its credentials itself
+        self.pool = credentials_observer(credentials)
+        self.scheduler = scheduler
+        self.metrics = metrics
+        self.max_in_flight = max_in_flight
+        self.client_factory = client_factory or httpx_client
+        self.observed_budget = None
+
+    def run(self, coroutines):
+        '''
+        Runs the coroutines made by calling `coroutines` to completion in a
+        new event loop, returning their results in order.
+        '''
+        return asyncio.run(self.gather(coroutines))
+
+    async def gather(self, coroutines):
+        client = self.client_factory(
+            self.base_url, {
+                'Accept': ACCEPT,
+                'User-Agent': 'github-access',
+            }, self.max_in_flight
+        )
+        async with client:
+            self.client = client
+            self.in_flight = asyncio.Semaphore(self.max_in_flight)
+            return await asyncio.gather(*coroutines())
+
+    def budget(self, read_budget):
+        '''
+        Wraps a scheduler's read_budget so that it uses the budget reported
+        by this engine's responses once there are any, as they are the most
+        recent.
+        '''
+        return lambda: self.observed_budget or read_budget()
+
+    async def team_permissions(self, repo_full_name):
+        url = f'/repos/{repo_full_name}/teams?per_page={REPO_PAGE_SIZE}'
+        teams = []
+        while url is not None:
+            headers, page = await self.request('GET', url)
+            teams += [
+                TeamPermission(team['name'], team['permission'])
+                for team in page
+            ]
+            url = next_link(headers)
+        return teams
+
+    async def set_team_permission(self, org, team_slug, repo, permission):
+        await self.request(
+            'PUT', team_repo_path(org, team_slug, repo),
+            {'permission': permission}
+        )
+
+    async def remove_team(self, org, team_slug, repo):
+        await self.request('DELETE', team_repo_path(org, team_slug, repo))
+
+    async def request(self, method, url, body=None):
+        return await self.scheduler.call_async(
+            self.send, method, url, body, write=method != 'GET'
+        )
+
+    async def send(self, method, url, body):
+        # per request, as a pool's credential depends on its budgets, and an
+        # App installation's token expires
+        request_headers = {}
+        self.auth.authentication(request_headers)
+        async with self.in_flight:
+            start = time.perf_counter()
+            response = await self.client.request(
+                method, url, json=body, headers=request_headers
+            )
+            duration = time.perf_counter() - start
+        headers = {
+            name.lower(): value for name, value in response.headers.items()
+        }
+        self.observe(request_headers, headers)
+        if self.metrics is not None:
+            self.metrics.record_request(
+                method, url, response.status_code, duration, headers
+            )
+        data = response.json() if response.content else None
+        if response.status_code >= 400:
+            raise github_exception(response.status_code, data, headers)
+        return headers, data
+
+    def observe(self, request_headers, headers):
+        if self.pool is not None:
+            self.pool.observe(request_headers, headers)
+        elif 'x-ratelimit-remaining' in headers:
+            self.observed_budget = (
+                int(headers['x-ratelimit-remaining']),
+                int(headers['x-ratelimit-reset']),
+            )
+
+
+def team_repo_path(org, team_slug, repo):
+    return f'/orgs/{org}/teams/{quote(team_slug)}/repos/{org}/{repo}'
+
+
+def github_exception(status, data, headers):
+    # the same exceptions PyGithub raises, so that errors are handled and
+    # reported in the same way
+    if status in (403, 429) and headers.get('x-ratelimit-remaining') == '0':
+        return RateLimitExceededException(status, data, headers)
+    return Requester.createException(status, headers, data)
+
+
+def httpx_client(base_url, headers, max_in_flight):
+    try:
+        import httpx
+        return httpx.AsyncClient(
+            base_url=base_url, headers=headers, http2=True,
+            timeout=httpx.Timeout(15.0),
+            limits=httpx.Limits(
+                max_connections=max_in_flight,
+                max_keepalive_connections=max_in_flight
+            )
+        )
+    except ImportError:
+        raise Exception(
+            "--asyncio needs httpx with HTTP/2 support, install it with: "
+            "pip install 'httpx[http2]'"
+        )
@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import time
+
+from .plan import change_from_json, change_json
+
+# Progress is saved at most this often (and when a run stops), so that a
+# large run is not slowed down by rewriting the file after every repo.
+SAVE_INTERVAL = 5.0
+
+
+class Checkpoint:
+    '''
+    The progress of a run, saved to a file so that a run which stops part way
+    through can be resumed.
+
+    While planning, it records the changes planned for each repo that was
+    reconciled without errors, so that resuming does not read those repos
+    again. Once planning is complete, it records the changes still to be
+    made and the errors reported so far. A resumed run then makes the
+    remaining changes without planning again, and reports those errors
+    again.
+
+    A checkpoint without a path keeps its progress in memory only.
+    '''
+
+    def __init__(self, path=None, key=None, clock=time.monotonic):
+        self.path = path
+        self.key = key
+        self.clock = clock
+        self.last_save = clock()
+        self.repos = {}
+        self.pending = None
+        self.errors = []
+        self.reported = []
+
+    @classmethod
+    def load(cls, path, key):
+        checkpoint = cls(path, key)
+        if not os.path.exists(path):
+            return checkpoint
+        with open(path, 'r') as f:
+            data = json.loads(f.read())
+        if data['key'] != key:
+            logging.warning(
+                f'checkpoint {path} is for a different org, team or access '
+                'config - starting again'
+            )
+            return checkpoint
+        checkpoint.restore(data)
+        return checkpoint
+
+    def restore(self, data):
+        self.repos = {
+            name: [change_from_json(change) for change in changes]
+            for name, changes in data['repos'].items()
+        }
+        if data['pending'] is not None:
+            self.pending = dict.fromkeys(
+                change_from_json(change) for change in data['pending']
+            )
+        self.errors = data['errors']
+        logging.info(
+            f'resuming from checkpoint {self.path}: {len(self.repos)} repos '
+            f'planned, {len(self.pending or ())} changes to make'
+        )
+
+    def reporting(self, on_error):
+        '''
+        Wraps an error handler so that errors reported are recorded, first
+        reporting the errors recorded before resuming.
+        '''
+        def report(message):
+            self.reported.append(message)
+            on_error(message)
+        for message in self.errors:
+            report(message)
+        return report
+
+    def has_repo(self, repo_name):
+        return repo_name in self.repos
+
+    def add_repo(self, repo_name, changes, succeeded):
+        if succeeded:
+            self.repos[repo_name] = changes
+            self.autosave()
+
+    def start_changes(self, changes):
+        self.pending = dict.fromkeys(changes)
+        self.repos = {}
+        self.save()
+
+    def changed(self, change):
+        self.pending.pop(change, None)
+        self.autosave()
+
+    def finish(self):
+        # changes that failed are kept, to be retried by resuming
+        if self.pending:
+            return
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+    def autosave(self):
+        if self.clock() - self.last_save >= SAVE_INTERVAL:
+            self.save()
+
+    def save(self):
+        self.last_save = self.clock()
+        if self.path is None:
+            return
+        # written to a temporary file first so that a run stopped mid-write
+        # does not leave a truncated checkpoint
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump({
+                'key': self.key,
+                'repos': {
+                    name: [change_json(change) for change in changes]
+                    for name, changes in self.repos.items()
+                },
+                'pending': None if self.pending is None else [
+                    change_json(change) for change in self.pending
+                ],
+                'errors': [] if self.pending is None else self.reported,
+            }, f)
+        os.replace(self.path + '.tmp', self.path)
@@ -0,0 +1,210 @@
+'''
+Command line parsing for every command.
+
+This is kept apart from the commands, and imports nothing from them, so
+that `python -m github_access` can reject bad arguments (or print --help),
+or a bad access file, without first importing PyGithub and requests.
+'''
+import argparse
+
+from .access import load_access_config
+from .shard import parse_shard
+
+SWEEP_INTERVAL = 3600.0
+
+
+def add_access_arguments(argument_parser):
+    argument_parser.add_argument('--org', required=True)
+    argument_parser.add_argument('--team', required=True)
+    argument_parser.add_argument('--access', required=True)
+    add_client_arguments(argument_parser)
+    add_engine_arguments(argument_parser)
+    add_shard_arguments(argument_parser)
+    add_permission_arguments(argument_parser)
+
+
+def add_client_arguments(argument_parser):
+    argument_parser.add_argument('--concurrency', type=int, default=1)
+    argument_parser.add_argument('--graphql', action='store_true')
+    argument_parser.add_argument('--cache-dir')
+    argument_parser.add_argument('--metrics')
+    argument_parser.add_argument('--metrics-prometheus')
+
+
+def add_engine_arguments(argument_parser):
+    argument_parser.add_argument('--asyncio', action='store_true')
+    argument_parser.add_argument('--write-concurrency', type=int, default=1)
+    add_write_interval_argument(argument_parser)
+
+
+def add_write_interval_argument(argument_parser):
+    argument_parser.add_argument('--write-interval', type=float, default=1.0)
+
+
+def add_permission_arguments(argument_parser):
+    argument_parser.add_argument('--team-hierarchy', action='store_true')
+    argument_parser.add_argument(
+        '--reads', choices=['repo', 'team', 'auto'], default='repo'
+    )
+
+
+def add_shard_arguments(argument_parser):
+    argument_parser.add_argument('--shard', type=shard)
+
+
+def shard(value):
+    try:
+        parsed = parse_shard(value)
+    except ValueError:
+        parsed = None
+    if parsed is None or not 1 <= parsed.index <= parsed.count:
+        raise argparse.ArgumentTypeError(
+            f'invalid shard {value} - expected i/N, with i from 1 to N'
+        )
+    return parsed
+
+
+def add_snapshot_arguments(argument_parser):
+    argument_parser.add_argument('--snapshot')
+    argument_parser.add_argument('--full', action='store_true')
+
+
+def add_checkpoint_arguments(argument_parser):
+    argument_parser.add_argument('--checkpoint')
+    argument_parser.add_argument('--resume', action='store_true')
+
+
+def parse_repo_access(args):
+    argument_parser = argparse.ArgumentParser('github_access')
+    add_access_arguments(argument_parser)
+    add_snapshot_arguments(argument_parser)
+    add_checkpoint_arguments(argument_parser)
+    argument_parser.add_argument('--result')
+
+    arguments = argument_parser.parse_args(args)
+    if arguments.resume and arguments.checkpoint is None:
+        argument_parser.error('--resume needs --checkpoint')
+    return arguments
+
+
+def parse_plan(args):
+    argument_parser = argparse.ArgumentParser('github_access plan')
+    add_access_arguments(argument_parser)
+    argument_parser.add_argument('--out', required=True)
+    return argument_parser.parse_args(args)
+
+
+def parse_apply(args):
+    argument_parser = argparse.ArgumentParser('github_access apply')
+    argument_parser.add_argument('--plan', required=True)
+    add_engine_arguments(argument_parser)
+    return argument_parser.parse_args(args)
+
+
+def parse_batch(args):
+    argument_parser = argparse.ArgumentParser('github_access batch')
+    argument_parser.add_argument('--manifest', required=True)
+    add_client_arguments(argument_parser)
+    add_engine_arguments(argument_parser)
+    add_shard_arguments(argument_parser)
+    add_permission_arguments(argument_parser)
+    return argument_parser.parse_args(args)
+
+
+def parse_grant_admin(args):
+    argument_parser = argparse.ArgumentParser('github_access grant-admin')
+    argument_parser.add_argument('--org', required=True)
+    argument_parser.add_argument('--team-slug', required=True)
+    argument_parser.add_argument('--access', required=True)
+    argument_parser.add_argument('--concurrency', type=int, default=4)
+    add_write_interval_argument(argument_parser)
+    return argument_parser.parse_args(args)
+
+
+def parse_report(args):
+    argument_parser = argparse.ArgumentParser('github_access report')
+    argument_parser.add_argument('--org', required=True)
+    argument_parser.add_argument('--team')
+    argument_parser.add_argument('--access')
+    argument_parser.add_argument(
+        '--format', choices=['csv', 'json'], default='csv'
+    )
+    argument_parser.add_argument('--out')
+    add_client_arguments(argument_parser)
+
+    arguments = argument_parser.parse_args(args)
+    if arguments.access is not None and arguments.team is None:
+        argument_parser.error('--team is required with --access')
+    return arguments
+
+
+def parse_serve(args):
+    argument_parser = argparse.ArgumentParser('github_access serve')
+    add_access_arguments(argument_parser)
+    argument_parser.add_argument('--host', default='127.0.0.1')
+    argument_parser.add_argument('--port', type=int, default=8080)
+    argument_parser.add_argument(
+        '--sweep-interval', type=float, default=SWEEP_INTERVAL
+    )
+    return argument_parser.parse_args(args)
+
+
+def parse_validate(args):
+    argument_parser = argparse.ArgumentParser('github_access validate')
+    argument_parser.add_argument('access', nargs='+')
+    argument_parser.add_argument('--team')
+    argument_parser.add_argument('--org')
+    argument_parser.add_argument('--teams-cache')
+    argument_parser.add_argument('--concurrency', type=int, default=1)
+
+    arguments = argument_parser.parse_args(args)
+    if arguments.teams_cache is not None and arguments.org is None:
+        argument_parser.error('--org is required with --teams-cache')
+    return arguments
+
+
+def parse_merge(args):
+    argument_parser = argparse.ArgumentParser('github_access merge')
+    argument_parser.add_argument('results', nargs='+')
+    argument_parser.add_argument('--out')
+    return argument_parser.parse_args(args)
+
+
+# The function run for each command, as (module, name), and the function
+# parsing its arguments. The module is only imported once they are parsed.
+COMMANDS = {
+    None: (('.github', 'repo_access'), parse_repo_access),
+    'plan': (('.github', 'plan'), parse_plan),
+    'apply': (('.github', 'apply'), parse_apply),
+    'batch': (('.github', 'batch'), parse_batch),
+    'grant-admin': (('.admin', 'grant_admin'), parse_grant_admin),
+    'report': (('.report', 'report'), parse_report),
+    'serve': (('.serve', 'serve'), parse_serve),
+    'validate': (('.validate', 'validate'), parse_validate),
+    'merge': (('.shard', 'merge'), parse_merge),
+}
+
+# The commands taking an access file, which is read with the command line.
+READS_ACCESS = frozenset([None, 'plan', 'grant-admin', 'report', 'serve'])
+
+
+def parse_command(args):
+    '''
+    Returns the (module, name) of the function to run for the command
+    line, and its parsed arguments, with the config from its access file
+    (if it takes one) as `access_config`. Without a known command as the
+    first argument, the arguments are for a normal run.
+    '''
+    command = args[0] if args and args[0] in COMMANDS else None
+    function, parse = COMMANDS[command]
+    arguments = parse(args if command is None else args[1:])
+    if command in READS_ACCESS:
+        read_access_file(arguments)
+    return function, arguments
+
+
+def read_access_file(arguments):
+    # grant-admin has no main team, and report's access file is optional
+    arguments.access_config = arguments.access and load_access_config(
+        arguments.access, getattr(arguments, 'team', None)
+    )
@@ -0,0 +1,164 @@
+'''
+The credentials requests are made with: one or more personal access tokens,
+and optionally a GitHub App installation, whose tokens are created and
+refreshed as needed and get a higher rate limit.
+'''
+import threading
+
+from github import Auth, GithubIntegration
+from github.Requester import WithRequester
+
+from .ratelimit import github_budget
+
+# The rate limit of a personal access token, per hour.
+FULL_BUDGET = 5000
+
+
+class TokenPool(Auth.Auth, WithRequester):
+    '''
+    Spreads requests over several credentials, each with its own rate limit
+    budget.
+
+    Each request is made with the credential with the most of its budget
+    remaining, as last reported by GitHub (see observe). budget() is the
+    budget of that credential, so requests are only slowed down once every
+    credential runs low.
+    '''
+
+    def __init__(self, credentials):
+        super().__init__()
+        self.credentials = credentials
+        # a credential not used yet is assumed to have a full budget
+        self.budgets = [(FULL_BUDGET, 0)] * len(credentials)
+        # the credential each Authorization header sent came from
+        self.issued = {}
+        self.lock = threading.Lock()
+
+    def withRequester(self, requester):
+        super().withRequester(requester)
+        for credential in self.credentials:
+            if isinstance(credential, WithRequester):
+                credential.withRequester(requester)
+        return self
+
+    @property
+    def token_type(self):
+        return self.credentials[self.best()].token_type
+
+    @property
+    def token(self):
+        return self.credentials[self.best()].token
+
+    @property
+    def _masked_token(self):
+        return '(token pool)'
+
+    def authentication(self, headers):
+        index = self.best()
+        self.credentials[index].authentication(headers)
+        with self.lock:
+            self.issued[headers['Authorization']] = index
+
+    def best(self):
+        with self.lock:
+            return max(
+                range(len(self.credentials)),
+                key=lambda i: (self.budgets[i][0], -i)
+            )
+
+    def observe(self, request_headers, response_headers):
+        # only the core REST budget; GraphQL and search have their own
+        if response_headers.get('x-ratelimit-resource', 'core') != 'core' \
+                or 'x-ratelimit-remaining' not in response_headers:
+            return
+        with self.lock:
+            index = self.issued.get(request_headers.get('Authorization'))
+            if index is not None:
+                self.budgets[index] = (
+                    int(response_headers['x-ratelimit-remaining']),
+                    int(response_headers['x-ratelimit-reset']),
+                )
+
+    def budget(self):
+        return self.budgets[self.best()]
+
+    def identity(self, authorization):
+        with self.lock:
+            index = self.issued.get(authorization)
+        if index is None:
+            return authorization
+        return credential_identity(self.credentials[index], authorization)
+
+
+def load_credentials(environ, org_name, base_url):
+    '''
+    The credentials configured in the environment: each token in
+    GITHUB_TOKEN (separated by commas), and a GitHub App installation when
+    GITHUB_APP_ID and GITHUB_APP_PRIVATE_KEY_FILE are set. Several
+    credentials are returned as a TokenPool.
+    '''
+    credentials = [
+        token.strip() for token in environ.get('GITHUB_TOKEN', '').split(',')
+        if token.strip()
+    ] + app_credentials(environ, org_name, base_url)
+    if not credentials:
+        raise Exception(
+            'GITHUB_TOKEN, or GITHUB_APP_ID and GITHUB_APP_PRIVATE_KEY_FILE, '
+            'must be set'
+        )
+    if len(credentials) == 1:
+        return credentials[0]
+    return TokenPool([as_auth(credential) for credential in credentials])
+
+
+def app_credentials(environ, org_name, base_url):
+    if 'GITHUB_APP_ID' not in environ:
+        return []
+    with open(environ['GITHUB_APP_PRIVATE_KEY_FILE'], 'r') as f:
+        app_auth = Auth.AppAuth(environ['GITHUB_APP_ID'], f.read())
+    installation_id = environ.get('GITHUB_APP_INSTALLATION_ID')
+    if installation_id is None:
+        installation_id = GithubIntegration(
+            auth=app_auth, base_url=base_url
+        ).get_org_installation(org_name).id
+    return [app_auth.get_installation_auth(int(installation_id))]
+
+
+def credentials_budget(credentials, github):
+    '''
+    A read_budget for a RateLimitScheduler pacing requests made with the
+    credentials through the Github client.
+    '''
+    if isinstance(credentials, TokenPool):
+        return credentials.budget
+    return github_budget(github)
+
+
+def credentials_observer(credentials):
+    return credentials if isinstance(credentials, TokenPool) else None
+
+
+def credentials_identity(credentials):
+    '''
+    Maps the Authorization header of a request made with the credentials to
+    what identifies the credential between runs, e.g. for caching responses.
+    '''
+    if isinstance(credentials, TokenPool):
+        return credentials.identity
+    return lambda authorization: credential_identity(
+        credentials, authorization
+    )
+
+
+def credential_identity(credential, authorization):
+    # an installation's tokens are replaced every hour, but its id is not
+    if isinstance(credential, Auth.AppInstallationAuth):
+        return f'installation {credential.installation_id}'
+    return authorization
+
+
+def as_auth(credentials):
+    # a plain string is a personal access token
+    if isinstance(credentials, Auth.Auth):
+        return credentials
+    return Auth.Token(credentials)
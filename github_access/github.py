@@ -1,109 +1,574 @@
-import argparse
+import asyncio
+import copy
+import hashlib
 import json
 import logging
 import os
-import time
+import signal
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
-from github import Github
+from github import (
+    Consts, Github, GithubException, UnknownObjectException
+)
+
+from .access import load_access_config
+from .aio import AsyncEngine
+from .checkpoint import Checkpoint
+from .credentials import (
+    as_auth, credentials_budget, credentials_identity, credentials_observer,
+    load_credentials
+)
+from .hierarchy import NO_INHERITANCE, at_most
+from .http_cache import HttpCache, github_connections
+from .loaders import (
+    GraphQLStateLoader, PermissionCache, RestStateLoader, team_permissions
+)
+from .metrics import Metrics
+from .mutations import MutationQueue
+from .plan import Change, Plan, read_plan, write_plan
+from .ratelimit import RateLimitScheduler
+from .selection import config_json, may_select, repo_config
+from .shard import write_result
+from .snapshot import Snapshot
+from .team_cache import TeamCache
+from .teams import TeamDirectory, set_repo_permission
+
+
+BatchEntry = namedtuple('BatchEntry', ['org', 'team', 'access_config'])
 
 
 class App:
-    def __init__(self, org_name, main_team_name, github_token, on_error):
-        self.on_error = on_error
-        # Need the github token to call /user/installations
-        # as PyGithub does not implement it.
-        # Check https://github.com/PyGithub/PyGithub/issues/828 for latest
-        self.github_token = github_token
-
-        self.github = Github(github_token)
+    def __init__(
+        self, org_name, main_team_name, credentials, on_error, concurrency=1,
+        graphql=False, cache_dir=None, base_url=Consts.DEFAULT_BASE_URL,
+        use_asyncio=False, write_concurrency=1, write_interval=1.0,
+        shard=None, team_hierarchy=False, reads='repo'
+    ):
+        self.report_error = on_error
+        self.error_count = 0
+        self.concurrency = concurrency
+        self.write_concurrency = write_concurrency
+        self.shard = shard
+        self.graphql = graphql
+        self.team_hierarchy = team_hierarchy
+        self.reads = reads
+
+        self.metrics = Metrics()
+        self.github = create_github(
+            credentials, concurrency, cache_dir, base_url, self.metrics
+        )
+        self.team_cache = None
+        if cache_dir is not None:
+            self.team_cache = TeamCache(os.path.join(cache_dir, 'teams.json'))
+        self.scheduler = RateLimitScheduler(
+            credentials_budget(credentials, self.github),
+            write_interval=write_interval
+        )
+        self.engine = None
+        if use_asyncio:
+            self.engine = AsyncEngine(
+                base_url, credentials, self.scheduler, self.metrics,
+                max_in_flight=concurrency
+            )
+            self.scheduler.read_budget = self.engine.budget(
+                self.scheduler.read_budget
+            )
+        self.load_org(org_name)
+        self.set_main_team(main_team_name)
+
+    def load_org(self, org_name):
+        self.org_name = org_name
         self.org = self.github.get_organization(org_name)
-        self.teams = {
-            team.name: team
-            for team
-            in self.org.get_teams()
-        }
-        self.main_team = self.teams[main_team_name]
+        self.teams = TeamDirectory(
+            self.github, self.org, self.scheduler, self.metrics,
+            self.team_cache
+        )
+        self.permission_cache = PermissionCache()
+        self.hierarchy = None
 
-    def run(self, access_config):
+    def set_main_team(self, main_team_name):
+        self.main_team = self.teams.get(main_team_name)
+        if self.main_team is None:
+            raise Exception(
+                f'team {main_team_name} not found in org {self.org_name}'
+            )
+        if self.graphql:
+            self.loader = GraphQLStateLoader(
+                self.github, self.org_name, self.main_team, self.scheduler,
+                self.permission_cache
+            )
+        else:
+            self.loader = RestStateLoader(
+                self.github, self.main_team, self.scheduler,
+                self.permission_cache
+            )
+
+    def for_team(self, org_name, main_team_name, on_error):
+        '''
+        Returns a copy of this App for another team, sharing the client, rate
+        limit budget and metrics. Teams in the same org also share the team
+        index and the permissions read so far.
+        '''
+        app = copy.copy(self)
+        app.report_error = on_error
+        app.error_count = 0
+        if org_name != self.org_name:
+            app.load_org(org_name)
+        app.set_main_team(main_team_name)
+        return app
+
+    def on_error(self, message):
+        self.error_count += 1
+        self.report_error(message)
+
+    def run(self, access_config, snapshot=None, checkpoint=None):
+        # each run reads the current permissions afresh
+        self.permission_cache.clear()
+        if checkpoint is None:
+            checkpoint = Checkpoint()
+        try:
+            if checkpoint.pending is None:
+                changes = self.plan(access_config, snapshot, checkpoint)
+            else:
+                changes = list(checkpoint.pending)
+            changes = self.apply(changes, checkpoint, snapshot)
+        finally:
+            checkpoint.save()
+        checkpoint.finish()
+        return changes
+
+    def reconcile_repos(self, access_config, repo_names):
+        '''
+        Reconciles just the named repos, reading their current permissions
+        afresh, e.g. after a webhook reports that they may have changed.
+        '''
+        loader = RestStateLoader(
+            self.github, self.main_team, self.scheduler, self.permission_cache
+        )
+        changes = []
+        for name in filter(self.in_shard, repo_names):
+            repo = self.find_repo(name, access_config)
+            repo_access_config = repo and repo_config(access_config, repo)
+            if repo_access_config is not None:
+                changes += self.reconcile_repo(
+                    loader, repo, repo_access_config, name in access_config
+                )
+        self.apply(changes)
+
+    def find_repo(self, repo_name, access_config):
+        if not may_select(access_config, repo_name):
+            logging.info(f'repo {repo_name} is not in the config, ignoring')
+            return None
+        try:
+            repo = self.scheduler.call(self.org.get_repo, repo_name)
+        except UnknownObjectException:
+            logging.info(f'repo {repo_name} not found, ignoring')
+            return None
+        return None if repo.archived else repo
+
+    def reconcile_repo(self, loader, repo, repo_access_config, listed):
+        self.permission_cache.forget(repo.name)
+        try:
+            with self.metrics.phase('repo read'):
+                teams = loader.teams(repo)
+        except GithubException as e:
+            teams = e
+        if not listed and self.not_administered(teams):
+            # as in a full run, selectors only apply to the main team's repos
+            logging.info(
+                f'team does not have admin access to repo {repo.name}, '
+                'ignoring'
+            )
+            return []
+        return self.handle_repo(repo, repo_access_config, teams)
+
+    def not_administered(self, teams):
+        return not isinstance(teams, GithubException) and \
+            not self.main_team_has_admin_access_to_repo(teams)
+
+    def forget_teams(self):
+        '''
+        Drops the teams resolved so far, e.g. after one is renamed.
+        '''
+        self.teams = TeamDirectory(
+            self.github, self.org, self.scheduler, self.metrics,
+            self.team_cache
+        )
+        self.hierarchy = None
+
+    def plan(self, access_config, snapshot=None, checkpoint=None):
+        if snapshot is None:
+            snapshot = Snapshot()
+        if checkpoint is None:
+            checkpoint = Checkpoint()
         seen = set()
-        for repo in self.main_team.get_repos():
-            if repo.archived or not repo.permissions.admin:
-                continue
-            seen.add(repo.name)
-            self.handle_repo(repo, access_config.get(repo.name))
-            time.sleep(1.0)
+        changes = []
+        repos = self.plan_reads(
+            self.admin_repos(seen), access_config, snapshot, checkpoint
+        )
+        repos = self.read_repos(repos, access_config, snapshot, checkpoint)
+        for repo, repo_access_config, teams in repos:
+            changes += self.plan_or_resume_repo(
+                repo, repo_access_config, teams, snapshot, checkpoint
+            )
         self.check_unknown_repos(access_config, seen)
+        snapshot.retain(seen)
+        return changes
+
+    def plan_reads(self, repos, access_config, snapshot, checkpoint):
+        '''
+        Unless reads are by repo, reads the permissions of every team in the
+        org up front instead (one request per team, per 100 repos) - for
+        'auto', only when that should take fewer requests than reading each
+        repo that needs it. The repo reads are then answered from the cache.
+        '''
+        if self.reads == 'repo' or self.graphql or \
+                self.permission_cache.complete:
+            return repos
+        repos = list(repos)
+        if self.reads == 'team' or self.team_reads_cheaper(
+            repos, access_config, snapshot, checkpoint
+        ):
+            self.load_team_permissions()
+        return repos
+
+    def team_reads_cheaper(self, repos, access_config, snapshot, checkpoint):
+        repo_reads = sum(
+            needs_read(
+                repo, repo_config(access_config, repo), snapshot, checkpoint
+            )
+            for repo in repos
+        )
+        if repo_reads <= 1:
+            return False
+        # assuming most teams have up to 100 repos; listing the teams to
+        # count them also resolves every team, saving lookups later
+        team_reads = len(self.teams.all())
+        logging.info(
+            f'reading permissions takes {repo_reads} requests by repo, or '
+            f'about {team_reads} by team'
+        )
+        return team_reads < repo_reads
+
+    def load_team_permissions(self):
+        teams = self.teams.all()
+        with self.metrics.phase('repo read'):
+            self.permission_cache.load(team_permissions(
+                self.github, teams, self.scheduler, self.concurrency
+            ))
+
+    def apply(self, changes, checkpoint=None, snapshot=None):
+        if checkpoint is None:
+            checkpoint = Checkpoint()
+        snapshot = Snapshot() if snapshot is None else snapshot
+        queue = MutationQueue(changes)
+        if checkpoint.pending is None:
+            checkpoint.start_changes(queue)
+        with self.metrics.phase('mutations'):
+            for stage in queue.stages():
+                self.apply_changes(stage, checkpoint, snapshot)
+        return list(queue)
+
+    def apply_changes(self, changes, checkpoint, snapshot):
+        # teams are resolved up front, as the team directory is not shared
+        # between threads
+        updates = [(self.change_team(change), change) for change in changes]
+        errors = self.update_team_permissions(updates)
+        for (team, change), error in zip(updates, errors):
+            self.record_change(team, change, error, checkpoint, snapshot)
+
+    def update_team_permissions(self, updates):
+        # an error (or None) for each update, in the order of the updates
+        # rather than of completion
+        if self.engine is not None:
+            yield from self.engine.run(
+                lambda: self.update_team_permissions_async(updates)
+            )
+            return
+        with ThreadPoolExecutor(self.write_concurrency) as executor:
+            yield from executor.map(
+                lambda update: self.update_team_permission(*update), updates
+            )
+
+    def record_change(self, team, change, error, checkpoint, snapshot):
+        if error is not None:
+            self.on_error(error)
+            # the change stays pending, and the repo is read again next run
+            snapshot.forget(change.repo)
+            return
+        if team is not None:
+            self.permission_cache.apply(change)
+        checkpoint.changed(change)
+
+    def update_team_permissions_async(self, updates):
+        in_flight = asyncio.Semaphore(self.write_concurrency)
 
-    def handle_repo(self, repo, repo_access_config):
+        async def update(team, change):
+            if team is None:
+                return None
+            async with in_flight:
+                return await self.update_team_permission_async(team, change)
+        return [update(team, change) for team, change in updates]
+
+    def change_team(self, change):
+        team = self.teams.get(change.team)
+        if team is None:
+            self.on_error(
+                f'unknown team {change.team} specified for repo '
+                f'{change.repo}'
+            )
+        return team
+
+    def admin_repos(self, seen):
+        repos = self.metrics.timed_iter('repo listing', self.loader.repos())
+        # loaders only return the unarchived repos the team administers
+        for repo in repos:
+            if self.in_shard(repo.name):
+                seen.add(repo.name)
+                yield repo
+
+    def in_shard(self, repo_name):
+        return self.shard is None or repo_name in self.shard
+
+    def read_repos(self, repos, access_config, snapshot, checkpoint):
+        # Reads are fanned out across the pool (or event loop), but results
+        # are handled in repo order so logs and errors stay deterministic.
+        if self.engine is not None and not self.graphql:
+            yield from self.engine.run(lambda: [
+                self.read_repo_async(
+                    repo, repo_config(access_config, repo), snapshot,
+                    checkpoint
+                )
+                for repo in repos
+            ])
+            return
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            yield from executor.map(
+                lambda repo: self.read_repo(
+                    repo, repo_config(access_config, repo), snapshot,
+                    checkpoint
+                ),
+                repos
+            )
+
+    def read_repo(self, repo, repo_access_config, snapshot, checkpoint):
+        if not needs_read(repo, repo_access_config, snapshot, checkpoint):
+            return repo, repo_access_config, None
+        try:
+            with self.metrics.phase('repo read'):
+                teams = self.loader.teams(repo)
+        except GithubException as e:
+            teams = e
+        return repo, repo_access_config, teams
+
+    async def read_repo_async(
+        self, repo, repo_access_config, snapshot, checkpoint
+    ):
+        if not needs_read(repo, repo_access_config, snapshot, checkpoint):
+            return repo, repo_access_config, None
+        try:
+            with self.metrics.phase('repo read'):
+                teams = await self.permission_cache.teams_async(
+                    repo.name,
+                    lambda: self.engine.team_permissions(repo.full_name)
+                )
+        except GithubException as e:
+            teams = e
+        return repo, repo_access_config, teams
+
+    def plan_or_resume_repo(
+        self, repo, repo_access_config, teams, snapshot, checkpoint
+    ):
+        if checkpoint.has_repo(repo.name):
+            logging.info(f'repo {repo.name} planned before resuming')
+            return checkpoint.repos[repo.name]
+        error_count = self.error_count
+        changes = self.plan_repo(repo, repo_access_config, teams, snapshot)
+        checkpoint.add_repo(
+            repo.name, changes, self.error_count == error_count
+        )
+        return changes
+
+    def plan_repo(self, repo, repo_access_config, teams, snapshot):
+        if repo_access_config is not None and teams is None:
+            logging.info(f'repo {repo.name} unchanged since last run')
+            return []
+        error_count = self.error_count
+        changes = self.handle_repo(repo, repo_access_config, teams)
+        snapshot.update(
+            repo, repo_access_config, self.error_count == error_count
+        )
+        return changes
+
+    def handle_repo(self, repo, repo_access_config, teams):
         if repo_access_config is None:
             self.on_error(
                 f'team has admin access to {repo.name}, but there is no config'
                 ' for that repository'
             )
-            return
-        self.enforce_repo_access(repo, repo_access_config['teams'])
+            return []
+        if isinstance(teams, GithubException):
+            self.on_error(
+                f'failed to read teams for repo {repo.name}: {teams}'
+            )
+            return []
+        return self.enforce_repo_access(
+            repo, teams, repo_access_config['teams']
+        )
 
     def check_unknown_repos(self, access_config, seen):
-        for name in access_config:
+        # repos in other shards are checked by the jobs for those shards
+        for name in filter(self.in_shard, access_config):
             if name not in seen:
                 self.on_error(
                     f'config contained repo {name}, but team does not have '
                     'admin access'
                 )
 
-    def enforce_repo_access(self, repo, desired_permission_by_team):
-        teams = repo.get_teams()
+    def enforce_repo_access(self, repo, teams, desired_permission_by_team):
         if not self.main_team_has_admin_access_to_repo(teams):
             self.on_error(
                 f'team does not have admin access to repo {repo.name}'
             )
-            return
+            return []
         current_permission_by_team = {
             team.name: team.permission for team in teams
             if team.name != self.main_team.name
         }
+        desired_permission_by_team = self.desired_by_name(
+            repo, desired_permission_by_team, current_permission_by_team
+        )
+        inheritance = self.inheritance(desired_permission_by_team)
         all_teams = set(
             list(desired_permission_by_team) +
             list(current_permission_by_team)
         )
+        changes = []
         for team_name in all_teams:
-            team = self.teams.get(team_name)
-            if team is None:
+            # teams GitHub reports as having access are known to exist
+            if team_name not in current_permission_by_team and \
+                    team_name not in self.teams:
                 self.on_error(
                     f'unknown team {team_name} specified for repo {repo.name}'
                 )
                 continue
-            self.update_team_permission(
-                team, repo, current_permission_by_team.get(team_name),
+            changes += self.plan_team_permission(Change(
+                repo.name, team_name,
+                current_permission_by_team.get(team_name),
                 desired_permission_by_team.get(team_name)
-            )
+            ), inheritance.get(team_name))
+        return changes
 
-    def update_team_permission(
-        self, team, repo, current_permission, desired_permission
-    ):
-        if desired_permission == 'admin':
+    def desired_by_name(self, repo, desired_permission_by_team, current):
+        '''
+        The desired permissions keyed by team name, as the current ones are,
+        though the access file may give a team by its slug.
+        '''
+        desired = {}
+        for team, permission in desired_permission_by_team.items():
+            name = self.team_name(team, current)
+            if name == self.main_team.name:
+                self.on_error(
+                    f'team {team} should not be listed for repo {repo.name}'
+                    ' - this is implied'
+                )
+            elif desired.setdefault(name, permission) != permission:
+                self.on_error(
+                    f'team {name} listed twice for repo {repo.name} with '
+                    'different permissions'
+                )
+        return desired
+
+    def team_name(self, team, current):
+        # teams GitHub reports as having access need no lookup
+        if team in current:
+            return team
+        resolved = self.teams.get(team)
+        return team if resolved is None else resolved.name
+
+    def inheritance(self, desired_permission_by_team):
+        '''
+        The permissions teams will inherit on a repo once it has the desired
+        permissions (the main team keeping its admin access).
+        '''
+        if not self.team_hierarchy:
+            return NO_INHERITANCE
+        if self.hierarchy is None:
+            self.hierarchy = self.teams.hierarchy()
+        return self.hierarchy.for_repo(
+            dict(desired_permission_by_team, **{self.main_team.name: 'admin'})
+        )
+
+    def plan_team_permission(self, change, inherited=None):
+        if change.desired == 'admin':
             self.on_error(
-                f'additional team {team.name} has admin access to'
-                f' repo {repo.name} (resolve by completing transfer)'
+                f'additional team {change.team} has admin access to'
+                f' repo {change.repo} (resolve by completing transfer)'
             )
-        if current_permission == desired_permission:
+        if inherited is not None and \
+                self.satisfied_by_inheritance(change, *inherited):
+            return []
+        if change.current == change.desired:
             logging.info(
-                f'team {team.name} {desired_permission} permission to repo '
-                f'{repo.name} unchanged'
+                f'team {change.team} {change.desired} permission to repo '
+                f'{change.repo} unchanged'
             )
-            return
-        if desired_permission is None:
-            logging.info(
-                f'revoking team {team.name} {current_permission} permission '
-                f'from repo {repo.name} '
+            return []
+        return [change]
+
+    def satisfied_by_inheritance(self, change, permission, parent):
+        # a direct permission no higher than the inherited one makes no
+        # difference, so it is neither granted nor revoked
+        if change.desired is not None and \
+                not at_most(permission, change.desired):
+            self.on_error(
+                f'team {change.team} inherits {permission} permission to '
+                f'repo {change.repo} from team {parent}, more than its '
+                f'{change.desired} permission'
             )
-            team.remove_from_repos(repo)
+        if not at_most(change.current, permission) or \
+                not at_most(change.desired, permission):
+            return False
+        logging.info(
+            f'team {change.team} {permission} permission to repo '
+            f'{change.repo} inherited from team {parent}'
+        )
+        return True
+
+    def update_team_permission(self, team, change):
+        if team is None:
+            return None
+        log_change(team, change)
+        try:
+            self.write_team_permission(team, change)
+        except GithubException as e:
+            return change_error(team, change, e)
+        return None
+
+    def write_team_permission(self, team, change):
+        repo = f'{self.org_name}/{change.repo}'
+        if change.desired is None:
+            self.scheduler.call_write(team.remove_from_repos, repo)
         else:
-            logging.info(
-                f'granting team {team.name} {desired_permission} permission '
-                f'to repo {repo.name} (was {current_permission})'
+            self.scheduler.call_write(
+                set_repo_permission, team, repo, change.desired
             )
-            team.set_repo_permission(repo, desired_permission)
+
+    async def update_team_permission_async(self, team, change):
+        log_change(team, change)
+        try:
+            if change.desired is None:
+                await self.engine.remove_team(
+                    self.org_name, team.slug, change.repo
+                )
+            else:
+                await self.engine.set_team_permission(
+                    self.org_name, team.slug, change.repo, change.desired
+                )
+        except GithubException as e:
+            return change_error(team, change, e)
+        return None
 
     def main_team_has_admin_access_to_repo(self, teams):
         main_team_access = [
@@ -114,48 +579,188 @@ class App:
             and main_team_access[0].permission == 'admin'
 
 
-def validate_main_team_not_configured(teams, main_team):
-    for team in teams:
-        if team == main_team:
-            raise Exception(
-                f'team {team} should not be listed - this is implied'
-            )
+def needs_read(repo, repo_access_config, snapshot, checkpoint):
+    return repo_access_config is not None and \
+        not snapshot.is_current(repo, repo_access_config) and \
+        not checkpoint.has_repo(repo.name)
+
+
+def change_error(team, change, e):
+    return (
+        f'failed to change team {team.name} permission on repo '
+        f'{change.repo}: {e}'
+    )
+
+
+def log_change(team, change):
+    if change.desired is None:
+        logging.info(
+            f'revoking team {team.name} {change.current} permission '
+            f'from repo {change.repo} '
+        )
+    else:
+        logging.info(
+            f'granting team {team.name} {change.desired} permission '
+            f'to repo {change.repo} (was {change.current})'
+        )
+
+
+def create_github(credentials, concurrency, cache_dir, base_url, metrics):
+    cache = None
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache = HttpCache(os.path.join(cache_dir, 'http.sqlite'))
+    # Requests are paced and retried by RateLimitScheduler, so PyGithub's own
+    # fixed delays and retries are turned off (its write delay also applies
+    # to GraphQL queries, which are POSTs, and is not shared safely between
+    # threads, and its retries would multiply the scheduler's). Connection
+    # is used even without a cache, as the threads share one connection.
+    with github_connections(
+        cache, metrics, credentials_observer(credentials),
+        credentials_identity(credentials)
+    ):
+        return Github(
+            auth=as_auth(credentials), pool_size=concurrency,
+            base_url=base_url, retry=None,
+            seconds_between_requests=None, seconds_between_writes=None
+        )
+
+
+def create_app(arguments, org_name, team_name, handle_error):
+    base_url = os.environ.get('GITHUB_API_URL', Consts.DEFAULT_BASE_URL)
+    return App(
+        org_name, team_name,
+        load_credentials(os.environ, org_name, base_url), handle_error,
+        concurrency=arguments.concurrency, graphql=arguments.graphql,
+        cache_dir=arguments.cache_dir, base_url=base_url,
+        use_asyncio=arguments.asyncio,
+        write_concurrency=arguments.write_concurrency,
+        write_interval=arguments.write_interval, shard=arguments.shard,
+        team_hierarchy=arguments.team_hierarchy, reads=arguments.reads
+    )
+
+
+def write_metrics(metrics, arguments):
+    if arguments.metrics is not None:
+        with open(arguments.metrics, 'w') as f:
+            metrics.write_json(f)
+    if arguments.metrics_prometheus is not None:
+        with open(arguments.metrics_prometheus, 'w') as f:
+            metrics.write_prometheus(f)
 
 
-def validate_access_config(access_config, main_team):
-    seen = set()
-    for level in access_config:
-        validate_main_team_not_configured(level['teams'], main_team)
-        for repo in level['repos']:
-            if repo in seen:
-                raise Exception(f'repo {repo} listed twice')
-            seen.add(repo)
+def repo_access(arguments, handle_error):
+    access_config = arguments.access_config
+    checkpoint = open_checkpoint(arguments, access_config)
+    app = create_app(
+        arguments, arguments.org, arguments.team,
+        checkpoint.reporting(handle_error)
+    )
+    signal.signal(signal.SIGTERM, stop)
+    if arguments.snapshot is None:
+        changes = app.run(access_config, None, checkpoint)
+    else:
+        changes = run_incremental(app, access_config, arguments, checkpoint)
+    write_metrics(app.metrics, arguments)
+    save_result(arguments, changes, checkpoint.reported, app.metrics)
 
 
-def convert_access_config(access_config, main_team):
-    validate_access_config(access_config, main_team)
-    return {
-        repo: {'teams': level['teams']}
-        for level in access_config
-        for repo in level['repos']
+def run_incremental(app, access_config, arguments, checkpoint):
+    snapshot = Snapshot()
+    if not arguments.full:
+        snapshot = Snapshot.load(arguments.snapshot)
+    changes = app.run(access_config, snapshot, checkpoint)
+    snapshot.save(arguments.snapshot)
+    return changes
+
+
+def save_result(arguments, changes, errors, metrics):
+    if arguments.result is not None:
+        with open(arguments.result, 'w') as f:
+            write_result(f, arguments.shard, len(changes), errors, metrics)
+
+
+def open_checkpoint(arguments, access_config):
+    if arguments.checkpoint is None:
+        return Checkpoint()
+    key = {
+        'org': arguments.org,
+        'team': arguments.team,
+        'config': config_hash(access_config),
+        'shard': None if arguments.shard is None else str(arguments.shard),
     }
+    if arguments.resume:
+        return Checkpoint.load(arguments.checkpoint, key)
+    return Checkpoint(arguments.checkpoint, key)
 
 
-def repo_access(args, handle_error):
-    argument_parser = argparse.ArgumentParser('github_access')
-    argument_parser.add_argument('--org', required=True)
-    argument_parser.add_argument('--team', required=True)
-    argument_parser.add_argument('--access', required=True)
+def config_hash(access_config):
+    return hashlib.sha256(
+        json.dumps(config_json(access_config), sort_keys=True).encode('utf-8')
+    ).hexdigest()
 
-    arguments = argument_parser.parse_args(args)
 
-    github_token = os.environ['GITHUB_TOKEN']
-    app = App(arguments.org, arguments.team, github_token, handle_error)
+def stop(signum, frame):
+    # exit normally so that the checkpoint is saved on the way out
+    raise SystemExit(f'stopped by signal {signum}')
 
-    with open(arguments.access, 'r') as f:
-        app.run(
-            convert_access_config(
-                json.loads(f.read()),
-                arguments.team
-            )
+
+def plan(arguments, handle_error):
+    app = create_app(arguments, arguments.org, arguments.team, handle_error)
+    changes = app.plan(arguments.access_config)
+    with open(arguments.out, 'w') as f:
+        write_plan(f, Plan(arguments.org, arguments.team, changes))
+    write_metrics(app.metrics, arguments)
+    logging.info(f'{len(changes)} change(s) written to {arguments.out}')
+
+
+def apply(arguments, handle_error):
+    with open(arguments.plan, 'r') as f:
+        plan = read_plan(f)
+    base_url = os.environ.get('GITHUB_API_URL', Consts.DEFAULT_BASE_URL)
+    # only writes are made, so as many connections as writes in flight
+    app = App(
+        plan.org, plan.team, load_credentials(os.environ, plan.org, base_url),
+        handle_error, concurrency=arguments.write_concurrency,
+        base_url=base_url, use_asyncio=arguments.asyncio,
+        write_concurrency=arguments.write_concurrency,
+        write_interval=arguments.write_interval
+    )
+    app.apply(plan.changes)
+
+
+def load_manifest(path):
+    with open(path, 'r') as f:
+        manifest = json.loads(f.read())
+    if not manifest:
+        raise Exception(f'manifest {path} lists no teams')
+    directory = os.path.dirname(path)
+    return [
+        BatchEntry(entry['org'], entry['team'], load_access_config(
+            os.path.join(directory, entry['access']), entry['team']
+        ))
+        for entry in manifest
+    ]
+
+
+def run_batch(app, entries, handle_error):
+    apps_by_org = {app.org_name: app}
+    for entry in entries:
+        org_app = apps_by_org.get(entry.org, app)
+        team_app = org_app.for_team(
+            entry.org, entry.team,
+            prefixed_errors(handle_error, f'{entry.org}/{entry.team}: ')
         )
+        apps_by_org[entry.org] = team_app
+        team_app.apply(team_app.plan(entry.access_config))
+
+
+def prefixed_errors(handle_error, prefix):
+    return lambda message: handle_error(prefix + message)
+
+
+def batch(arguments, handle_error):
+    entries = load_manifest(arguments.manifest)
+    app = create_app(arguments, entries[0].org, entries[0].team, handle_error)
+    run_batch(app, entries, handle_error)
+    write_metrics(app.metrics, arguments)
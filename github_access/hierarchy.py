@@ -0,0 +1,70 @@
+'''
+Permissions inherited through nested teams: on GitHub a child team has at
+least the access of every team above it.
+'''
+from .plan import LEVEL_IDS
+
+
+class TeamHierarchy:
+    '''
+    The ancestors of each of an org's teams, by name and by slug, worked out
+    once from the parent of each team.
+    '''
+
+    def __init__(self, teams):
+        parents = {team.name: team.parent for team in teams}
+        names = {team.slug: team.name for team in teams}
+        names.update((team.name, team.name) for team in teams)
+        self.names = names
+        self.ancestors = {
+            key: ancestors(name, parents) for key, name in names.items()
+        }
+
+    def for_repo(self, permission_by_team):
+        '''
+        The permissions teams inherit on a repo where each team (by name or
+        slug) ends up with the given direct permission.
+        '''
+        return RepoInheritance(self, {
+            self.names.get(team, team): permission
+            for team, permission in permission_by_team.items()
+        })
+
+
+class RepoInheritance:
+
+    def __init__(self, hierarchy, permission_by_team):
+        self.hierarchy = hierarchy
+        self.permission_by_team = permission_by_team
+
+    def get(self, team_name):
+        '''
+        The highest permission the team inherits, and the team it comes
+        from, or None.
+        '''
+        inherited = [
+            (self.permission_by_team[ancestor], ancestor)
+            for ancestor in self.hierarchy.ancestors.get(team_name, ())
+            if self.permission_by_team.get(ancestor) is not None
+        ]
+        if not inherited:
+            return None
+        return max(inherited, key=lambda item: LEVEL_IDS[item[0]])
+
+
+# Used without a hierarchy, where no permission is inherited.
+NO_INHERITANCE = RepoInheritance(TeamHierarchy([]), {})
+
+
+def ancestors(name, parents):
+    # nearest first; a cycle (which GitHub does not allow) is cut short
+    found = []
+    parent = parents.get(name)
+    while parent is not None and parent.name not in found:
+        found.append(parent.name)
+        parent = parents.get(parent.name)
+    return tuple(found)
+
+
+def at_most(permission, limit):
+    return LEVEL_IDS[permission] <= LEVEL_IDS[limit]
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+
+from github.Requester import (
+    HTTPSRequestsConnectionClass, Requester, RequestsResponse
+)
+
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+
+
+class CachedResponse:
+    # mimics the response objects PyGithub gets from its connection classes
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self):
+        return self.body
+
+    def refreshed(self, headers):
+        return CachedResponse(
+            self.status, dict(self.headers, **lowercase(headers)), self.body
+        )
+
+
+class HttpCache:
+    '''
+    Size-bounded store of GET responses in an SQLite file.
+
+    Entries are evicted least recently used first once the total size of the
+    stored bodies exceeds `max_size` bytes.
+    '''
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE, clock=time.time):
+        self.max_size = max_size
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, headers TEXT, body TEXT, '
+                'size INTEGER, used REAL)'
+            )
+
+    def get(self, key):
+        with self.lock, self.db:
+            row = self.db.execute(
+                'SELECT headers, body FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            self.db.execute(
+                'UPDATE responses SET used = ? WHERE key = ?',
+                (self.clock(), key)
+            )
+        if row is None:
+            return None
+        return CachedResponse(200, json.loads(row[0]), row[1])
+
+    def put(self, key, response):
+        with self.lock, self.db:
+            self.db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)', (
+                    key, json.dumps(response.headers), response.body,
+                    len(response.body), self.clock()
+                )
+            )
+            self.db.execute(
+                'DELETE FROM responses WHERE key IN ('
+                ' SELECT key FROM ('
+                '  SELECT key, SUM(size) OVER (ORDER BY used DESC) AS total'
+                '  FROM responses'
+                ' ) WHERE total > ?'
+                ')', (self.max_size,)
+            )
+
+
+class Connection(HTTPSRequestsConnectionClass):
+    '''
+    PyGithub connection that can be shared between threads, and that
+    optionally makes GET requests conditional on a cached response and
+    records metrics for every request.
+
+    PyGithub passes the request to the connection in request() and sends it
+    in getresponse(); the stock connection keeps the request on the instance,
+    so concurrent requests through the one connection a Github client shares
+    can get mixed up. Here the pending request is kept per thread instead.
+
+    A cached response is revalidated with its ETag/Last-Modified, and a 304
+    Not Modified reply - which does not count against the rate limit - is
+    answered from the cache.
+
+    The headers of every request and response are passed to the observer,
+    if any (a TokenPool tracking the budget of each credential).
+
+    Cached responses are kept per credential, which `identity` returns
+    given a request's Authorization header.
+    '''
+
+    def __init__(
+        self, *args, cache=None, metrics=None, observer=None,
+        identity=None, **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+        self.metrics = metrics
+        self.observer = observer
+        self.identity = identity or (lambda authorization: authorization)
+        self.pending = threading.local()
+
+    def request(self, verb, url, input, headers, stream=False):
+        self.pending.request = (verb, url, input, headers, stream)
+
+    def getresponse(self):
+        verb, url, input, headers, stream = self.pending.request
+        if verb != 'GET' or stream or self.cache is None:
+            return self.send(verb, url, input, headers)
+        return self.cached_get(url, headers)
+
+    def cached_get(self, url, headers):
+        key = cache_key(
+            self.host, url, headers,
+            self.identity(headers.get('Authorization', ''))
+        )
+        cached = self.cache.get(key)
+        response = self.send(
+            'GET', url, None, dict(headers, **conditional_headers(cached))
+        )
+        if response.status == 304 and cached is not None:
+            return cached.refreshed(response.headers)
+        if response.status == 200:
+            self.store(key, response)
+        return response
+
+    def store(self, key, response):
+        headers = lowercase(response.headers)
+        if 'etag' in headers or 'last-modified' in headers:
+            self.cache.put(
+                key, CachedResponse(200, headers, response.read())
+            )
+
+    def send(self, verb, url, input, headers):
+        start = time.perf_counter()
+        r = self.session.request(
+            verb,
+            f'{self.protocol}://{self.host}:{self.port}{url}',
+            headers=headers,
+            data=input,
+            timeout=self.timeout,
+            verify=self.verify,
+            allow_redirects=False,
+        )
+        if self.metrics is not None:
+            self.metrics.record_request(
+                verb, url, r.status_code, time.perf_counter() - start,
+                lowercase(r.headers)
+            )
+        if self.observer is not None:
+            self.observer.observe(headers, lowercase(r.headers))
+        return RequestsResponse(r)
+
+
+class HttpConnection(Connection):
+    # for plain http API URLs, e.g. a local test server
+    def __init__(self, host, port=None, *args, **kwargs):
+        super().__init__(host, port or 80, *args, **kwargs)
+        self.protocol = 'http'
+
+
+@contextmanager
+def github_connections(cache=None, metrics=None, observer=None, identity=None):
+    '''
+    Github clients created in this context use Connection, with the cache,
+    metrics, observer and identity.
+    '''
+    options = {
+        'cache': cache, 'metrics': metrics, 'observer': observer,
+        'identity': identity,
+    }
+    Requester.injectConnectionClasses(
+        partial(HttpConnection, **options), partial(Connection, **options)
+    )
+    try:
+        yield
+    finally:
+        Requester.resetConnectionClasses()
+
+
+def cache_key(host, url, headers, identity):
+    # the credential's identity (for a token, the token itself) is part of
+    # the key so that responses are never shared between identities, but
+    # only its hash is stored
+    return hashlib.sha256('\n'.join([
+        identity, headers.get('Accept', ''), host, url
+    ]).encode('utf-8')).hexdigest()
+
+
+def conditional_headers(cached):
+    if cached is None:
+        return {}
+    headers = {}
+    if 'etag' in cached.headers:
+        headers['If-None-Match'] = cached.headers['etag']
+    if 'last-modified' in cached.headers:
+        headers['If-Modified-Since'] = cached.headers['last-modified']
+    return headers
+
+
+def lowercase(headers):
+    return {key.lower(): value for key, value in headers.items()}
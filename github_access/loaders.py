@@ -0,0 +1,304 @@
+import re
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from github.Repository import Repository
+
+from .plan import LEVELS
+
+TeamPermission = namedtuple('TeamPermission', ['name', 'permission'])
+
+# GraphQL reports repository permissions using the names from the web UI
+# rather than the REST API ones used in access files.
+GRAPHQL_PERMISSIONS = {
+    'ADMIN': 'admin',
+    'MAINTAIN': 'maintain',
+    'WRITE': 'push',
+    'TRIAGE': 'triage',
+    'READ': 'pull',
+}
+
+REPO_PAGE_SIZE = 100
+
+NEXT_LINK = re.compile(r'<([^>]+)>;\s*rel="next"')
+
+REPOSITORY_CONNECTION = '''
+    pageInfo { hasNextPage endCursor }
+    edges {
+      permission
+      node {
+        name nameWithOwner isArchived updatedAt pushedAt
+        %s
+      }
+    }
+'''
+
+REPOSITORY_TOPICS = 'repositoryTopics(first: 20) { nodes { topic { name } } }'
+
+# repos are built from these results, so they include topics (GitHub allows
+# at most 20 per repo) for topic selectors
+TEAM_REPOS_QUERY = '''
+query($org: String!, $team: String!, $cursor: String) {
+  organization(login: $org) {
+    team(slug: $team) {
+      repositories(first: 100, after: $cursor) {%s}
+    }
+  }
+}
+''' % (REPOSITORY_CONNECTION % REPOSITORY_TOPICS)
+
+TEAMS_QUERY = '''
+query($org: String!, $cursor: String) {
+  organization(login: $org) {
+    teams(first: 50, after: $cursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        slug
+        repositories(first: 100) {%s}
+      }
+    }
+  }
+}
+''' % (REPOSITORY_CONNECTION % '')
+
+
+class PermissionCache:
+    '''
+    The team permissions read for each repo in an org, shared by the loaders
+    for every team in that org so that a repo administered by several teams
+    is only read once. Changes made are applied to the cached permissions.
+    '''
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.teams_by_repo = {}
+        # set once the permissions for every repo in the org are loaded
+        self.complete = False
+
+    def teams(self, repo_name, read):
+        if repo_name not in self.teams_by_repo and not self.complete:
+            self.teams_by_repo[repo_name] = read()
+        return self.teams_by_repo.get(repo_name, [])
+
+    async def teams_async(self, repo_name, read):
+        if repo_name not in self.teams_by_repo and not self.complete:
+            self.teams_by_repo[repo_name] = await read()
+        return self.teams_by_repo.get(repo_name, [])
+
+    def load(self, teams_by_repo):
+        self.teams_by_repo = teams_by_repo
+        self.complete = True
+
+    def forget(self, repo_name):
+        # the other repos' permissions are kept, but a repo missing from
+        # them can no longer be assumed to have no teams
+        self.teams_by_repo.pop(repo_name, None)
+        self.complete = False
+
+    def apply(self, change):
+        if change.repo not in self.teams_by_repo and not self.complete:
+            return
+        teams = [
+            team for team in self.teams_by_repo.get(change.repo, [])
+            if team.name != change.team
+        ]
+        if change.desired is not None:
+            teams.append(TeamPermission(change.team, change.desired))
+        self.teams_by_repo[change.repo] = teams
+
+
+class RestStateLoader:
+    '''
+    Reads the current state one REST request per repo, via PyGithub.
+
+    The main team's repos are listed 100 per page as plain JSON, and repo
+    objects are only built, from the few fields needed, for the unarchived
+    repos it administers.
+    '''
+
+    def __init__(self, github, main_team, scheduler, cache):
+        self.github = github
+        self.main_team = main_team
+        self.scheduler = scheduler
+        self.cache = cache
+
+    def repos(self):
+        for raw in self.team_repos():
+            if not raw['archived'] and raw['permissions']['admin']:
+                yield self.github.create_from_raw_data(
+                    Repository, lean_repo(raw)
+                )
+
+    def team_repos(self):
+        url = f'{self.main_team.url}/repos'
+        parameters = {'per_page': REPO_PAGE_SIZE}
+        while url is not None:
+            headers, page = self.scheduler.call(
+                self.github.requester.requestJsonAndCheck,
+                'GET', url, parameters
+            )
+            yield from page
+            url, parameters = next_link(headers), None
+
+    def teams(self, repo):
+        return self.cache.teams(
+            repo.name,
+            lambda: self.scheduler.call(lambda: list(repo.get_teams()))
+        )
+
+
+class GraphQLStateLoader:
+    '''
+    Reads the current state in bulk from the GraphQL API.
+
+    The main team's repos are listed 100 at a time, and the permissions of
+    every org team are read 50 teams x 100 repos per query, so the number of
+    requests scales with repos / 100 rather than with the number of repos.
+    The org-wide permissions are loaded once into the shared cache.
+    Repos are returned as PyGithub objects built from the query results, for
+    the unarchived repos the main team administers only.
+    '''
+
+    def __init__(self, github, org_name, main_team, scheduler, cache):
+        self.github = github
+        self.org_name = org_name
+        self.main_team = main_team
+        self.scheduler = scheduler
+        self.cache = cache
+
+    def repos(self):
+        # the main team's permission is the edge's; viewerPermission would
+        # be the token user's, e.g. admin everywhere for an org owner
+        repos = [
+            self.github.create_from_raw_data(
+                Repository, raw_repo(edge['node'], self.org_name)
+            )
+            for edge in self.team_repo_edges(self.main_team.slug)
+            if not edge['node']['isArchived'] and edge['permission'] == 'ADMIN'
+        ]
+        if not self.cache.complete:
+            self.cache.load(self.load_permissions())
+        return repos
+
+    def teams(self, repo):
+        return self.cache.teams(repo.name, list)
+
+    def load_permissions(self):
+        permissions = defaultdict(list)
+        for team in self.org_teams():
+            for edge in self.all_team_repo_edges(team):
+                permissions[edge['node']['name']].append(TeamPermission(
+                    team['name'], GRAPHQL_PERMISSIONS[edge['permission']]
+                ))
+        return dict(permissions)
+
+    def org_teams(self):
+        for connection in self.paginate(TEAMS_QUERY, ['teams']):
+            yield from connection['nodes']
+
+    def all_team_repo_edges(self, team):
+        repositories = team['repositories']
+        yield from repositories['edges']
+        if repositories['pageInfo']['hasNextPage']:
+            yield from self.team_repo_edges(
+                team['slug'], repositories['pageInfo']['endCursor']
+            )
+
+    def team_repo_edges(self, team_slug, cursor=None):
+        connections = self.paginate(
+            TEAM_REPOS_QUERY, ['team', 'repositories'], cursor, team=team_slug
+        )
+        for connection in connections:
+            yield from connection['edges']
+
+    def paginate(self, query, path, cursor=None, **variables):
+        while True:
+            connection = self.query(query, cursor=cursor, **variables)
+            for key in path:
+                connection = connection[key]
+            yield connection
+            if not connection['pageInfo']['hasNextPage']:
+                return
+            cursor = connection['pageInfo']['endCursor']
+
+    def query(self, query, **variables):
+        _, data = self.scheduler.call(
+            self.github.requester.graphql_query,
+            query, dict(variables, org=self.org_name)
+        )
+        return data['data']['organization']
+
+
+def team_repo_permissions(github, team, scheduler):
+    '''
+    The name of each repo the team has access to and its permission, read
+    100 repos per request.
+    '''
+    loader = RestStateLoader(github, team, scheduler, None)
+    return [
+        (raw['name'], rest_permission(raw['permissions']))
+        for raw in loader.team_repos()
+    ]
+
+
+def team_permissions(github, teams, scheduler, concurrency):
+    '''
+    The permissions of the given teams on each repo, as cached by
+    PermissionCache, read one team at a time rather than one repo at a time.
+    '''
+    permissions = defaultdict(list)
+    with ThreadPoolExecutor(concurrency) as executor:
+        for team, repos in zip(teams, executor.map(
+            lambda team: team_repo_permissions(github, team, scheduler), teams
+        )):
+            for repo_name, permission in repos:
+                permissions[repo_name].append(
+                    TeamPermission(team.name, permission)
+                )
+    return dict(permissions)
+
+
+def rest_permission(permissions):
+    return next(
+        level for level in reversed(LEVELS)
+        if level is None or permissions.get(level)
+    )
+
+
+def raw_repo(node, org_name):
+    return {
+        'name': node['name'],
+        'full_name': node['nameWithOwner'],
+        'owner': {'login': org_name},
+        'archived': node['isArchived'],
+        'updated_at': node['updatedAt'],
+        'pushed_at': node['pushedAt'],
+        # only repos the main team administers are built
+        'permissions': {'admin': True},
+        'topics': [
+            topic['topic']['name']
+            for topic in node['repositoryTopics']['nodes']
+        ],
+    }
+
+
+def lean_repo(raw):
+    return {
+        'name': raw['name'],
+        'full_name': raw['full_name'],
+        'owner': {'login': raw['owner']['login']},
+        'url': raw['url'],
+        'archived': False,
+        'updated_at': raw['updated_at'],
+        'pushed_at': raw['pushed_at'],
+        'permissions': {'admin': True},
+        'topics': raw.get('topics', []),
+    }
+
+
+def next_link(headers):
+    match = NEXT_LINK.search(headers.get('link', ''))
+    return None if match is None else match.group(1)
@@ -0,0 +1,165 @@
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf')]
+
+# Replaces the names and ids in request paths so that requests are counted
+# per endpoint rather than per repo or team.
+ENDPOINT_PATTERNS = [
+    (re.compile(r'/orgs/[^/]+'), '/orgs/{org}'),
+    (re.compile(r'/teams/[^/]+'), '/teams/{team}'),
+    (re.compile(r'/repos/[^/]+/[^/]+'), '/repos/{owner}/{repo}'),
+]
+
+
+class Metrics:
+    '''
+    Collects request counts, latency histograms and rate-limit samples for
+    the requests made by a Github client, and the time spent in each phase
+    of a run.
+
+    Phases that run on several threads at once (e.g. per-repo reads) report
+    the total time spent in them across threads.
+    '''
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.start = clock()
+        self.lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.latencies = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+        self.latency_sums = defaultdict(float)
+        self.rate_limit_remaining = []
+        self.phases = defaultdict(lambda: {'seconds': 0.0, 'count': 0})
+
+    def record_request(self, method, path, status, duration, headers):
+        key = (method, endpoint(path), status)
+        with self.lock:
+            self.requests[key] += 1
+            self.latencies[key[:2]][bucket_index(duration)] += 1
+            self.latency_sums[key[:2]] += duration
+            self.record_rate_limit(headers)
+
+    def record_rate_limit(self, headers):
+        remaining = headers.get('x-ratelimit-remaining')
+        if remaining is not None:
+            self.rate_limit_remaining.append(
+                [round(self.clock() - self.start, 3), int(remaining)]
+            )
+
+    @contextmanager
+    def phase(self, name):
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.add_phase_time(name, self.clock() - start)
+
+    def timed_iter(self, name, iterable):
+        '''
+        Yields from iterable, counting the time spent fetching each item
+        (e.g. requesting the next page) towards the named phase.
+        '''
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            yield item
+
+    def add_phase_time(self, name, seconds):
+        with self.lock:
+            self.phases[name]['seconds'] += seconds
+            self.phases[name]['count'] += 1
+
+    def summary(self):
+        return {
+            'duration': round(self.clock() - self.start, 3),
+            'requests': [
+                {'method': method, 'endpoint': path, 'status': status,
+                 'count': count}
+                for (method, path, status), count
+                in sorted(self.requests.items())
+            ],
+            'latency': [
+                {'method': method, 'endpoint': path,
+                 'buckets': dict(zip(map(str, LATENCY_BUCKETS), counts)),
+                 'sum': round(self.latency_sums[(method, path)], 3)}
+                for (method, path), counts in sorted(self.latencies.items())
+            ],
+            'rate_limit_remaining': self.rate_limit_remaining,
+            'phases': {
+                name: dict(phase, seconds=round(phase['seconds'], 3))
+                for name, phase in sorted(self.phases.items())
+            },
+        }
+
+    def write_json(self, f):
+        json.dump(self.summary(), f, indent=2)
+        f.write('\n')
+
+    def write_prometheus(self, f):
+        f.write(
+            '# TYPE github_access_requests_total counter\n' + ''.join(
+                'github_access_requests_total{method="%s",endpoint="%s",'
+                'status="%s"} %d\n' % (*key, count)
+                for key, count in sorted(self.requests.items())
+            )
+        )
+        f.write(
+            '# TYPE github_access_request_duration_seconds histogram\n' +
+            ''.join(
+                histogram_lines(key, counts, self.latency_sums[key])
+                for key, counts in sorted(self.latencies.items())
+            )
+        )
+        f.write(
+            '# TYPE github_access_phase_duration_seconds gauge\n' + ''.join(
+                'github_access_phase_duration_seconds{phase="%s"} %f\n' % (
+                    name, phase['seconds']
+                )
+                for name, phase in sorted(self.phases.items())
+            )
+        )
+        for _, remaining in self.rate_limit_remaining[-1:]:
+            f.write(
+                '# TYPE github_access_rate_limit_remaining gauge\n'
+                f'github_access_rate_limit_remaining {remaining}\n'
+            )
+
+
+def histogram_lines(key, counts, total):
+    labels = 'method="%s",endpoint="%s"' % key
+    cumulative = 0
+    lines = []
+    for le, count in zip(LATENCY_BUCKETS, counts):
+        cumulative += count
+        le = '+Inf' if le == float('inf') else le
+        lines.append(
+            'github_access_request_duration_seconds_bucket'
+            f'{{{labels},le="{le}"}} {cumulative}\n'
+        )
+    lines.append(
+        f'github_access_request_duration_seconds_sum{{{labels}}} {total:f}\n'
+        f'github_access_request_duration_seconds_count{{{labels}}} '
+        f'{cumulative}\n'
+    )
+    return ''.join(lines)
+
+
+def endpoint(path):
+    path = path.split('?', 1)[0]
+    for pattern, replacement in ENDPOINT_PATTERNS:
+        path = pattern.sub(replacement, path, count=1)
+    return path
+
+
+def bucket_index(duration):
+    return next(
+        i for i, le in enumerate(LATENCY_BUCKETS) if duration <= le
+    )
@@ -0,0 +1,46 @@
+from .plan import LEVEL_IDS, Change
+
+
+class MutationQueue:
+    '''
+    The permission changes to make in a run, at most one per team per repo.
+
+    A change queued for a team and repo that already has one replaces it,
+    keeping the permission the team had before either, and changes that
+    leave a team's permission as it was are dropped.
+
+    Changes are made in stages: every grant and upgrade first, then every
+    downgrade and revocation. A team taking over admin access from another
+    is therefore granted it before the other team loses it, and a repo is
+    never left with fewer admins than it started with.
+    '''
+
+    def __init__(self, changes=()):
+        self.changes = {}
+        for change in changes:
+            self.add(change)
+
+    def add(self, change):
+        key = (change.repo, change.team)
+        previous = self.changes.pop(key, None)
+        if previous is not None:
+            change = Change(
+                change.repo, change.team, previous.current, change.desired
+            )
+        if change.current != change.desired:
+            self.changes[key] = change
+
+    def __iter__(self):
+        return iter(self.changes.values())
+
+    def __len__(self):
+        return len(self.changes)
+
+    def stages(self):
+        increases = [change for change in self if is_increase(change)]
+        decreases = [change for change in self if not is_increase(change)]
+        return [stage for stage in (increases, decreases) if stage]
+
+
+def is_increase(change):
+    return LEVEL_IDS[change.desired] > LEVEL_IDS[change.current]
@@ -0,0 +1,42 @@
+import json
+from collections import namedtuple
+
+# A single team permission change on a repo. A desired permission of None
+# means the team's access is revoked.
+Change = namedtuple('Change', ['repo', 'team', 'current', 'desired'])
+
+Plan = namedtuple('Plan', ['org', 'team', 'changes'])
+
+# Permission levels in increasing order, with None meaning no access.
+LEVELS = [None, 'pull', 'triage', 'push', 'maintain', 'admin']
+
+LEVEL_IDS = {level: i for i, level in enumerate(LEVELS)}
+
+
+def write_plan(f, plan):
+    json.dump({
+        'org': plan.org,
+        'team': plan.team,
+        'changes': [change_json(change) for change in sorted(plan.changes)],
+    }, f, indent=2, sort_keys=True)
+    f.write('\n')
+
+
+def read_plan(f):
+    data = json.load(f)
+    return Plan(data['org'], data['team'], [
+        change_from_json(change) for change in data['changes']
+    ])
+
+
+def change_json(change):
+    return {
+        'repo': change.repo,
+        'team': change.team,
+        'from': change.current,
+        'to': change.desired,
+    }
+
+
+def change_from_json(data):
+    return Change(data['repo'], data['team'], data['from'], data['to'])
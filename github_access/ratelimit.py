@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+
+from github import GithubException, RateLimitExceededException
+
+# The budget assumed until GitHub reports one, if it ever does.
+UNLIMITED = sys.maxsize
+
+
+class RateLimitScheduler:
+    '''
+    Paces calls to the GitHub API according to the remaining request budget.
+
+    GitHub reports the budget in the X-RateLimit-Remaining/X-RateLimit-Reset
+    headers of every response. Calls go through without delay while more than
+    `reserve` requests remain; below that the remaining requests are spread
+    evenly until the reset. Calls rejected by the (secondary) rate limit are
+    retried after Retry-After, or with exponential backoff when GitHub does
+    not say how long to wait.
+
+    Writes made through call_write are also spaced at least
+    `write_interval` seconds apart, as GitHub recommends for avoiding its
+    secondary rate limits.
+
+    A scheduler can be shared between threads; waits are serialised so the
+    pacing applies to all of them together. call_async applies the same
+    pacing to coroutines, waiting without blocking the event loop.
+    '''
+
+    def __init__(
+        self, read_budget, reserve=100, max_retries=5, initial_backoff=1.0,
+        max_backoff=300.0, write_interval=1.0, clock=time.time,
+        sleep=time.sleep
+    ):
+        self.read_budget = read_budget
+        self.reserve = reserve
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.sleep = sleep
+        self.write_interval = write_interval
+        self.last_write = None
+        # when the last read slot reserved by call_async ends
+        self.last_read = None
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+
+    def delay(self):
+        remaining, reset_time = self.read_budget()
+        if remaining > self.reserve:
+            return 0.0
+        until_reset = max(reset_time - self.clock(), 0.0)
+        if remaining <= 0:
+            return until_reset
+        return until_reset / remaining
+
+    def throttle(self):
+        with self.lock:
+            delay = self.delay()
+            if delay > 0:
+                logging.info(f'rate limit budget low, waiting {delay:.1f}s')
+                self.sleep(delay)
+
+    def call(self, fn, *args, **kwargs):
+        for attempt in range(self.max_retries):
+            try:
+                self.throttle()
+                return fn(*args, **kwargs)
+            except GithubException as e:
+                raise_unless_rate_limited(e)
+                self.backoff(e.headers or {}, attempt)
+        self.throttle()
+        return fn(*args, **kwargs)
+
+    async def call_async(self, fn, *args, write=False):
+        for attempt in range(self.max_retries):
+            try:
+                await self.throttle_async(write)
+                return await fn(*args)
+            except GithubException as e:
+                raise_unless_rate_limited(e)
+                await asyncio.sleep(
+                    self.logged_retry_delay(e.headers or {}, attempt)
+                )
+        await self.throttle_async(write)
+        return await fn(*args)
+
+    async def throttle_async(self, write):
+        delay = self.reserve_read_slot()
+        if write:
+            delay = max(delay, self.reserve_write_slot())
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def reserve_read_slot(self):
+        '''
+        Takes the next slot the budget allows, returning how long to wait for
+        it. Slots follow one another, as the waits in throttle do, so that
+        coroutines waiting together are still spread out.
+        '''
+        with self.lock:
+            now = self.clock()
+            delay = self.delay()
+            start = now if self.last_read is None else \
+                max(now, self.last_read)
+            self.last_read = start + delay
+            wait = self.last_read - now
+        if delay > 0:
+            logging.info(f'rate limit budget low, waiting {wait:.1f}s')
+        return wait
+
+    def call_write(self, fn, *args, **kwargs):
+        def paced(*args, **kwargs):
+            self.wait_for_write_slot()
+            return fn(*args, **kwargs)
+        return self.call(paced, *args, **kwargs)
+
+    def wait_for_write_slot(self):
+        delay = self.reserve_write_slot()
+        if delay > 0:
+            self.sleep(delay)
+
+    def reserve_write_slot(self):
+        '''
+        Takes the next write slot, returning how long to wait for it.
+        '''
+        with self.write_lock:
+            now = self.clock()
+            start = now if self.last_write is None else \
+                max(now, self.last_write + self.write_interval)
+            self.last_write = start
+            return start - now
+
+    def backoff(self, headers, attempt):
+        self.sleep(self.logged_retry_delay(headers, attempt))
+
+    def logged_retry_delay(self, headers, attempt):
+        delay = self.retry_delay(headers, attempt)
+        logging.warning(f'rate limited by GitHub, retrying in {delay:.1f}s')
+        return delay
+
+    def retry_delay(self, headers, attempt):
+        if 'retry-after' in headers:
+            return float(headers['retry-after'])
+        if headers.get('x-ratelimit-remaining') == '0':
+            reset_time = float(headers['x-ratelimit-reset'])
+            return max(reset_time - self.clock(), 0.0) + 1.0
+        return min(self.initial_backoff * 2 ** attempt, self.max_backoff)
+
+
+def raise_unless_rate_limited(exception):
+    if not is_rate_limited(exception):
+        raise exception
+
+
+def is_rate_limited(exception):
+    return isinstance(exception, RateLimitExceededException) \
+        or exception.status == 429 \
+        or 'retry-after' in (exception.headers or {})
+
+
+def github_budget(github):
+    def read_budget():
+        # as last reported, rather than through Github.rate_limiting, which
+        # requests it when not known yet (failing where GitHub Enterprise has
+        # rate limiting turned off, so that no budget is ever reported)
+        remaining, limit = github.requester.rate_limiting
+        if limit < 0:
+            return UNLIMITED, 0
+        return remaining, github.requester.rate_limiting_resettime
+    return read_budget
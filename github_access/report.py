@@ -0,0 +1,183 @@
+import csv
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from github import Consts
+
+from .credentials import credentials_budget, load_credentials
+from .github import create_github, write_metrics
+from .loaders import (
+    GRAPHQL_PERMISSIONS, GraphQLStateLoader, team_repo_permissions
+)
+from .metrics import Metrics
+from .plan import LEVEL_IDS, LEVELS, Change
+from .ratelimit import RateLimitScheduler
+from .selection import selected_by_name
+
+
+class PermissionMatrix:
+    '''
+    The permission of every team on every repo in an org, stored as one byte
+    per repo per team.
+
+    Repo and team names are mapped to integer ids in the order they are
+    first seen, and each team's permissions are a bytearray indexed by repo
+    id, holding the index of the permission in LEVELS (0 for no access).
+    10,000 repos x 500 teams takes 5MB.
+    '''
+
+    def __init__(self):
+        self.repo_names = []
+        self.repo_ids = {}
+        self.team_names = []
+        self.team_ids = {}
+        self.columns = []
+
+    def repo_id(self, name):
+        if name not in self.repo_ids:
+            self.repo_ids[name] = len(self.repo_names)
+            self.repo_names.append(name)
+        return self.repo_ids[name]
+
+    def team_id(self, name):
+        if name not in self.team_ids:
+            self.team_ids[name] = len(self.team_names)
+            self.team_names.append(name)
+            self.columns.append(bytearray())
+        return self.team_ids[name]
+
+    def set(self, repo, team, permission):
+        column = self.columns[self.team_id(team)]
+        repo_id = self.repo_id(repo)
+        if len(column) <= repo_id:
+            column.extend(bytes(len(self.repo_names) - len(column)))
+        column[repo_id] = LEVEL_IDS[permission]
+
+    def get(self, repo, team):
+        repo_id = self.repo_ids.get(repo)
+        team_id = self.team_ids.get(team)
+        if repo_id is None or team_id is None:
+            return None
+        column = self.columns[team_id]
+        return LEVELS[column[repo_id]] if repo_id < len(column) else None
+
+    def teams(self, repo):
+        repo_id = self.repo_ids.get(repo, len(self.repo_names))
+        return {
+            name: LEVELS[column[repo_id]]
+            for name, column in zip(self.team_names, self.columns)
+            if repo_id < len(column) and column[repo_id]
+        }
+
+    def repos(self, team, minimum='pull'):
+        column = self.columns[self.team_ids[team]] \
+            if team in self.team_ids else b''
+        level = LEVEL_IDS[minimum]
+        return {
+            self.repo_names[repo_id]
+            for repo_id, value in enumerate(column) if value >= level
+        }
+
+    def entries(self):
+        for repo in sorted(self.repo_names):
+            for team, permission in sorted(self.teams(repo).items()):
+                yield repo, team, permission
+
+
+def load_matrix(github, org_name, scheduler, graphql, concurrency):
+    matrix = PermissionMatrix()
+    if graphql:
+        permissions = graphql_permissions(github, org_name, scheduler)
+    else:
+        permissions = rest_permissions(
+            github, org_name, scheduler, concurrency
+        )
+    for repo, team, permission in permissions:
+        matrix.set(repo, team, permission)
+    return matrix
+
+
+def graphql_permissions(github, org_name, scheduler):
+    loader = GraphQLStateLoader(github, org_name, None, scheduler, None)
+    for team in loader.org_teams():
+        for edge in loader.all_team_repo_edges(team):
+            yield edge['node']['name'], team['name'], \
+                GRAPHQL_PERMISSIONS[edge['permission']]
+
+
+def rest_permissions(github, org_name, scheduler, concurrency):
+    org = scheduler.call(github.get_organization, org_name)
+
+    def team_permissions(team):
+        return [
+            (repo_name, team.name, permission) for repo_name, permission
+            in team_repo_permissions(github, team, scheduler)
+        ]
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        for permissions in executor.map(team_permissions, org.get_teams()):
+            yield from permissions
+
+
+def drift(matrix, access_config, main_team):
+    '''
+    Yields a Change for each team whose permission on a configured repo
+    differs from the access config. Repos are only selected by name, as
+    their topics are not read.
+    '''
+    configs = selected_by_name(access_config, matrix.repo_names)
+    for repo in sorted(configs):
+        current = matrix.teams(repo)
+        current.pop(main_team, None)
+        desired = configs[repo]['teams']
+        for team in sorted(set(current) | set(desired)):
+            if current.get(team) != desired.get(team):
+                yield Change(repo, team, current.get(team), desired.get(team))
+
+
+def write_rows(f, output_format, fields, rows):
+    if output_format == 'json':
+        json.dump([dict(zip(fields, row)) for row in rows], f, indent=2)
+        f.write('\n')
+    else:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(fields)
+        writer.writerows(rows)
+
+
+def report(arguments, handle_error):
+    metrics = Metrics()
+    base_url = os.environ.get('GITHUB_API_URL', Consts.DEFAULT_BASE_URL)
+    credentials = load_credentials(os.environ, arguments.org, base_url)
+    github = create_github(
+        credentials, arguments.concurrency, arguments.cache_dir, base_url,
+        metrics
+    )
+    scheduler = RateLimitScheduler(credentials_budget(credentials, github))
+    with metrics.phase('permission load'):
+        matrix = load_matrix(
+            github, arguments.org, scheduler, arguments.graphql,
+            arguments.concurrency
+        )
+    logging.info(
+        f'read permissions for {len(matrix.team_names)} teams on '
+        f'{len(matrix.repo_names)} repos'
+    )
+    write_report(matrix, arguments)
+    write_metrics(metrics, arguments)
+
+
+def write_report(matrix, arguments):
+    if arguments.access is None:
+        fields, rows = ['repo', 'team', 'permission'], matrix.entries()
+    else:
+        fields = ['repo', 'team', 'from', 'to']
+        rows = drift(matrix, arguments.access_config, arguments.team)
+    if arguments.out is None:
+        write_rows(sys.stdout, arguments.format, fields, rows)
+    else:
+        with open(arguments.out, 'w') as f:
+            write_rows(f, arguments.format, fields, rows)
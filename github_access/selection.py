@@ -0,0 +1,214 @@
+'''
+Repo selectors: besides listing repos by name, a level of an access file can
+`match` every repo whose name has a prefix, or matches a glob or a regular
+expression, or that has a topic.
+
+A repo listed by name uses that level. Otherwise it uses the level of the
+first selector (in file order) matching its name, and failing that the first
+topic selector matching one of its topics.
+'''
+import fnmatch
+import re
+import sys
+
+SELECTOR_KINDS = ('prefix', 'glob', 'regex', 'topic')
+
+NO_MATCH = sys.maxsize
+
+# Regexes that refer to their own groups, by number or by name, would refer
+# to other selectors' groups once combined, so are matched on their own.
+GROUP_REFERENCE = re.compile(r'\\[1-9]|\(\?P|\(\?\(')
+
+
+class AccessConfig(dict):
+    '''
+    The config of each repo listed by name, as read from an access file,
+    with the file's selectors.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.matcher = RepoMatcher()
+
+    def configs(self):
+        '''
+        Every config, whether for repos listed by name or for selectors.
+        '''
+        return list(self.values()) + [
+            config for _, config in self.matcher.rules
+        ]
+
+
+class RepoMatcher:
+    '''
+    Finds the first selector matching a repo.
+
+    Prefixes are kept in a trie, and globs and regular expressions are
+    compiled into one regular expression, so matching a name takes time in
+    proportion to its length rather than to the number of selectors (apart
+    from regexes with group references, matched one by one).
+    '''
+
+    def __init__(self):
+        # (selector, config), in file order
+        self.rules = []
+        self.trie = {}
+        self.patterns = []
+        # (index, regex) of those matched on their own
+        self.separate = []
+        self.topics = {}
+        self.regex = None
+
+    def add(self, selector, config):
+        (kind, value), = selector.items()
+        ADD[kind](self, len(self.rules), value)
+        self.rules.append((selector, config))
+
+    def add_prefix(self, index, prefix):
+        node = self.trie
+        for char in prefix:
+            node = node.setdefault(char, {})
+        # None marks the end of a prefix, keeping the first selector for it
+        node.setdefault(None, index)
+
+    def add_glob(self, index, glob):
+        self.add_pattern(index, fnmatch.translate(glob))
+
+    def add_regex(self, index, regex):
+        if GROUP_REFERENCE.search(regex):
+            self.separate.append((index, re.compile(regex)))
+        else:
+            self.add_pattern(index, regex)
+
+    def add_pattern(self, index, regex):
+        self.patterns.append(f'(?P<s{index}>{regex})')
+
+    def add_topic(self, index, topic):
+        self.topics.setdefault(topic, index)
+
+    def compile(self):
+        try:
+            self.regex = re.compile('|'.join(self.patterns or ['(?!)']))
+        except re.error as e:
+            raise Exception(f'regex selectors cannot be combined: {e}')
+
+    def match(self, name, topics):
+        '''
+        The config for a repo not listed by name, or None. `topics` returns
+        the repo's topics, and is only called if there are topic selectors.
+        '''
+        index = self.name_index(name)
+        if index == NO_MATCH and self.topics:
+            index = min(
+                (self.topics.get(topic, NO_MATCH) for topic in topics()),
+                default=NO_MATCH
+            )
+        return None if index == NO_MATCH else self.rules[index][1]
+
+    def may_match(self, name):
+        # before the repo's topics are known
+        return bool(self.topics) or self.name_index(name) != NO_MATCH
+
+    def name_index(self, name):
+        return min(self.prefix_index(name), self.pattern_index(name))
+
+    def prefix_index(self, name):
+        node, found = self.trie, NO_MATCH
+        for char in name:
+            found = min(found, node.get(None, NO_MATCH))
+            node = node.get(char)
+            if node is None:
+                return found
+        return min(found, node.get(None, NO_MATCH))
+
+    def pattern_index(self, name):
+        # the outermost group is the last to close, so it names the
+        # alternative (and so the selector) that matched
+        match = self.regex.fullmatch(name)
+        index = NO_MATCH if match is None else int(match.lastgroup[1:])
+        return min([index] + [
+            i for i, regex in self.separate if regex.fullmatch(name)
+        ])
+
+
+ADD = {
+    'prefix': RepoMatcher.add_prefix,
+    'glob': RepoMatcher.add_glob,
+    'regex': RepoMatcher.add_regex,
+    'topic': RepoMatcher.add_topic,
+}
+
+
+def selector_problem(kind, value):
+    '''
+    What is wrong with a selector, or None.
+    '''
+    if kind not in SELECTOR_KINDS:
+        return f'unknown selector {kind} - expected one of ' + \
+            ', '.join(SELECTOR_KINDS)
+    if not isinstance(value, str) or not value:
+        return f'{kind} selector should be a non-empty string'
+    if kind == 'regex':
+        return regex_problem(value)
+    return None
+
+
+def regex_problem(regex):
+    try:
+        re.compile(regex)
+        # as it is, once combined with the others
+        re.compile(f'(?:{regex})')
+    except re.error as e:
+        return f'invalid regex {regex}: {e}'
+    return None
+
+
+def repo_config(access_config, repo):
+    '''
+    The config for a repo, listed by name or (in an AccessConfig) selected.
+    '''
+    config = access_config.get(repo.name)
+    if config is None and isinstance(access_config, AccessConfig):
+        config = access_config.matcher.match(repo.name, lambda: repo.topics)
+    return config
+
+
+def may_select(access_config, repo_name):
+    '''
+    Whether a repo might have a config, before its topics are known.
+    '''
+    if repo_name in access_config:
+        return True
+    return isinstance(access_config, AccessConfig) and \
+        access_config.matcher.may_match(repo_name)
+
+
+def selected_by_name(access_config, repo_names):
+    '''
+    The config of each of the repos listed or selected by name (topics are
+    not known).
+    '''
+    selected = dict(access_config)
+    if isinstance(access_config, AccessConfig):
+        unlisted = (name for name in repo_names if name not in selected)
+        for name in unlisted:
+            config = access_config.matcher.match(name, list)
+            if config is not None:
+                selected[name] = config
+    return selected
+
+
+def config_json(access_config):
+    '''
+    The access config as JSON, including any selectors.
+    '''
+    if not isinstance(access_config, AccessConfig) or \
+            not access_config.matcher.rules:
+        return access_config
+    return {
+        'repos': access_config,
+        'match': [
+            dict(selector, teams=config['teams'])
+            for selector, config in access_config.matcher.rules
+        ],
+    }
@@ -0,0 +1,184 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .cli import SWEEP_INTERVAL
+from .github import create_app, stop, write_metrics
+
+# Webhook events that can change which teams have access to a repo.
+EVENTS = {'team', 'team_add', 'member', 'repository'}
+
+
+class Reconciler:
+    '''
+    Reconciles the repos named by webhook events as they arrive, and every
+    repo in a full sweep every `sweep_interval` seconds.
+
+    Events are queued and handled by a single worker, which keeps the App
+    (and so the teams and permissions it has read) between reconciliations.
+    Queued repos always go before a due sweep. An event for a team rather
+    than a repo (e.g. a team being renamed or deleted) drops the teams
+    resolved so far and brings the sweep forward.
+    '''
+
+    def __init__(
+        self, app, access_config, sweep_interval=SWEEP_INTERVAL,
+        clock=time.monotonic
+    ):
+        self.app = app
+        self.access_config = access_config
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self.repos = set()
+        self.teams_changed = False
+        self.next_sweep = clock()
+        self.condition = threading.Condition()
+
+    def handle(self, event, payload):
+        '''
+        Queues the work for a webhook event, returning whether it is one
+        that is acted on.
+        '''
+        if event not in EVENTS or not self.for_org(payload):
+            return False
+        repository = payload.get('repository')
+        with self.condition:
+            if repository is not None:
+                self.repos.add(repository['name'])
+            elif event == 'team':
+                self.teams_changed = True
+                self.next_sweep = self.clock()
+            self.condition.notify()
+        return True
+
+    def for_org(self, payload):
+        org = payload.get('organization') or {}
+        return org.get('login') == self.app.org_name
+
+    def run_forever(self):
+        while True:
+            self.step()
+
+    def step(self, timeout=None):
+        repos, teams_changed = self.next_work(timeout)
+        try:
+            if teams_changed:
+                self.app.forget_teams()
+            self.reconcile(repos)
+        except Exception as e:
+            self.app.on_error(f'reconciliation failed: {e}')
+
+    def reconcile(self, repos):
+        if repos is None:
+            self.app.run(self.access_config)
+        elif repos:
+            self.app.reconcile_repos(self.access_config, repos)
+
+    def next_work(self, timeout):
+        '''
+        Waits for queued repos or a due sweep, returning the repos to
+        reconcile (None for a sweep) and whether teams have changed.
+        '''
+        deadline = None if timeout is None else self.clock() + timeout
+        with self.condition:
+            while not self.ready() and not expired(deadline, self.clock()):
+                self.condition.wait(self.wait_time(deadline))
+            return self.take_work()
+
+    def ready(self):
+        return bool(self.repos) or self.clock() >= self.next_sweep
+
+    def wait_time(self, deadline):
+        wait = self.next_sweep - self.clock()
+        return wait if deadline is None else min(wait, deadline - self.clock())
+
+    def take_work(self):
+        teams_changed, self.teams_changed = self.teams_changed, False
+        if self.repos:
+            repos, self.repos = sorted(self.repos), set()
+            return repos, teams_changed
+        if self.clock() >= self.next_sweep:
+            self.next_sweep = self.clock() + self.sweep_interval
+            return None, teams_changed
+        return [], teams_changed
+
+
+def expired(deadline, now):
+    return deadline is not None and now >= deadline
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    '''
+    Accepts webhook deliveries, verifying their signature when there is a
+    secret, and passes them to a Reconciler.
+    '''
+    reconciler = None
+    secret = None
+
+    def do_GET(self):
+        self.respond(200, 'ok')
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not signature_valid(
+            self.secret, body, self.headers.get('X-Hub-Signature-256')
+        ):
+            return self.respond(401, 'invalid signature')
+        if self.reconciler.handle(
+            self.headers.get('X-GitHub-Event'), json.loads(body)
+        ):
+            self.respond(202, 'queued')
+        else:
+            self.respond(200, 'ignored')
+
+    def respond(self, status, message):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.end_headers()
+        self.wfile.write(message.encode('utf-8') + b'\n')
+
+    def log_message(self, format, *args):
+        logging.debug(format, *args)
+
+
+def webhook_handler(reconciler, secret):
+    return type('WebhookHandler', (WebhookHandler,), {
+        'reconciler': reconciler, 'secret': secret
+    })
+
+
+def signature_valid(secret, body, signature):
+    if secret is None:
+        return True
+    expected = 'sha256=' + hmac.new(
+        secret.encode('utf-8'), body, hashlib.sha256
+    ).hexdigest()
+    return signature is not None and hmac.compare_digest(expected, signature)
+
+
+def serve(arguments, handle_error):
+    app = create_app(arguments, arguments.org, arguments.team, handle_error)
+    reconciler = Reconciler(
+        app, arguments.access_config, arguments.sweep_interval
+    )
+    server = ThreadingHTTPServer(
+        (arguments.host, arguments.port), webhook_handler(
+            reconciler, os.environ.get('GITHUB_WEBHOOK_SECRET')
+        )
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    signal.signal(signal.SIGTERM, stop)
+    logging.info(
+        f'listening for webhooks on {arguments.host}:{arguments.port}'
+    )
+    try:
+        reconciler.run_forever()
+    finally:
+        server.shutdown()
+        write_metrics(app.metrics, arguments)
@@ -0,0 +1,83 @@
+'''
+Splitting the repos of a run between several jobs, and combining the jobs'
+results afterwards.
+'''
+import hashlib
+import json
+from collections import namedtuple
+
+
+class Shard(namedtuple('Shard', ['index', 'count'])):
+    '''
+    Slice `index` (from 1) of `count` disjoint slices of an org's repos.
+
+    A repo's slice depends only on its name, so every job given the same
+    count agrees on it.
+    '''
+
+    def __contains__(self, repo_name):
+        return shard_index(repo_name, self.count) == self.index
+
+    def __str__(self):
+        return f'{self.index}/{self.count}'
+
+
+def shard_index(repo_name, count):
+    digest = hashlib.sha256(repo_name.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def write_result(f, shard, changes, errors, metrics):
+    json.dump({
+        'shard': None if shard is None else str(shard),
+        'changes': changes,
+        'requests': sum(
+            request['count'] for request in metrics.summary()['requests']
+        ),
+        'errors': errors,
+    }, f, indent=2, sort_keys=True)
+    f.write('\n')
+
+
+def merge_results(results):
+    return {
+        'shards': sorted(
+            (result['shard'] for result in results if result['shard']),
+            key=parse_shard
+        ),
+        'changes': sum(result['changes'] for result in results),
+        'requests': sum(result['requests'] for result in results),
+        'errors': [error for result in results for error in result['errors']],
+    }
+
+
+def missing_shards(shard_names):
+    shards = {parse_shard(name) for name in shard_names}
+    return sorted(
+        {
+            Shard(index, count) for count in {shard.count for shard in shards}
+            for index in range(1, count + 1)
+        } - shards
+    )
+
+
+def parse_shard(value):
+    index, count = value.split('/')
+    return Shard(int(index), int(count))
+
+
+def load_result(path):
+    with open(path, 'r') as f:
+        return json.loads(f.read())
+
+
+def merge(arguments, handle_error):
+    merged = merge_results([load_result(path) for path in arguments.results])
+    for shard in missing_shards(merged['shards']):
+        handle_error(f'no result for shard {shard}')
+    for error in merged['errors']:
+        handle_error(error)
+    if arguments.out is not None:
+        with open(arguments.out, 'w') as f:
+            json.dump(merged, f, indent=2, sort_keys=True)
+            f.write('\n')
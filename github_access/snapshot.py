@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+
+
+class Snapshot:
+    '''
+    The state of each repo as of the last run that reconciled it cleanly.
+
+    A repo is considered current, and is not read or reconciled again, while
+    its config and its updated_at/pushed_at timestamps are unchanged.
+    '''
+
+    def __init__(self, repos=None):
+        self.repos = {} if repos is None else repos
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r') as f:
+            return cls(json.loads(f.read())['repos'])
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'repos': self.repos}, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    def is_current(self, repo, repo_access_config):
+        entry = self.repos.get(repo.name)
+        return entry is not None and \
+            entry == dict(entry, **repo_state(repo, repo_access_config))
+
+    def update(self, repo, repo_access_config, succeeded):
+        if succeeded:
+            self.repos[repo.name] = dict(
+                repo_state(repo, repo_access_config),
+                teams=repo_access_config['teams']
+            )
+        else:
+            self.repos.pop(repo.name, None)
+
+    def forget(self, repo_name):
+        self.repos.pop(repo_name, None)
+
+    def retain(self, repo_names):
+        for name in set(self.repos) - set(repo_names):
+            del self.repos[name]
+
+
+def repo_state(repo, repo_access_config):
+    return {
+        'config': config_hash(repo_access_config),
+        'updated_at': timestamp(repo.updated_at),
+        'pushed_at': timestamp(repo.pushed_at),
+    }
+
+
+def config_hash(repo_access_config):
+    return hashlib.sha256(
+        json.dumps(repo_access_config, sort_keys=True).encode('utf-8')
+    ).hexdigest()
+
+
+def timestamp(value):
+    return None if value is None else value.isoformat()
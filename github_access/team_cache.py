@@ -0,0 +1,63 @@
+'''
+The teams cache, kept apart from the team directory (and PyGithub) so that
+validate can read it without importing either.
+'''
+import json
+import os
+import time
+
+TEAM_CACHE_TTL = 3600
+
+# The key in a teams cache under which the time every team in each org was
+# listed is kept (org logins cannot contain underscores).
+LISTED = '_listed'
+
+
+class TeamCache:
+    '''
+    Team ids, names and slugs by org, saved to a JSON file. Entries older
+    than `ttl` seconds are ignored, so renamed or deleted teams drop out.
+    '''
+
+    def __init__(self, path, ttl=TEAM_CACHE_TTL, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self.orgs = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.orgs = json.loads(f.read())
+
+    def get(self, org_name, name):
+        entry = self.orgs.get(org_name, {}).get(name)
+        if entry is None or self.clock() - entry['time'] > self.ttl:
+            return None
+        return entry['team']
+
+    def put(self, org_name, teams_by_name, listed=False):
+        '''
+        Stores teams found by name. `listed` is set when they are every team
+        in the org, rather than some looked up individually.
+        '''
+        now = self.clock()
+        self.orgs.setdefault(org_name, {}).update(
+            (name, {'time': now, 'team': raw})
+            for name, raw in teams_by_name.items()
+        )
+        if listed:
+            self.orgs.setdefault(LISTED, {})[org_name] = now
+        with open(self.path, 'w') as f:
+            json.dump(self.orgs, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    def known_teams(self, org_name):
+        '''
+        The names and slugs of every team stored for an org, however old,
+        or None if its teams have never all been listed.
+        '''
+        if org_name not in self.orgs.get(LISTED, {}):
+            return None
+        return frozenset(self.orgs[org_name]) | frozenset(
+            entry['team'][key] for entry in self.orgs[org_name].values()
+            for key in ('name', 'slug')
+        )
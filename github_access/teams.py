@@ -0,0 +1,121 @@
+import re
+
+from github import UnknownObjectException
+from github.Team import Team
+
+from .hierarchy import TeamHierarchy
+
+# After this many teams have had to be looked up individually it is cheaper
+# to list every team in the org (up to 100 per request).
+MAX_LOOKUPS = 20
+
+
+class TeamDirectory:
+    '''
+    Resolves an org's teams by name or slug as they are needed, rather than
+    listing every team up front.
+
+    A name is first looked up by the slug GitHub would derive from it. If
+    that finds nothing (slugs are not always derivable from names), or after
+    MAX_LOOKUPS individual lookups, every team in the org is listed once.
+    Resolved teams can be kept in a TeamCache between runs.
+    '''
+
+    def __init__(self, github, org, scheduler, metrics, cache=None):
+        self.github = github
+        self.org = org
+        self.scheduler = scheduler
+        self.metrics = metrics
+        self.cache = cache
+        self.teams = {}
+        self.lookups = 0
+        self.listed = False
+        self.all_teams = []
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def get(self, name):
+        if name not in self.teams:
+            with self.metrics.phase('team load'):
+                self.teams[name] = self.resolve(name)
+        return self.teams[name]
+
+    def resolve(self, name):
+        team = self.cached(name) or self.lookup(name)
+        if team is None and not self.listed:
+            self.list_teams()
+            team = self.teams.get(name)
+        return team
+
+    def cached(self, name):
+        if self.cache is None:
+            return None
+        raw = self.cache.get(self.org.login, name)
+        return raw and self.github.create_from_raw_data(Team, dict(
+            raw, organization={'login': self.org.login, 'url': self.org.url}
+        ))
+
+    def all(self):
+        '''
+        Every team in the org, listing them if that has not been done yet.
+        '''
+        if not self.listed:
+            with self.metrics.phase('team load'):
+                self.list_teams()
+        return self.all_teams
+
+    def hierarchy(self):
+        return TeamHierarchy(self.all())
+
+    def lookup(self, name):
+        if self.listed or self.lookups >= MAX_LOOKUPS:
+            return None
+        self.lookups += 1
+        team = self.find_by_slug(slug(name))
+        if team is None or name not in (team.name, team.slug):
+            return None
+        self.store([team], [name])
+        return team
+
+    def find_by_slug(self, team_slug):
+        try:
+            return self.scheduler.call(self.org.get_team_by_slug, team_slug)
+        except UnknownObjectException:
+            return None
+
+    def list_teams(self):
+        teams = self.scheduler.call(lambda: list(self.org.get_teams()))
+        self.listed = True
+        self.all_teams = teams
+        self.store(teams, [team.name for team in teams], listed=True)
+        self.teams.update((team.name, team) for team in teams)
+        self.teams.update((team.slug, team) for team in teams)
+
+    def store(self, teams, names, listed=False):
+        if self.cache is not None:
+            self.cache.put(self.org.login, dict(
+                (name, team_raw(team)) for name, team in zip(names, teams)
+            ), listed)
+
+
+def set_repo_permission(team, repo_full_name, permission):
+    '''
+    Gives the team a permission on a repo, raising GithubException if that
+    fails. Team.update_team_repository returns False instead (so rate limits
+    are not retried either), and Team.set_repo_permission is deprecated.
+    '''
+    team.requester.requestJsonAndCheck(
+        'PUT', f'{team.url}/repos/{repo_full_name}',
+        input={'permission': permission}
+    )
+
+
+def team_raw(team):
+    return {
+        'id': team.id, 'name': team.name, 'slug': team.slug, 'url': team.url
+    }
+
+
+def slug(name):
+    return re.sub(r'[^a-z0-9_]+', '-', name.lower()).strip('-')
@@ -0,0 +1,90 @@
+'''
+Offline validation of access files, for rejecting bad configs in CI without
+a GitHub token or any API calls.
+'''
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from .access import read_access_config
+from .team_cache import TeamCache
+
+
+def validate_file(path, main_team, known_teams=None):
+    '''
+    Returns the problems found in an access file: the first error reading
+    it, or else every team it names that is not in `known_teams` (when
+    given).
+    '''
+    try:
+        access_config = read_file(path, main_team)
+    except Exception as e:
+        return [str(e)]
+    return [
+        f'{path}: unknown team {team}'
+        for team in config_teams(access_config)
+        if known_teams is not None and team not in known_teams
+    ]
+
+
+def read_file(path, main_team):
+    try:
+        with open(path, 'r') as f:
+            return read_access_config(f, main_team, path)
+    except OSError as e:
+        raise Exception(f'{path}: {e.strerror}')
+
+
+def config_teams(access_config):
+    teams = set()
+    for repo_access_config in access_config.configs():
+        teams.update(repo_access_config['teams'])
+    return sorted(teams)
+
+
+def load_known_teams(path, org_name):
+    '''
+    The names and slugs of an org's teams in a teams cache, which has to
+    have listed every team in the org: teams looked up individually as a
+    run needed them would leave out teams other access files name.
+    '''
+    known_teams = TeamCache(path).known_teams(org_name)
+    if known_teams is None:
+        raise Exception(
+            f'teams cache {path} has not listed every team in org {org_name}'
+        )
+    return known_teams
+
+
+def validate_files(paths, main_team, known_teams, concurrency):
+    '''
+    Yields the problems found in each access file, in order. Files are
+    validated in up to `concurrency` processes.
+    '''
+    if concurrency <= 1:
+        yield from (
+            validate_file(path, main_team, known_teams) for path in paths
+        )
+        return
+    with ProcessPoolExecutor(concurrency) as executor:
+        yield from executor.map(
+            validate_file, paths, [main_team] * len(paths),
+            [known_teams] * len(paths)
+        )
+
+
+def validate(arguments, handle_error):
+    known_teams = None
+    if arguments.teams_cache is not None:
+        known_teams = load_known_teams(arguments.teams_cache, arguments.org)
+    results = validate_files(
+        arguments.access, arguments.team, known_teams, arguments.concurrency
+    )
+    for path, problems in zip(arguments.access, results):
+        report_problems(path, problems, handle_error)
+
+
+def report_problems(path, problems, handle_error):
+    for problem in problems:
+        handle_error(problem)
+    if not problems:
+        logging.info(f'{path} is valid')
@@ -0,0 +1,392 @@
+'''
+A local stand-in for the parts of the GitHub API that github_access uses.
+
+It serves the REST endpoints PyGithub calls for teams, repos and team repo
+permissions (with Link header pagination, ETags and rate limit headers), and
+answers the GraphQL queries made by GraphQLStateLoader. Requests can be
+slowed down with a fixed latency, and the primary rate limit is enforced,
+so reconciliation can be measured end to end without touching GitHub.
+'''
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+PERMISSIONS = ['pull', 'triage', 'push', 'maintain', 'admin']
+
+GRAPHQL_PERMISSIONS = {
+    'pull': 'READ',
+    'triage': 'TRIAGE',
+    'push': 'WRITE',
+    'maintain': 'MAINTAIN',
+    'admin': 'ADMIN',
+}
+
+TIMESTAMP = '2020-01-01T00:00:00Z'
+
+
+class FakeOrg:
+    def __init__(self, login):
+        self.login = login
+        self.teams = {}
+        self.repos = {}
+        self.permissions_by_team = defaultdict(dict)
+        self.permissions_by_repo = defaultdict(dict)
+        self.lock = threading.Lock()
+
+    def add_team(self, name, parent=None):
+        slug = name.lower().replace(' ', '-')
+        self.teams[slug] = {
+            'id': len(self.teams) + 1, 'name': name, 'slug': slug,
+            'parent': parent,
+        }
+        return slug
+
+    def add_repo(self, name, archived=False, topics=()):
+        self.repos[name] = {
+            'name': name, 'archived': archived, 'topics': list(topics)
+        }
+
+    def grant(self, team_slug, repo_name, permission):
+        with self.lock:
+            self.permissions_by_team[team_slug][repo_name] = permission
+            self.permissions_by_repo[repo_name][team_slug] = permission
+
+    def revoke(self, team_slug, repo_name):
+        with self.lock:
+            self.permissions_by_team[team_slug].pop(repo_name, None)
+            self.permissions_by_repo[repo_name].pop(team_slug, None)
+
+    def team_by_id(self, team_id):
+        return list(self.teams.values())[team_id - 1]
+
+    def team_repos(self, team_slug):
+        return [
+            (self.repos[repo], permission)
+            for repo, permission
+            in sorted(self.permissions_by_team[team_slug].items())
+        ]
+
+    def repo_teams(self, repo_name):
+        return [
+            (self.teams[slug], permission)
+            for slug, permission
+            in sorted(self.permissions_by_repo[repo_name].items())
+        ]
+
+
+class FakeGitHub:
+    '''
+    Serves a FakeOrg over HTTP on a free local port.
+
+    `requests` counts every request by (method, route), and `not_modified`
+    counts those answered with 304 Not Modified.
+    '''
+
+    def __init__(self, org, latency=0.0, rate_limit=1000000, reset_after=60):
+        self.org = org
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.reset_after = reset_after
+        self.remaining = rate_limit
+        self.reset_time = time.time() + reset_after
+        self.requests = Counter()
+        self.not_modified = 0
+        # (status, data) answering changes to these repos' team permissions
+        self.write_failures = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler(self))
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        self.routes = [
+            ('GET', r'/orgs/([^/]+)', self.get_org),
+            ('GET', r'/orgs/([^/]+)/teams', self.get_org_teams),
+            ('GET', r'/orgs/([^/]+)/teams/([^/]+)', self.get_team_by_slug),
+            ('GET', r'/teams/(\d+)/repos', self.get_team_repos),
+            ('PUT', r'/teams/(\d+)/repos/([^/]+)/([^/]+)',
+             self.put_team_repo),
+            ('DELETE', r'/teams/(\d+)/repos/([^/]+)/([^/]+)',
+             self.delete_team_repo),
+            ('PUT', r'/orgs/([^/]+)/teams/([^/]+)/repos/([^/]+)/([^/]+)',
+             self.put_org_team_repo),
+            ('DELETE', r'/orgs/([^/]+)/teams/([^/]+)/repos/([^/]+)/([^/]+)',
+             self.delete_org_team_repo),
+            ('GET', r'/repos/([^/]+)/([^/]+)', self.get_repo),
+            ('GET', r'/repos/([^/]+)/([^/]+)/teams', self.get_repo_teams),
+            ('GET', r'/rate_limit', self.get_rate_limit),
+            ('POST', r'/graphql', self.graphql),
+        ]
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def request_count(self):
+        return sum(self.requests.values())
+
+    def route(self, method, path):
+        for route_method, pattern, fn in self.routes:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                return pattern, fn, match.groups()
+        return path, None, ()
+
+    def count(self, method, route):
+        with self.lock:
+            self.requests[(method, route)] += 1
+
+    def take_budget(self):
+        with self.lock:
+            if time.time() >= self.reset_time:
+                self.remaining = self.rate_limit
+                self.reset_time = time.time() + self.reset_after
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def refund(self):
+        # conditional requests answered with 304 are free
+        with self.lock:
+            self.not_modified += 1
+            self.remaining += 1
+
+    def rate_limit_headers(self):
+        return {
+            'X-RateLimit-Limit': str(self.rate_limit),
+            'X-RateLimit-Remaining': str(self.remaining),
+            'X-RateLimit-Reset': str(int(self.reset_time)),
+        }
+
+    def org_json(self):
+        return {
+            'login': self.org.login, 'id': 1,
+            'url': f'{self.url}/orgs/{self.org.login}',
+        }
+
+    def team_json(self, team, permission=None):
+        return {
+            'id': team['id'], 'name': team['name'], 'slug': team['slug'],
+            'url': f'{self.url}/teams/{team["id"]}',
+            'permission': permission,
+            'parent': None if team['parent'] is None else self.team_json(
+                self.org.teams[team['parent']]
+            ),
+            'organization': self.org_json(),
+        }
+
+    def repo_json(self, repo, permission='admin'):
+        level = PERMISSIONS.index(permission)
+        return {
+            'name': repo['name'],
+            'full_name': f'{self.org.login}/{repo["name"]}',
+            'owner': {'login': self.org.login},
+            'url': f'{self.url}/repos/{self.org.login}/{repo["name"]}',
+            'archived': repo['archived'],
+            'topics': repo['topics'],
+            'updated_at': TIMESTAMP,
+            'pushed_at': TIMESTAMP,
+            'permissions': {
+                name: level >= PERMISSIONS.index(name)
+                for name in PERMISSIONS
+            },
+        }
+
+    def get_org(self, query, body, org):
+        return 200, self.org_json()
+
+    def get_org_teams(self, query, body, org):
+        return 200, [self.team_json(team) for team in self.org.teams.values()]
+
+    def get_team_by_slug(self, query, body, org, slug):
+        if slug not in self.org.teams:
+            return 404, {'message': 'Not Found'}
+        return 200, self.team_json(self.org.teams[slug])
+
+    def get_team_repos(self, query, body, team_id):
+        team = self.org.team_by_id(int(team_id))
+        return 200, [
+            self.repo_json(repo, permission)
+            for repo, permission in self.org.team_repos(team['slug'])
+        ]
+
+    def get_repo(self, query, body, owner, name):
+        return 200, self.repo_json(self.org.repos[name])
+
+    def get_repo_teams(self, query, body, owner, name):
+        return 200, [
+            self.team_json(team, permission)
+            for team, permission in self.org.repo_teams(name)
+        ]
+
+    def put_team_repo(self, query, body, team_id, owner, name):
+        team = self.org.team_by_id(int(team_id))
+        return self.team_repo_write(name, lambda: self.org.grant(
+            team['slug'], name, body.get('permission', 'pull')
+        ))
+
+    def delete_team_repo(self, query, body, team_id, owner, name):
+        team = self.org.team_by_id(int(team_id))
+        return self.team_repo_write(
+            name, lambda: self.org.revoke(team['slug'], name)
+        )
+
+    def put_org_team_repo(self, query, body, org, slug, owner, name):
+        return self.team_repo_write(name, lambda: self.org.grant(
+            slug, name, body.get('permission', 'pull')
+        ))
+
+    def delete_org_team_repo(self, query, body, org, slug, owner, name):
+        return self.team_repo_write(
+            name, lambda: self.org.revoke(slug, name)
+        )
+
+    def team_repo_write(self, repo_name, write):
+        if repo_name in self.write_failures:
+            return self.write_failures[repo_name]
+        write()
+        return 204, None
+
+    def get_rate_limit(self, query, body):
+        rate = {
+            'limit': self.rate_limit, 'remaining': self.remaining,
+            'reset': int(self.reset_time), 'used': 0,
+        }
+        return 200, {'resources': {'core': rate}, 'rate': rate}
+
+    def graphql(self, query, body):
+        variables = body['variables']
+        if 'team' in variables:
+            connection = self.graphql_team_repos(
+                variables['team'], variables['cursor']
+            )
+            data = {'team': {'repositories': connection}}
+        else:
+            data = {'teams': self.graphql_teams(variables['cursor'])}
+        return 200, {'data': {'organization': data}}
+
+    def graphql_teams(self, cursor):
+        teams, page_info = graphql_page(
+            list(self.org.teams.values()), cursor, 50
+        )
+        return {'pageInfo': page_info, 'nodes': [
+            {
+                'name': team['name'], 'slug': team['slug'],
+                'repositories': self.graphql_team_repos(team['slug'], None),
+            }
+            for team in teams
+        ]}
+
+    def graphql_team_repos(self, slug, cursor):
+        repos, page_info = graphql_page(self.org.team_repos(slug), cursor, 100)
+        return {'pageInfo': page_info, 'edges': [
+            {
+                'permission': GRAPHQL_PERMISSIONS[permission],
+                'node': {
+                    'name': repo['name'],
+                    'nameWithOwner': f'{self.org.login}/{repo["name"]}',
+                    'isArchived': repo['archived'],
+                    'updatedAt': TIMESTAMP,
+                    'pushedAt': TIMESTAMP,
+                    'repositoryTopics': {'nodes': [
+                        {'topic': {'name': topic}}
+                        for topic in repo['topics']
+                    ]},
+                },
+            }
+            for repo, permission in repos
+        ]}
+
+
+def graphql_page(items, cursor, size):
+    start = 0 if cursor is None else int(cursor)
+    end = start + size
+    return items[start:end], {
+        'hasNextPage': end < len(items), 'endCursor': str(end),
+    }
+
+
+def rest_page(fake, path, query, items):
+    page = int(query.get('page', ['1'])[0])
+    per_page = min(int(query.get('per_page', ['30'])[0]), 100)
+    start = (page - 1) * per_page
+    headers = {}
+    if start + per_page < len(items):
+        next_query = urlencode({'page': page + 1, 'per_page': per_page})
+        headers['Link'] = f'<{fake.url}{path}?{next_query}>; rel="next"'
+    return items[start:start + per_page], headers
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_PUT(self):
+        self.handle_request('PUT')
+
+    def do_DELETE(self):
+        self.handle_request('DELETE')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_request(self, method):
+        time.sleep(self.fake.latency)
+        url = urlparse(self.path)
+        route, fn, args = self.fake.route(method, url.path)
+        self.fake.count(method, route)
+        body = self.read_body()
+        if fn is None:
+            return self.respond(404, {'message': 'Not Found'})
+        if not self.fake.take_budget():
+            return self.respond(403, {
+                'message': 'API rate limit exceeded for user.'
+            })
+        query = parse_qs(url.query)
+        status, data = fn(query, body, *args)
+        self.respond_with_data(url.path, query, status, data)
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or 'null') or {}
+
+    def respond_with_data(self, path, query, status, data):
+        headers = {}
+        if isinstance(data, list):
+            data, headers = rest_page(self.fake, path, query, data)
+        self.respond(status, data, headers)
+
+    def respond(self, status, data, headers={}):
+        body = b'' if data is None else json.dumps(data).encode('utf-8')
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.fake.refund()
+            status, body = 304, b''
+        self.send_response(status)
+        for name, value in dict(
+            headers, ETag=etag, **self.fake.rate_limit_headers()
+        ).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def handler(fake):
+    return type('Handler', (Handler,), {'fake': fake})
@@ -1,8 +1,16 @@
+import io
 import unittest
 from unittest.mock import Mock, patch, mock_open, ANY
 import json
+from datetime import datetime, timezone
+
+from github import GithubException
 
 import github_access.github
+from github_access.access import read_access_config
+from github_access.cli import parse_command
+from github_access.plan import Change
+from github_access.snapshot import Snapshot
 
 
 class TestArgs(unittest.TestCase):
@@ -13,7 +21,7 @@ class TestArgs(unittest.TestCase):
         # given
         access = [{'repos': ['test'], 'teams': {}}]
         with patch(
-            'github_access.github.open',
+            'github_access.access.open',
             mock_open(read_data=json.dumps(access)),
             create=True
         ) as mocked_open:
@@ -22,27 +30,34 @@ class TestArgs(unittest.TestCase):
                 {'GITHUB_TOKEN': 'test-github-token'}
             ):
                 # when
-                github_access.github.repo_access([
+                _, arguments = parse_command([
                     '--org', 'test-org',
                     '--team', 'test-team',
                     '--access', 'test-file.json'
-                ], 'test-github-token')
+                ])
+                github_access.github.repo_access(
+                    arguments, 'test-github-token'
+                )
 
             # then
             App.assert_called_once_with(
-                'test-org', 'test-team', 'test-github-token', ANY
+                'test-org', 'test-team', 'test-github-token', ANY,
+                concurrency=1, graphql=False, cache_dir=None,
+                base_url='https://api.github.com', use_asyncio=False,
+                write_concurrency=1, write_interval=1.0, shard=None,
+                team_hierarchy=False, reads='repo'
             )
             mocked_open.assert_called_once_with('test-file.json', 'r')
             App.return_value.run.assert_called_once_with({
                 'test': {'teams': {}}
-            })
+            }, None, ANY)
 
 
 class TestFormatConversion(unittest.TestCase):
 
     def test_array_conversion(self):
         self.assertEqual(
-            github_access.github.convert_access_config([
+            read_access_config(io.StringIO(json.dumps([
                 {
                     'teams': {'team-a': 'pull', 'team-b': 'push'},
                     'repos': ['repo-a', 'repo-b']
@@ -51,7 +66,7 @@ class TestFormatConversion(unittest.TestCase):
                     'teams': {'team-c': 'pull'},
                     'repos': ['repo-c']
                 }
-            ], 'test-main-team'),
+            ])), 'test-main-team'),
             {
                 'repo-a': {
                     'teams': {'team-a': 'pull', 'team-b': 'push'}
@@ -84,7 +99,9 @@ class TestApp(unittest.TestCase):
         self.test_pull_team = Mock()
         self.test_push_team.name = 'test-pull-team'
 
-        github = Github.return_value
+        github = self.github = Github.return_value
+        github.requester.rate_limiting = (5000, 5000)
+        github.requester.rate_limiting_resettime = 0
 
         self.org = github.get_organization.return_value
         self.org.get_teams.return_value = [
@@ -99,10 +116,38 @@ class TestApp(unittest.TestCase):
         self.app = github_access.github.App(
             org_name, self.main_team.name, github_token, handle_error
         )
-        Github.assert_called_once_with(github_token)
+        Github.assert_called_once_with(
+            auth=ANY, pool_size=1, base_url='https://api.github.com',
+            retry=None, seconds_between_requests=None,
+            seconds_between_writes=None
+        )
+        assert Github.call_args.kwargs['auth'].token == github_token
+        self.app.scheduler.write_interval = 0.0
         github.get_organization.assert_called_once_with(org_name)
         self.org.get_teams.assert_called_once_with()
 
+    def set_repos(self, repos):
+        # the main team's repos are listed as JSON, and only those it
+        # administers are turned into repo objects
+        self.github.requester.requestJsonAndCheck.return_value = ({}, [
+            {
+                'name': repo.name, 'full_name': f'test-org/{repo.name}',
+                'owner': {'login': 'test-org'}, 'url': None,
+                'archived': repo.archived,
+                'permissions': {'admin': repo.permissions.admin},
+                'updated_at': None, 'pushed_at': None,
+            }
+            for repo in repos
+        ])
+        repos_by_name = {repo.name: repo for repo in repos}
+        self.github.create_from_raw_data.side_effect = \
+            lambda _, raw: repos_by_name[raw['name']]
+
+    def assert_repos_listed(self):
+        self.github.requester.requestJsonAndCheck.assert_called_once_with(
+            'GET', f'{self.main_team.url}/repos', {'per_page': 100}
+        )
+
     def test_additional_team_permissions(self):
 
         # given
@@ -119,7 +164,7 @@ class TestApp(unittest.TestCase):
 
         repo.get_teams.return_value = [main_team_repo_access]
 
-        self.main_team.get_repos.return_value = [repo]
+        self.set_repos([repo])
 
         # when
         self.app.run({
@@ -133,7 +178,7 @@ class TestApp(unittest.TestCase):
         })
 
         # then
-        self.main_team.get_repos.assert_called_once_with()
+        self.assert_repos_listed()
         repo.get_teams.assert_called_once_with()
         self.test_admin_team.set_repo_permission.called_once_with(
             repo, 'admin'
@@ -176,7 +221,7 @@ class TestApp(unittest.TestCase):
             push_team_repo_access, pull_team_repo_access
         ]
 
-        self.main_team.get_repos.return_value = [repo]
+        self.set_repos([repo])
 
         # when
         self.app.run({
@@ -191,7 +236,7 @@ class TestApp(unittest.TestCase):
         })
 
         # then
-        self.main_team.get_repos.assert_called_once_with()
+        self.assert_repos_listed()
         repo.get_teams.assert_called_once_with()
         self.test_admin_team.set_repo_permission.called_once_with(repo, 'push')
         self.test_push_team.set_repo_permission.called_once_with(repo, 'pull')
@@ -232,7 +277,7 @@ class TestApp(unittest.TestCase):
             push_team_repo_access, pull_team_repo_access
         ]
 
-        self.main_team.get_repos.return_value = [repo]
+        self.set_repos([repo])
 
         # when
         self.app.run({
@@ -243,7 +288,7 @@ class TestApp(unittest.TestCase):
         })
 
         # then
-        self.main_team.get_repos.assert_called_once_with()
+        self.assert_repos_listed()
         repo.get_teams.assert_called_once_with()
         self.test_admin_team.remove_from_repos.called_once_with(repo)
         self.test_push_team.remove_from_repos.called_once_with(repo)
@@ -265,7 +310,7 @@ class TestApp(unittest.TestCase):
 
         repo.get_teams.return_value = [main_team_repo_access]
 
-        self.main_team.get_repos.return_value = [repo]
+        self.set_repos([repo])
 
         # when
         self.app.run({})
@@ -287,13 +332,13 @@ class TestApp(unittest.TestCase):
         repo.permissions.admin = False
         repo.permissions.push = False
         repo.permissions.pull = True
-        self.main_team.get_repos.return_value = [repo]
+        self.set_repos([repo])
 
         # when
         self.app.run({})
 
         # then
-        self.main_team.get_repos.assert_called_once_with()
+        self.assert_repos_listed()
         repo.get_teams.assert_not_called()
 
     def test_push_repo_ignored(self):
@@ -307,13 +352,13 @@ class TestApp(unittest.TestCase):
         repo.permissions.admin = False
         repo.permissions.push = True
         repo.permissions.pull = True
-        self.main_team.get_repos.return_value = [repo]
+        self.set_repos([repo])
 
         # when
         self.app.run({})
 
         # then
-        self.main_team.get_repos.assert_called_once_with()
+        self.assert_repos_listed()
         repo.get_teams.assert_not_called()
 
     def test_repo_admin_for_another_team_ignored(self):
@@ -332,7 +377,7 @@ class TestApp(unittest.TestCase):
         repo.archived = False
         repo.name = repo_name
         repo.permissions.admin = True
-        self.main_team.get_repos.return_value = [repo]
+        self.set_repos([repo])
 
         main_team_repo_access = Mock()
         main_team_repo_access.name = self.main_team.name
@@ -346,7 +391,7 @@ class TestApp(unittest.TestCase):
         })
 
         # then
-        self.main_team.get_repos.assert_called_once_with()
+        self.assert_repos_listed()
         repo.get_teams.assert_called_once_with()
         assert self.errors == [
             f'team does not have admin access to repo {repo_name}'
@@ -361,7 +406,7 @@ class TestApp(unittest.TestCase):
         repo.archived = False
         repo.name = repo_name
         repo.permissions.admin = True
-        self.main_team.get_repos.return_value = [repo]
+        self.set_repos([repo])
 
         main_team_repo_access = Mock()
         main_team_repo_access.name = self.main_team.name
@@ -380,7 +425,7 @@ class TestApp(unittest.TestCase):
         })
 
         # then
-        self.main_team.get_repos.assert_called_once_with()
+        self.assert_repos_listed()
         repo.get_teams.assert_called_once_with()
         assert self.errors == [
             f'unknown team not-a-team specified for repo {repo_name}'
@@ -389,7 +434,7 @@ class TestApp(unittest.TestCase):
     def test_error_on_unknown_repo(self):
 
         # given
-        self.main_team.get_repos.return_value = []
+        self.set_repos([])
 
         # when
         self.app.run({
@@ -397,7 +442,7 @@ class TestApp(unittest.TestCase):
         })
 
         # then
-        self.main_team.get_repos.assert_called_once_with()
+        self.assert_repos_listed()
         assert self.errors == [
             f'config contained repo unknown-repo, but team does not have '
             'admin access'
@@ -412,7 +457,7 @@ class TestApp(unittest.TestCase):
         repo.archived = False
         repo.name = repo_name
         repo.permissions.admin = False
-        self.main_team.get_repos.return_value = [repo]
+        self.set_repos([repo])
 
         main_team_repo_access = Mock()
         main_team_repo_access.name = self.main_team.name
@@ -426,8 +471,204 @@ class TestApp(unittest.TestCase):
         })
 
         # then
-        self.main_team.get_repos.assert_called_once_with()
+        self.assert_repos_listed()
         assert self.errors == [
             f'config contained repo {repo_name}, but team does not have '
             'admin access'
         ]
+
+    def test_concurrent_run_reports_in_repo_order(self):
+
+        # given
+        repos = []
+        for i in range(20):
+            repo = Mock()
+            repo.archived = False
+            repo.name = f'test-repo-{i}'
+            repo.permissions.admin = True
+            main_team_repo_access = Mock()
+            main_team_repo_access.name = self.main_team.name
+            main_team_repo_access.permission = 'push'
+            repo.get_teams.return_value = [main_team_repo_access]
+            repos.append(repo)
+        self.set_repos(repos)
+        self.app.concurrency = 8
+
+        # when
+        self.app.run({
+            repo.name: {'teams': {}} for repo in repos
+        })
+
+        # then
+        for repo in repos:
+            repo.get_teams.assert_called_once_with()
+        assert self.errors == [
+            f'team does not have admin access to repo {repo.name}'
+            for repo in repos
+        ]
+
+    def test_read_failure_reported_as_error(self):
+
+        # given
+        repo_name = 'test-repo'
+
+        repo = Mock()
+        repo.archived = False
+        repo.name = repo_name
+        repo.permissions.admin = True
+        repo.get_teams.side_effect = GithubException(500, 'boom', {})
+        self.set_repos([repo])
+
+        # when
+        self.app.run({
+            repo_name: {'teams': {}}
+        })
+
+        # then
+        assert self.errors == [
+            f'failed to read teams for repo {repo_name}: 500 "boom"'
+        ]
+
+    def test_plan_then_apply(self):
+
+        # given
+        repo_name = 'test-repo'
+
+        repo = Mock()
+        repo.archived = False
+        repo.name = repo_name
+        repo.permissions.admin = True
+
+        main_team_repo_access = Mock()
+        main_team_repo_access.name = self.main_team.name
+        main_team_repo_access.permission = 'admin'
+
+        push_team_repo_access = Mock()
+        push_team_repo_access.name = self.test_push_team.name
+        push_team_repo_access.permission = 'push'
+
+        repo.get_teams.return_value = [
+            main_team_repo_access, push_team_repo_access
+        ]
+        self.set_repos([repo])
+
+        # when
+        changes = self.app.plan({
+            repo_name: {
+                'teams': {self.test_admin_team.name: 'pull'}
+            }
+        })
+
+        # then
+        assert sorted(changes) == [
+            Change(repo_name, self.test_admin_team.name, None, 'pull'),
+            Change(repo_name, self.test_push_team.name, 'push', None),
+        ]
+        self.test_admin_team.requester.requestJsonAndCheck.assert_not_called()
+        self.test_push_team.remove_from_repos.assert_not_called()
+
+        # when
+        self.app.apply(changes)
+
+        # then
+        admin_team_url = self.test_admin_team.url
+        self.test_admin_team.requester.requestJsonAndCheck \
+            .assert_called_once_with(
+                'PUT', f'{admin_team_url}/repos/test-org/{repo_name}',
+                input={'permission': 'pull'}
+            )
+        self.test_push_team.remove_from_repos.assert_called_once_with(
+            f'test-org/{repo_name}'
+        )
+        assert self.errors == []
+
+    def test_incremental_run_skips_unchanged_repos(self):
+
+        # given
+        repo_name = 'test-repo'
+
+        repo = Mock()
+        repo.archived = False
+        repo.name = repo_name
+        repo.permissions.admin = True
+        repo.updated_at = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        repo.pushed_at = None
+
+        main_team_repo_access = Mock()
+        main_team_repo_access.name = self.main_team.name
+        main_team_repo_access.permission = 'admin'
+
+        repo.get_teams.return_value = [main_team_repo_access]
+        self.set_repos([repo])
+
+        access_config = {
+            repo_name: {'teams': {self.test_push_team.name: 'push'}}
+        }
+        snapshot = Snapshot()
+        self.app.run(access_config, snapshot)
+
+        # when
+        self.app.run(access_config, snapshot)
+
+        # then
+        repo.get_teams.assert_called_once_with()
+        assert snapshot.repos[repo_name]['teams'] == {
+            self.test_push_team.name: 'push'
+        }
+
+    def test_incremental_run_reads_changed_repos(self):
+
+        # given
+        repo_name = 'test-repo'
+
+        repo = Mock()
+        repo.archived = False
+        repo.name = repo_name
+        repo.permissions.admin = True
+        repo.updated_at = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        repo.pushed_at = None
+
+        main_team_repo_access = Mock()
+        main_team_repo_access.name = self.main_team.name
+        main_team_repo_access.permission = 'admin'
+
+        repo.get_teams.return_value = [main_team_repo_access]
+        self.set_repos([repo])
+
+        snapshot = Snapshot()
+        self.app.run({repo_name: {'teams': {}}}, snapshot)
+
+        # when
+        repo.updated_at = datetime(2020, 1, 2, tzinfo=timezone.utc)
+        self.app.run({repo_name: {'teams': {}}}, snapshot)
+        self.app.run({
+            repo_name: {'teams': {self.test_push_team.name: 'push'}}
+        }, snapshot)
+
+        # then
+        assert repo.get_teams.call_count == 3
+
+    def test_incremental_run_forgets_repos_with_errors(self):
+
+        # given
+        repo_name = 'test-repo'
+
+        repo = Mock()
+        repo.archived = False
+        repo.name = repo_name
+        repo.permissions.admin = True
+        repo.updated_at = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        repo.pushed_at = None
+        repo.get_teams.return_value = []
+        self.set_repos([repo])
+
+        snapshot = Snapshot()
+
+        # when
+        self.app.run({repo_name: {'teams': {}}}, snapshot)
+
+        # then
+        assert self.errors == [
+            f'team does not have admin access to repo {repo_name}'
+        ]
+        assert snapshot.repos == {}
@@ -0,0 +1,177 @@
+import io
+import json
+import unittest
+from unittest.mock import patch
+
+from github_access.access import read_access_config
+
+ACCESS = [
+    {
+        'teams': {'team-a': 'pull', 'team-b': 'push'},
+        'repos': ['repo-a', 'repo-b']
+    },
+    {
+        'repos': ['repo-c'],
+        'teams': {'team-c': 'maintain'}
+    },
+    {
+        'teams': {'team-a': 'pull', 'team-b': 'push'},
+        'repos': ['repo-d']
+    },
+]
+
+EXPECTED = {
+    'repo-a': {'teams': {'team-a': 'pull', 'team-b': 'push'}},
+    'repo-b': {'teams': {'team-a': 'pull', 'team-b': 'push'}},
+    'repo-c': {'teams': {'team-c': 'maintain'}},
+    'repo-d': {'teams': {'team-a': 'pull', 'team-b': 'push'}},
+}
+
+
+def read(text, main_team='main-team'):
+    return read_access_config(io.StringIO(text), main_team, 'access.json')
+
+
+class TestReadAccessConfig(unittest.TestCase):
+
+    def test_reads_levels(self):
+
+        # when
+        access_config = read(json.dumps(ACCESS, indent=2))
+
+        # then
+        assert access_config == EXPECTED
+
+    def test_levels_share_config(self):
+
+        # when
+        access_config = read(json.dumps(ACCESS))
+
+        # then
+        assert access_config['repo-a'] is access_config['repo-b']
+        assert access_config['repo-a'] is access_config['repo-d']
+
+    @patch('github_access.access.CHUNK_SIZE', 3)
+    def test_tokens_split_across_chunks(self):
+
+        # when
+        access_config = read(json.dumps(ACCESS, indent=2))
+
+        # then
+        assert access_config == EXPECTED
+
+    def test_numbers_split_across_chunks(self):
+
+        # given
+        text = json.dumps([dict(ACCESS[0], priority=12345.5e-1)])
+
+        for chunk_size in range(1, len(text) + 1):
+            with patch('github_access.access.CHUNK_SIZE', chunk_size):
+
+                # when
+                access_config = read(text)
+
+            # then
+            assert access_config == {
+                'repo-a': EXPECTED['repo-a'], 'repo-b': EXPECTED['repo-b']
+            }
+
+    def test_deprecated_format(self):
+
+        # when
+        access_config = read(json.dumps({
+            'repo-a': {'teams': {'team-a': 'pull'}}
+        }))
+
+        # then
+        assert access_config == {'repo-a': {'teams': {'team-a': 'pull'}}}
+
+    def assert_error(self, text, message):
+        with self.assertRaises(Exception) as context:
+            read(text)
+        assert str(context.exception) == message
+
+    @patch('github_access.access.CHUNK_SIZE', 4)
+    def test_duplicate_repo(self):
+        self.assert_error(
+            '[\n'
+            '  {"teams": {}, "repos": ["repo-a"]},\n'
+            '  {"teams": {}, "repos": ["repo-b", "repo-a"]}\n'
+            ']\n',
+            'access.json:3:37: repo repo-a listed twice'
+        )
+
+    def test_main_team_listed(self):
+        self.assert_error(
+            '[{"teams": {"main-team": "admin"}, "repos": []}]',
+            'access.json:1:13: team main-team should not be listed - this is '
+            'implied'
+        )
+
+    def test_unknown_permission(self):
+        self.assert_error(
+            '[{"repos": [],\n  "teams": {"team-a": "write"}}]',
+            'access.json:2:23: unknown permission write for team team-a'
+        )
+
+    def test_team_listed_twice(self):
+        self.assert_error(
+            '[{"repos": [],\n'
+            '  "teams": {"team-a": "pull", "team-a": "push"}}]',
+            'access.json:2:41: team team-a listed twice, with pull and push '
+            'permission'
+        )
+
+    def test_team_repeated_with_same_permission(self):
+
+        # when
+        access_config = read(
+            '[{"repos": ["repo-a"], "teams": {"team-a": "pull", '
+            '"team-a": "pull"}}]'
+        )
+
+        # then
+        assert access_config == {'repo-a': {'teams': {'team-a': 'pull'}}}
+
+    def test_missing_repos(self):
+        self.assert_error(
+            '[{"teams": {}}]',
+            'access.json:1:14: level has no repos'
+        )
+
+    def test_invalid_json(self):
+        self.assert_error(
+            '[{"teams": {}, "repos": ["repo-a" "repo-b"]}]',
+            "access.json:1:35: Expecting ',' delimiter"
+        )
+
+    def test_selectors(self):
+
+        # when
+        access_config = read(json.dumps([
+            {'teams': {'team-a': 'pull'}, 'repos': ['repo-a'],
+             'match': [{'prefix': 'web-'}, {'topic': 'frontend'}]},
+            {'teams': {'team-b': 'push'}, 'match': [{'glob': 'svc-*'}]},
+        ]))
+
+        # then
+        assert access_config == {'repo-a': {'teams': {'team-a': 'pull'}}}
+        assert access_config.matcher.rules == [
+            ({'prefix': 'web-'}, {'teams': {'team-a': 'pull'}}),
+            ({'topic': 'frontend'}, {'teams': {'team-a': 'pull'}}),
+            ({'glob': 'svc-*'}, {'teams': {'team-b': 'push'}}),
+        ]
+
+    def test_unknown_selector(self):
+        self.assert_error(
+            '[{"teams": {},\n  "match": [{"name": "repo-a"}]}]',
+            'access.json:2:14: unknown selector name - expected one of '
+            'prefix, glob, regex, topic'
+        )
+
+    def test_invalid_regex(self):
+        self.assert_error(
+            '[{"teams": {}, "match": [{"regex": "repo-("}]}]',
+            'access.json:1:36: invalid regex repo-(: missing ), unterminated '
+            'subpattern at position 5'
+        )
@@ -0,0 +1,106 @@
+import unittest
+from unittest.mock import Mock, call
+
+from github import GithubException
+
+from github_access.admin import AdminGrants, access_repo_names
+from github_access.selection import AccessConfig
+from github_access.ratelimit import RateLimitScheduler
+
+
+def repo(name, admin):
+    return {'name': name, 'permissions': {'admin': admin, 'push': True}}
+
+
+class TestAdminGrants(unittest.TestCase):
+
+    def setUp(self):
+        self.github = Mock()
+        self.team = Mock()
+        self.team.name = 'new-admins'
+        self.errors = []
+        self.scheduler = RateLimitScheduler(
+            lambda: (5000, 0.0), write_interval=0.0, sleep=Mock()
+        )
+
+    def test_grants_missing_admin_access(self):
+
+        # given
+        self.github.requester.requestJsonAndCheck.return_value = ({}, [
+            repo('repo-a', True), repo('repo-b', False)
+        ])
+        grants = AdminGrants(
+            self.github, self.team, 'test-org', self.scheduler,
+            self.errors.append, concurrency=2
+        )
+
+        # when
+        summary = grants.run(['repo-a', 'repo-b', 'repo-c'])
+
+        # then
+        assert sorted(
+            self.team.requester.requestJsonAndCheck.call_args_list
+        ) == [
+            call(
+                'PUT', f'{self.team.url}/repos/test-org/repo-b',
+                input={'permission': 'admin'}
+            ),
+            call(
+                'PUT', f'{self.team.url}/repos/test-org/repo-c',
+                input={'permission': 'admin'}
+            ),
+        ]
+        assert summary == {'granted': 2, 'unchanged': 1, 'failed': 0}
+        assert self.errors == []
+
+    def test_reports_failed_grants(self):
+
+        # given
+        self.github.requester.requestJsonAndCheck.return_value = ({}, [])
+        self.team.requester.requestJsonAndCheck.side_effect = [
+            GithubException(404, {'message': 'Not Found'}, {}), ({}, None)
+        ]
+        grants = AdminGrants(
+            self.github, self.team, 'test-org', self.scheduler,
+            self.errors.append
+        )
+
+        # when
+        summary = grants.run(['missing-repo', 'repo-a'])
+
+        # then
+        assert summary == {'granted': 1, 'unchanged': 0, 'failed': 1}
+        assert self.errors == [
+            'failed to grant admin access to repo missing-repo: '
+            '404 {"message": "Not Found"}'
+        ]
+
+    def test_access_repo_names(self):
+
+        # given
+        access_config = AccessConfig({
+            'repo-a': {'teams': {}}, 'repo-b': {'teams': {}},
+            'repo-c': {'teams': {}},
+        })
+
+        # when
+        names = access_repo_names(access_config, 'access.json')
+
+        # then
+        assert names == ['repo-a', 'repo-b', 'repo-c']
+
+    def test_access_repo_names_rejects_selectors(self):
+
+        # given
+        access_config = AccessConfig({'repo-a': {'teams': {}}})
+        access_config.matcher.add({'prefix': 'web-'}, {'teams': {}})
+
+        # when
+        with self.assertRaises(Exception) as context:
+            access_repo_names(access_config, 'access.json')
+
+        # then
+        assert str(context.exception) == (
+            'access.json: grant-admin needs every repo listed by name, not '
+            'matched by a selector'
+        )
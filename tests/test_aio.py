@@ -0,0 +1,120 @@
+import asyncio
+import unittest
+from unittest.mock import Mock, patch
+
+from github import GithubException
+
+from github_access.aio import AsyncEngine
+from github_access.loaders import TeamPermission
+from github_access.ratelimit import RateLimitScheduler
+
+
+class ScriptedClient:
+    '''
+    Stands in for the HTTP client, answering requests from a list of
+    (status, headers, data) responses.
+    '''
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def request(self, method, url, json=None, headers=None):
+        self.requests.append((method, url, json))
+        self.headers = headers
+        status, headers, data = self.responses.pop(0)
+        response = Mock()
+        response.status_code = status
+        response.headers = headers
+        response.content = b'' if data is None else b'data'
+        response.json.return_value = data
+        return response
+
+
+class TestAsyncEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.sleeps = []
+        self.scheduler = RateLimitScheduler(
+            lambda: (5000, 0.0), write_interval=0.0
+        )
+        asyncio_sleep = asyncio.sleep
+
+        async def sleep(delay):
+            self.sleeps.append(delay)
+            await asyncio_sleep(0)
+        self.sleep = sleep
+
+    def engine(self, client):
+        return AsyncEngine(
+            'https://api.github.com', 'test-token', self.scheduler, None, 2,
+            client_factory=lambda base_url, headers, max_in_flight: client
+        )
+
+    def test_reads_paginated_team_permissions(self):
+
+        # given
+        client = ScriptedClient([
+            (200, {'Link': '<https://api.github.com/next>; rel="next"',
+                   'X-RateLimit-Remaining': '4000', 'X-RateLimit-Reset': '10'},
+             [{'name': 'team-a', 'permission': 'admin'}]),
+            (200, {}, [{'name': 'team-b', 'permission': 'push'}]),
+        ])
+        engine = self.engine(client)
+
+        # when
+        [teams] = engine.run(
+            lambda: [engine.team_permissions('test-org/repo-a')]
+        )
+
+        # then
+        assert teams == [
+            TeamPermission('team-a', 'admin'), TeamPermission('team-b', 'push')
+        ]
+        assert [url for _, url, _ in client.requests] == [
+            '/repos/test-org/repo-a/teams?per_page=100',
+            'https://api.github.com/next',
+        ]
+        assert engine.budget(Mock())() == (4000, 10)
+
+    def test_retries_when_rate_limited(self):
+
+        # given
+        client = ScriptedClient([
+            (403, {'Retry-After': '30'}, {'message': 'secondary limit'}),
+            (204, {}, None),
+        ])
+        engine = self.engine(client)
+
+        # when
+        with patch('asyncio.sleep', self.sleep):
+            engine.run(lambda: [engine.set_team_permission(
+                'test-org', 'team-a', 'repo-a', 'push'
+            )])
+
+        # then
+        assert self.sleeps == [30.0]
+        assert client.requests == [
+            ('PUT', '/orgs/test-org/teams/team-a/repos/test-org/repo-a',
+             {'permission': 'push'}),
+        ] * 2
+
+    def test_errors_raised_as_github_exceptions(self):
+
+        # given
+        engine = self.engine(ScriptedClient([
+            (404, {}, {'message': 'Not Found'}),
+        ]))
+
+        # when / then
+        with self.assertRaises(GithubException) as context:
+            engine.run(lambda: [engine.remove_team(
+                'test-org', 'team-a', 'repo-a'
+            )])
+        assert context.exception.status == 404
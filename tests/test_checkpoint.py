@@ -0,0 +1,160 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import github_access.github
+from github_access.checkpoint import Checkpoint
+from github_access.plan import Change
+
+from tests.fake_github import FakeGitHub
+from tests.test_end_to_end import build_org
+
+KEY = {'org': 'test-org', 'team': 'Test Team', 'config': 'test-hash'}
+
+REPO_TEAMS = ('GET', r'/repos/([^/]+)/([^/]+)/teams')
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'checkpoint.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+
+        # given
+        change = Change('repo-a', 'team-a', None, 'push')
+        checkpoint = Checkpoint(self.path, KEY)
+        checkpoint.add_repo('repo-b', [change], True)
+        checkpoint.add_repo('repo-c', [], False)
+
+        # when
+        checkpoint.save()
+        loaded = Checkpoint.load(self.path, KEY)
+
+        # then
+        assert loaded.repos == {'repo-b': [change]}
+        assert loaded.pending is None
+
+    def test_errors_are_reported_again_once_planned(self):
+
+        # given
+        checkpoint = Checkpoint(self.path, KEY)
+        checkpoint.reporting(lambda message: None)('test-error')
+        checkpoint.start_changes([Change('repo-a', 'team-a', None, 'push')])
+        errors = []
+
+        # when
+        Checkpoint.load(self.path, KEY).reporting(errors.append)
+
+        # then
+        assert errors == ['test-error']
+
+    def test_different_key_starts_again(self):
+
+        # given
+        checkpoint = Checkpoint(self.path, KEY)
+        checkpoint.add_repo('repo-a', [], True)
+        checkpoint.save()
+
+        # when
+        loaded = Checkpoint.load(self.path, dict(KEY, config='other-hash'))
+
+        # then
+        assert loaded.repos == {}
+
+    def test_finish_removes_file(self):
+
+        # given
+        checkpoint = Checkpoint(self.path, KEY)
+        checkpoint.save()
+
+        # when
+        checkpoint.finish()
+
+        # then
+        assert not os.path.exists(self.path)
+
+
+class TestResume(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'checkpoint.json')
+        self.org = build_org()
+        self.access_config = {
+            f'repo-{i}': {'teams': {'Test Push Team': 'push'}}
+            for i in range(4)
+        }
+        self.access_config['repo-4'] = {'teams': {'Test Pull Team': 'pull'}}
+        self.errors = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_app(self, checkpoint):
+        with FakeGitHub(self.org) as fake:
+            app = github_access.github.App(
+                'test-org', 'Test Team', 'test-github-token',
+                self.errors.append, base_url=fake.url
+            )
+            app.scheduler.write_interval = 0.0
+            app.run(self.access_config, None, checkpoint)
+        return fake
+
+    def interrupted_run(self, method, calls):
+        original = getattr(github_access.github.App, method)
+        count = [0]
+
+        def interrupt(*args):
+            count[0] += 1
+            if count[0] > calls:
+                raise SystemExit('stopped')
+            return original(*args)
+
+        with patch.object(github_access.github.App, method, interrupt):
+            with self.assertRaises(SystemExit):
+                self.run_app(Checkpoint(self.path, KEY))
+
+    def assert_reconciled(self):
+        assert self.errors == []
+        assert self.org.permissions_by_repo['repo-0'] == {
+            'test-team': 'admin', 'test-push-team': 'push'
+        }
+        assert self.org.permissions_by_repo['repo-4'] == {
+            'test-team': 'admin', 'test-pull-team': 'pull'
+        }
+        assert not os.path.exists(self.path)
+
+    def test_resumes_planning(self):
+
+        # given
+        self.interrupted_run('plan_repo', 2)
+
+        # when
+        fake = self.run_app(Checkpoint.load(self.path, KEY))
+
+        # then
+        self.assert_reconciled()
+        assert fake.requests[REPO_TEAMS] == 3
+
+    def test_resumes_changes_without_planning(self):
+
+        # given
+        self.interrupted_run('update_team_permission', 1)
+
+        # when
+        fake = self.run_app(Checkpoint.load(self.path, KEY))
+
+        # then
+        self.assert_reconciled()
+        assert fake.requests[REPO_TEAMS] == 0
+        assert fake.requests[
+            ('PUT', r'/teams/(\d+)/repos/([^/]+)/([^/]+)')
+        ] + fake.requests[
+            ('DELETE', r'/teams/(\d+)/repos/([^/]+)/([^/]+)')
+        ] == 2
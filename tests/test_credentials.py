@@ -0,0 +1,124 @@
+import unittest
+
+from github import Auth
+
+from github_access.credentials import (
+    TokenPool, credentials_identity, load_credentials
+)
+
+
+def budget_headers(remaining, reset, resource='core'):
+    return {
+        'x-ratelimit-remaining': str(remaining),
+        'x-ratelimit-reset': str(reset),
+        'x-ratelimit-resource': resource,
+    }
+
+
+class TestTokenPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = TokenPool([Auth.Token('token-a'), Auth.Token('token-b')])
+
+    def send(self, response_headers):
+        headers = {}
+        self.pool.authentication(headers)
+        self.pool.observe(headers, response_headers)
+        return headers['Authorization']
+
+    def test_uses_the_credential_with_the_most_budget(self):
+
+        # given
+        self.send(budget_headers(100, 1000))
+
+        # when
+        authorization = self.send(budget_headers(4000, 2000))
+
+        # then
+        assert authorization == 'token token-b'
+        assert self.send(budget_headers(3999, 2000)) == 'token token-b'
+        assert self.pool.budget() == (3999, 2000)
+
+    def test_slows_down_only_when_every_credential_is_low(self):
+
+        # when
+        self.send(budget_headers(10, 1000))
+        self.send(budget_headers(20, 2000))
+
+        # then
+        assert self.pool.budget() == (20, 2000)
+
+    def test_ignores_other_rate_limits(self):
+
+        # when
+        self.send(budget_headers(0, 1000, resource='graphql'))
+
+        # then
+        assert self.pool.budget() == (5000, 0)
+        assert self.send({}) == 'token token-a'
+
+
+class TestCredentialsIdentity(unittest.TestCase):
+
+    def test_installation_identified_by_id(self):
+
+        # given
+        installation = Auth.AppInstallationAuth(
+            Auth.AppAuth(1, 'test-private-key'), 42
+        )
+
+        # when
+        identity = credentials_identity(installation)
+
+        # then
+        assert identity('token ghs_a') == 'installation 42'
+        assert identity('token ghs_b') == 'installation 42'
+
+    def test_pool_identifies_each_credential(self):
+
+        # given
+        installation = Auth.AppInstallationAuth(
+            Auth.AppAuth(1, 'test-private-key'), 42
+        )
+        pool = TokenPool([Auth.Token('token-a'), installation])
+        pool.issued = {'token token-a': 0, 'token ghs_a': 1}
+
+        # when
+        identity = credentials_identity(pool)
+
+        # then
+        assert identity('token token-a') == 'token token-a'
+        assert identity('token ghs_a') == 'installation 42'
+
+
+class TestLoadCredentials(unittest.TestCase):
+
+    def test_single_token(self):
+
+        # when
+        credentials = load_credentials(
+            {'GITHUB_TOKEN': 'token-a'}, 'test-org', 'https://api.github.com'
+        )
+
+        # then
+        assert credentials == 'token-a'
+
+    def test_several_tokens(self):
+
+        # when
+        credentials = load_credentials(
+            {'GITHUB_TOKEN': 'token-a, token-b'}, 'test-org',
+            'https://api.github.com'
+        )
+
+        # then
+        assert isinstance(credentials, TokenPool)
+        assert [c.token for c in credentials.credentials] == [
+            'token-a', 'token-b'
+        ]
+
+    def test_no_credentials(self):
+
+        # then
+        with self.assertRaisesRegex(Exception, 'GITHUB_TOKEN'):
+            load_credentials({}, 'test-org', 'https://api.github.com')
@@ -0,0 +1,451 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import requests
+
+import github_access.github
+from github_access.admin import AdminGrants
+from github_access.checkpoint import Checkpoint
+from github_access.plan import Change
+from github_access.ratelimit import RateLimitScheduler
+from github_access.report import load_matrix
+from github_access.snapshot import Snapshot
+from tests.fake_github import FakeGitHub, FakeOrg
+
+
+class RequestsClient:
+    '''
+    Stands in for the HTTP/2 client of the asyncio engine, making its
+    requests with requests on a thread.
+    '''
+
+    def __init__(self, base_url, headers, max_in_flight):
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.session.close()
+
+    async def request(self, method, url, json=None, headers=None):
+        if url.startswith('/'):
+            url = self.base_url + url
+        return await asyncio.get_event_loop().run_in_executor(
+            None, lambda: self.session.request(
+                method, url, json=json, headers=headers
+            )
+        )
+
+
+original_engine = github_access.github.AsyncEngine
+
+
+def build_org():
+    org = FakeOrg('test-org')
+    main_team = org.add_team('Test Team')
+    push_team = org.add_team('Test Push Team')
+    pull_team = org.add_team('Test Pull Team')
+    for i in range(5):
+        org.add_repo(f'repo-{i}')
+        org.grant(main_team, f'repo-{i}', 'admin')
+        org.grant(push_team, f'repo-{i}', 'push')
+    org.add_repo('archived-repo', archived=True)
+    org.grant(main_team, 'archived-repo', 'admin')
+    org.add_repo('pull-repo')
+    org.grant(main_team, 'pull-repo', 'pull')
+    org.grant(pull_team, 'repo-0', 'pull')
+    return org
+
+
+class TestEndToEnd(unittest.TestCase):
+
+    def setUp(self):
+        self.org = build_org()
+        self.access_config = {
+            f'repo-{i}': {'teams': {'Test Push Team': 'push'}}
+            for i in range(4)
+        }
+        self.access_config['repo-4'] = {'teams': {'Test Pull Team': 'pull'}}
+        self.errors = []
+
+    def run_app(self, **kwargs):
+        with FakeGitHub(self.org) as fake:
+            app = github_access.github.App(
+                'test-org', 'Test Team', 'test-github-token',
+                self.errors.append, base_url=fake.url, **kwargs
+            )
+            app.run(self.access_config)
+        self.metrics = app.metrics.summary()
+        return fake
+
+    def assert_reconciled(self):
+        assert self.errors == []
+        assert self.org.permissions_by_repo['repo-0'] == {
+            'test-team': 'admin', 'test-push-team': 'push'
+        }
+        assert self.org.permissions_by_repo['repo-4'] == {
+            'test-team': 'admin', 'test-pull-team': 'pull'
+        }
+
+    def test_rest(self):
+
+        # when
+        fake = self.run_app()
+
+        # then
+        self.assert_reconciled()
+        assert fake.requests[('GET', r'/repos/([^/]+)/([^/]+)/teams')] == 5
+        assert fake.requests[
+            ('DELETE', r'/teams/(\d+)/repos/([^/]+)/([^/]+)')
+        ] == 2
+        assert sum(
+            request['count'] for request in self.metrics['requests']
+        ) == fake.request_count
+        assert set(self.metrics['phases']) == {
+            'team load', 'repo listing', 'repo read', 'mutations'
+        }
+
+    def test_graphql(self):
+
+        # when
+        fake = self.run_app(graphql=True)
+
+        # then
+        self.assert_reconciled()
+        assert fake.requests[('POST', r'/graphql')] == 2
+        assert fake.requests[('GET', r'/repos/([^/]+)/([^/]+)/teams')] == 0
+
+    def test_concurrent(self):
+
+        # when
+        self.run_app(concurrency=4)
+
+        # then
+        self.assert_reconciled()
+
+    def test_concurrent_writes(self):
+
+        # when
+        self.run_app(write_concurrency=4, write_interval=0.0)
+
+        # then
+        self.assert_reconciled()
+
+    def test_asyncio(self):
+
+        # given
+        def engine(*args, **kwargs):
+            return original_engine(
+                *args, client_factory=RequestsClient, **kwargs
+            )
+
+        # when
+        with patch('github_access.github.AsyncEngine', engine):
+            fake = self.run_app(concurrency=4, use_asyncio=True)
+
+        # then
+        self.assert_reconciled()
+        assert fake.requests[('GET', r'/repos/([^/]+)/([^/]+)/teams')] == 5
+        assert fake.requests[(
+            'DELETE', r'/orgs/([^/]+)/teams/([^/]+)/repos/([^/]+)/([^/]+)'
+        )] == 2
+
+    def test_asyncio_httpx(self):
+
+        # when
+        fake = self.run_app(concurrency=4, use_asyncio=True)
+
+        # then
+        self.assert_reconciled()
+        assert fake.requests[('GET', r'/repos/([^/]+)/([^/]+)/teams')] == 5
+
+    def test_reads_by_team_when_cheaper(self):
+
+        # when
+        fake = self.run_app(reads='auto')
+
+        # then
+        self.assert_reconciled()
+        assert fake.requests[('GET', r'/repos/([^/]+)/([^/]+)/teams')] == 0
+        # the main team's repos are listed again, with every other team's
+        assert fake.requests[('GET', r'/teams/(\d+)/repos')] == 4
+
+    def test_reads_by_repo_when_cheaper(self):
+
+        # given
+        for i in range(10):
+            self.org.add_team(f'Team {i}')
+
+        # when
+        fake = self.run_app(reads='auto')
+
+        # then
+        self.assert_reconciled()
+        assert fake.requests[('GET', r'/repos/([^/]+)/([^/]+)/teams')] == 5
+        assert fake.requests[('GET', r'/teams/(\d+)/repos')] == 1
+
+
+class TestTeamSlugs(unittest.TestCase):
+
+    def setUp(self):
+        self.org = build_org()
+        self.access_config = {
+            f'repo-{i}': {'teams': {'test-push-team': 'push'}}
+            for i in range(5)
+        }
+        self.errors = []
+
+    def run_app(self, main_team):
+        with FakeGitHub(self.org) as fake:
+            app = github_access.github.App(
+                'test-org', main_team, 'test-github-token',
+                self.errors.append, base_url=fake.url
+            )
+            app.scheduler.write_interval = 0.0
+            return app.run(self.access_config)
+
+    def test_team_given_by_slug(self):
+
+        # when
+        changes = self.run_app('Test Team')
+
+        # then
+        assert self.errors == []
+        assert changes == [Change('repo-0', 'Test Pull Team', 'pull', None)]
+        assert self.org.permissions_by_team['test-push-team'] == {
+            f'repo-{i}': 'push' for i in range(5)
+        }
+
+    def test_main_team_given_by_name_and_slug(self):
+
+        # given
+        self.access_config['repo-1']['teams']['Test Team'] = 'push'
+
+        # when
+        self.run_app('test-team')
+
+        # then
+        assert self.errors == [
+            'team Test Team should not be listed for repo repo-1 - this is '
+            'implied'
+        ]
+        assert self.org.permissions_by_team['test-team']['repo-1'] == 'admin'
+
+
+class TestWriteFailures(unittest.TestCase):
+
+    def setUp(self):
+        self.org = build_org()
+        self.access_config = {
+            f'repo-{i}': {'teams': {'Test Push Team': 'push'}}
+            for i in range(5)
+        }
+        self.snapshot = Snapshot()
+        self.errors = []
+
+    def run_app(self, checkpoint, **kwargs):
+        with FakeGitHub(self.org) as fake:
+            fake.write_failures['repo-0'] = 422, {'message': 'Invalid'}
+            with patch(
+                'github_access.github.AsyncEngine', lambda *args, **kwargs:
+                original_engine(*args, client_factory=RequestsClient, **kwargs)
+            ):
+                app = github_access.github.App(
+                    'test-org', 'Test Team', 'test-github-token',
+                    self.errors.append, base_url=fake.url, **kwargs
+                )
+                app.run(self.access_config, self.snapshot, checkpoint)
+
+    def assert_failure_kept(self, **kwargs):
+
+        # given
+        checkpoint = Checkpoint()
+
+        # when
+        self.run_app(checkpoint, **kwargs)
+        self.run_app(Checkpoint(), **kwargs)
+
+        # then
+        assert self.errors == [
+            'failed to change team Test Pull Team permission on repo '
+            'repo-0: Invalid: 422 {"message": "Invalid"}'
+        ] * 2
+        assert list(checkpoint.pending) == [
+            Change('repo-0', 'Test Pull Team', 'pull', None)
+        ]
+        assert 'repo-0' not in self.snapshot.repos
+        assert 'repo-1' in self.snapshot.repos
+
+    def test_threads(self):
+        self.assert_failure_kept()
+
+    def test_asyncio(self):
+        self.assert_failure_kept(use_asyncio=True)
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_teams_share_reads(self):
+
+        # given
+        org = build_org()
+        other_team = org.add_team('Other Team')
+        org.grant(other_team, 'repo-4', 'admin')
+        org.add_repo('other-repo')
+        org.grant(other_team, 'other-repo', 'admin')
+        errors = []
+        entries = [
+            github_access.github.BatchEntry('test-org', 'Test Team', dict(
+                {
+                    f'repo-{i}': {'teams': {'Test Push Team': 'push'}}
+                    for i in range(4)
+                },
+                **{'repo-4': {'teams': {
+                    'Test Push Team': 'push', 'Other Team': 'admin'
+                }}}
+            )),
+            github_access.github.BatchEntry('test-org', 'Other Team', {
+                'repo-4': {'teams': {
+                    'Test Push Team': 'push', 'Test Team': 'admin'
+                }},
+                'other-repo': {'teams': {'Test Pull Team': 'pull'}},
+            }),
+        ]
+
+        # when
+        with FakeGitHub(org) as fake:
+            app = github_access.github.App(
+                'test-org', 'Test Team', 'test-github-token', errors.append,
+                base_url=fake.url
+            )
+            github_access.github.run_batch(app, entries, errors.append)
+
+        # then
+        assert fake.requests[('GET', r'/orgs/([^/]+)/teams')] == 0
+        assert fake.requests[('GET', r'/orgs/([^/]+)/teams/([^/]+)')] == 3
+        assert fake.requests[('GET', r'/repos/([^/]+)/([^/]+)/teams')] == 6
+        assert org.permissions_by_repo['other-repo'] == {
+            'other-team': 'admin', 'test-pull-team': 'pull'
+        }
+        assert errors == [
+            'test-org/Test Team: additional team Other Team has admin access '
+            'to repo repo-4 (resolve by completing transfer)',
+            'test-org/Other Team: additional team Test Team has admin access '
+            'to repo repo-4 (resolve by completing transfer)',
+        ]
+
+
+class TestGrantAdmin(unittest.TestCase):
+
+    def setUp(self):
+        self.org = build_org()
+        self.org.add_team('New Admins')
+        self.org.grant('new-admins', 'repo-0', 'admin')
+        self.org.grant('new-admins', 'repo-1', 'push')
+        self.errors = []
+
+    def grant(self, fake):
+        github = github_access.github.create_github(
+            'test-github-token', 4, None, fake.url, None
+        )
+        team = github.get_organization('test-org').get_team_by_slug(
+            'new-admins'
+        )
+        scheduler = RateLimitScheduler(
+            lambda: (5000, 0.0), write_interval=0.0
+        )
+        return AdminGrants(
+            github, team, 'test-org', scheduler, self.errors.append,
+            concurrency=4
+        ).run([f'repo-{i}' for i in range(5)])
+
+    def test_skips_repos_with_admin_access(self):
+
+        # when
+        with FakeGitHub(self.org) as fake:
+            summary = self.grant(fake)
+
+        # then
+        assert summary == {'granted': 4, 'unchanged': 1, 'failed': 0}
+        assert self.errors == []
+        assert self.org.permissions_by_team['new-admins'] == {
+            f'repo-{i}': 'admin' for i in range(5)
+        }
+        assert fake.requests[('GET', r'/repos/([^/]+)/([^/]+)')] == 0
+        assert fake.requests[
+            ('PUT', r'/teams/(\d+)/repos/([^/]+)/([^/]+)')
+        ] == 4
+
+    def test_lists_team_repos_100_per_page(self):
+
+        # given
+        for i in range(150):
+            self.org.add_repo(f'other-{i}')
+            self.org.grant('new-admins', f'other-{i}', 'pull')
+
+        # when
+        with FakeGitHub(self.org) as fake:
+            summary = self.grant(fake)
+
+        # then
+        assert summary == {'granted': 4, 'unchanged': 1, 'failed': 0}
+        assert fake.requests[('GET', r'/teams/(\d+)/repos')] == 2
+
+    def test_reports_failed_grants(self):
+
+        # given
+        with FakeGitHub(self.org) as fake:
+            fake.write_failures['repo-2'] = 404, {'message': 'Not Found'}
+
+            # when
+            summary = self.grant(fake)
+
+        # then
+        assert summary == {'granted': 3, 'unchanged': 1, 'failed': 1}
+        assert self.errors == [
+            'failed to grant admin access to repo repo-2: '
+            '404 {"message": "Not Found"}'
+        ]
+        assert 'repo-2' not in self.org.permissions_by_team['new-admins']
+
+
+class TestReport(unittest.TestCase):
+
+    def load_matrix(self, graphql):
+        org = build_org()
+        with FakeGitHub(org) as fake:
+            github = github_access.github.create_github(
+                'test-github-token', 2, None, fake.url, None
+            )
+            matrix = load_matrix(
+                github, 'test-org', RateLimitScheduler(lambda: (5000, 0.0)),
+                graphql, 2
+            )
+        names = {slug: team['name'] for slug, team in org.teams.items()}
+        assert {
+            repo: matrix.teams(repo) for repo in matrix.repo_names
+        } == {
+            repo: {names[slug]: p for slug, p in teams.items()}
+            for repo, teams in org.permissions_by_repo.items()
+        }
+        return fake
+
+    def test_rest(self):
+
+        # when
+        fake = self.load_matrix(graphql=False)
+
+        # then
+        assert fake.requests[('GET', r'/teams/(\d+)/repos')] == 3
+
+    def test_graphql(self):
+
+        # when
+        fake = self.load_matrix(graphql=True)
+
+        # then
+        assert fake.requests[('POST', r'/graphql')] == 1
@@ -0,0 +1,103 @@
+import unittest
+from unittest.mock import Mock
+
+import github_access.github
+from github_access.hierarchy import TeamHierarchy
+from github_access.plan import Change
+from tests.fake_github import FakeGitHub
+from tests.test_end_to_end import build_org
+
+
+def team(name, slug, parent=None):
+    result = Mock()
+    result.name = name
+    result.slug = slug
+    result.parent = parent
+    return result
+
+
+class TestTeamHierarchy(unittest.TestCase):
+
+    def setUp(self):
+        platform = team('Platform', 'platform')
+        web = team('Platform Web', 'platform-web', platform)
+        self.hierarchy = TeamHierarchy([
+            platform, web, team('Web Frontend', 'web-frontend', web),
+            team('Other', 'other'),
+        ])
+
+    def test_ancestors_nearest_first(self):
+        assert self.hierarchy.ancestors['web-frontend'] == (
+            'Platform Web', 'Platform'
+        )
+        assert self.hierarchy.ancestors['Other'] == ()
+
+    def test_highest_inherited_permission(self):
+
+        # when
+        inheritance = self.hierarchy.for_repo({
+            'platform': 'push', 'Platform Web': 'pull', 'Other': 'admin'
+        })
+
+        # then
+        assert inheritance.get('Web Frontend') == ('push', 'Platform')
+        assert inheritance.get('Platform Web') == ('push', 'Platform')
+        assert inheritance.get('Platform') is None
+        assert inheritance.get('Other') is None
+
+
+class TestInheritedPermissions(unittest.TestCase):
+
+    def setUp(self):
+        self.org = build_org()
+        parent = self.org.add_team('Platform')
+        self.org.add_team('Platform Web', parent=parent)
+        self.org.grant(parent, 'repo-0', 'push')
+        self.org.grant(parent, 'repo-1', 'push')
+        self.errors = []
+
+    def run_app(self, teams_by_repo):
+        access_config = {
+            f'repo-{i}': {'teams': {'Test Push Team': 'push'}}
+            for i in range(5)
+        }
+        access_config['repo-0']['teams']['Test Pull Team'] = 'pull'
+        for repo, teams in teams_by_repo.items():
+            access_config[repo]['teams'].update(teams)
+        with FakeGitHub(self.org) as fake:
+            app = github_access.github.App(
+                'test-org', 'Test Team', 'test-github-token',
+                self.errors.append, base_url=fake.url, team_hierarchy=True
+            )
+            app.scheduler.write_interval = 0.0
+            return app.run(access_config)
+
+    def test_skips_grants_satisfied_by_a_parent_team(self):
+
+        # when
+        changes = self.run_app({
+            'repo-0': {'Platform': 'push', 'Platform Web': 'push'},
+            'repo-1': {'Platform': 'push', 'Platform Web': 'maintain'},
+        })
+
+        # then
+        assert self.errors == []
+        assert changes == [
+            Change('repo-1', 'Platform Web', None, 'maintain')
+        ]
+        assert 'platform-web' not in self.org.permissions_by_repo['repo-0']
+
+    def test_reports_permission_inherited_above_desired(self):
+
+        # when
+        changes = self.run_app({
+            'repo-0': {'Platform': 'push'},
+            'repo-1': {'Platform': 'push', 'Platform Web': 'pull'},
+        })
+
+        # then
+        assert self.errors == [
+            'team Platform Web inherits push permission to repo repo-1 from '
+            'team Platform, more than its pull permission'
+        ]
+        assert changes == []
@@ -0,0 +1,193 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock
+
+from github_access.http_cache import CachedResponse, Connection, HttpCache
+
+
+def response(status, headers, text=''):
+    r = Mock()
+    r.status_code = status
+    r.headers = headers
+    r.text = text
+    return r
+
+
+class TestHttpCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.now = 0
+
+        def clock():
+            self.now += 1
+            return self.now
+
+        self.cache = HttpCache(
+            os.path.join(self.directory.name, 'http.sqlite'),
+            max_size=10, clock=clock
+        )
+
+    def tearDown(self):
+        self.cache.db.close()
+        self.directory.cleanup()
+
+    def test_miss(self):
+        assert self.cache.get('missing') is None
+
+    def test_hit(self):
+
+        # given
+        self.cache.put('key', CachedResponse(200, {'etag': '"a"'}, 'body'))
+
+        # when
+        cached = self.cache.get('key')
+
+        # then
+        assert cached.status == 200
+        assert dict(cached.getheaders()) == {'etag': '"a"'}
+        assert cached.read() == 'body'
+
+    def test_least_recently_used_evicted(self):
+
+        # given
+        self.cache.put('a', CachedResponse(200, {}, 'aaaa'))
+        self.cache.put('b', CachedResponse(200, {}, 'bbbb'))
+        self.cache.get('a')
+
+        # when
+        self.cache.put('c', CachedResponse(200, {}, 'cccc'))
+
+        # then
+        assert self.cache.get('a') is not None
+        assert self.cache.get('b') is None
+        assert self.cache.get('c') is not None
+
+
+class TestConnection(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = Mock()
+        self.cache.get.return_value = None
+        self.connection = Connection('api.github.com', 443, cache=self.cache)
+        self.connection.session = Mock()
+        self.headers = {'Authorization': 'token test-token'}
+
+    def get(self, url):
+        self.connection.request('GET', url, None, self.headers)
+        return self.connection.getresponse()
+
+    def test_response_with_etag_cached(self):
+
+        # given
+        self.connection.session.request.return_value = response(
+            200, {'ETag': '"a"'}, 'body'
+        )
+
+        # when
+        result = self.get('/orgs/test-org/teams')
+
+        # then
+        assert result.read() == 'body'
+        key, cached = self.cache.put.call_args[0]
+        assert cached.headers == {'etag': '"a"'}
+        assert cached.body == 'body'
+
+    def test_not_modified_served_from_cache(self):
+
+        # given
+        self.cache.get.return_value = CachedResponse(
+            200, {'etag': '"a"', 'x-ratelimit-remaining': '10'}, 'body'
+        )
+        self.connection.session.request.return_value = response(
+            304, {'ETag': '"a"', 'X-RateLimit-Remaining': '9'}
+        )
+
+        # when
+        result = self.get('/orgs/test-org/teams')
+
+        # then
+        headers = self.connection.session.request.call_args[1]['headers']
+        assert headers['If-None-Match'] == '"a"'
+        assert result.status == 200
+        assert result.read() == 'body'
+        assert dict(result.getheaders())['x-ratelimit-remaining'] == '9'
+        self.cache.put.assert_not_called()
+
+    def test_cache_key_depends_on_token(self):
+
+        # given
+        self.connection.session.request.return_value = response(200, {})
+
+        # when
+        self.get('/orgs/test-org/teams')
+        self.headers = {'Authorization': 'token other-token'}
+        self.get('/orgs/test-org/teams')
+
+        # then
+        first, second = self.cache.get.call_args_list
+        assert first != second
+
+    def test_cache_key_depends_on_credential_identity(self):
+
+        # given
+        self.connection.identity = lambda authorization: 'installation 1'
+        self.connection.session.request.return_value = response(200, {})
+
+        # when
+        self.get('/orgs/test-org/teams')
+        self.headers = {'Authorization': 'token refreshed-token'}
+        self.get('/orgs/test-org/teams')
+
+        # then
+        first, second = self.cache.get.call_args_list
+        assert first == second
+
+    def test_threads_get_their_own_responses(self):
+
+        # given
+        connection = Connection('api.github.com', 443)
+        connection.session = Mock()
+        connection.session.request.side_effect = \
+            lambda verb, url, **kwargs: response(200, {}, url)
+        requested = threading.Barrier(2)
+        bodies = {}
+
+        def get(url):
+            connection.request('GET', url, None, {})
+            # both requests are pending before either is sent
+            requested.wait()
+            bodies[url] = connection.getresponse().read()
+
+        # when
+        threads = [
+            threading.Thread(target=get, args=(url,))
+            for url in ['/repos/o/a/teams', '/repos/o/b/teams']
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # then
+        assert bodies == {
+            '/repos/o/a/teams': 'https://api.github.com:443/repos/o/a/teams',
+            '/repos/o/b/teams': 'https://api.github.com:443/repos/o/b/teams',
+        }
+
+    def test_writes_not_cached(self):
+
+        # given
+        self.connection.session.request.return_value = response(
+            204, {'ETag': '"a"'}
+        )
+
+        # when
+        self.connection.request('PUT', '/teams/1/repos/o/r', '{}', {})
+        self.connection.getresponse()
+
+        # then
+        self.cache.get.assert_not_called()
+        self.cache.put.assert_not_called()
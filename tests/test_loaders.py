@@ -0,0 +1,162 @@
+import unittest
+from unittest.mock import Mock, call
+
+from github import Github
+from github.Repository import Repository
+
+from github_access.loaders import (
+    GraphQLStateLoader, PermissionCache, RestStateLoader, TeamPermission
+)
+
+
+def page(edges, cursor=None):
+    return {
+        'pageInfo': {'hasNextPage': cursor is not None, 'endCursor': cursor},
+        'edges': edges,
+    }
+
+
+def edge(name, permission, archived=False):
+    return {
+        'permission': permission,
+        'node': {
+            'name': name,
+            'nameWithOwner': f'test-org/{name}',
+            'isArchived': archived,
+            'updatedAt': '2020-01-01T00:00:00Z',
+            'pushedAt': None,
+            'repositoryTopics': {'nodes': []},
+        }
+    }
+
+
+def rest_repo(name, archived=False, admin=True):
+    return {
+        'name': name, 'full_name': f'test-org/{name}',
+        'owner': {'login': 'test-org'},
+        'url': f'https://api.github.com/repos/test-org/{name}',
+        'archived': archived, 'permissions': {'admin': admin},
+        'updated_at': '2020-01-01T00:00:00Z', 'pushed_at': None,
+        'description': 'not needed',
+    }
+
+
+class TestRestStateLoader(unittest.TestCase):
+
+    def test_only_admin_repos_built(self):
+
+        # given
+        github = Mock()
+        next_url = 'https://api.github.com/teams/1/repos?page=2'
+        github.requester.requestJsonAndCheck.side_effect = [
+            ({'link': f'<{next_url}>; rel="next"'}, [
+                rest_repo('repo-a'), rest_repo('archived-repo', archived=True)
+            ]),
+            ({}, [rest_repo('pull-repo', admin=False), rest_repo('repo-b')]),
+        ]
+        scheduler = Mock()
+        scheduler.call.side_effect = lambda fn, *args: fn(*args)
+        main_team = Mock()
+        main_team.url = 'https://api.github.com/teams/1'
+        loader = RestStateLoader(
+            github, main_team, scheduler, PermissionCache()
+        )
+
+        # when
+        list(loader.repos())
+
+        # then
+        assert [
+            args[1]['name']
+            for args, _ in github.create_from_raw_data.call_args_list
+        ] == ['repo-a', 'repo-b']
+        assert 'description' not in \
+            github.create_from_raw_data.call_args[0][1]
+        assert github.requester.requestJsonAndCheck.call_args_list == [
+            call('GET', 'https://api.github.com/teams/1/repos',
+                 {'per_page': 100}),
+            call('GET', next_url, None),
+        ]
+
+
+class TestGraphQLStateLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.github = Mock()
+        self.github.create_from_raw_data = Github().create_from_raw_data
+        self.queries = []
+        self.github.requester.graphql_query.side_effect = self.graphql_query
+
+        scheduler = Mock()
+        scheduler.call.side_effect = lambda fn, *args: fn(*args)
+
+        main_team = Mock()
+        main_team.slug = 'test-team'
+        self.loader = GraphQLStateLoader(
+            self.github, 'test-org', main_team, scheduler, PermissionCache()
+        )
+
+    def graphql_query(self, query, variables):
+        self.queries.append(variables)
+        if 'team' not in variables:
+            return {}, {'data': {'organization': {'teams': {
+                'pageInfo': {'hasNextPage': False, 'endCursor': None},
+                'nodes': [
+                    {
+                        'name': 'test-team',
+                        'slug': 'test-team',
+                        'repositories': page([
+                            edge('repo-a', 'ADMIN'),
+                        ], cursor='team-cursor'),
+                    },
+                    {
+                        'name': 'test-push-team',
+                        'slug': 'test-push-team',
+                        'repositories': page([
+                            edge('repo-b', 'WRITE'),
+                            edge('not-admin-repo', 'READ'),
+                        ]),
+                    },
+                ]
+            }}}}
+        if variables['cursor'] is None:
+            repositories = page([
+                edge('repo-a', 'ADMIN'),
+                edge('archived-repo', 'ADMIN', archived=True),
+                edge('read-repo', 'READ'),
+            ], cursor='page-2')
+        else:
+            repositories = page([edge('repo-b', 'ADMIN')])
+        return {}, {'data': {'organization': {'team': {
+            'repositories': repositories
+        }}}}
+
+    def test_repos_and_permissions_loaded_in_bulk(self):
+
+        # when
+        repos = self.loader.repos()
+
+        # then
+        assert [
+            (repo.name, repo.full_name, repo.archived, repo.permissions.admin)
+            for repo in repos
+        ] == [
+            ('repo-a', 'test-org/repo-a', False, True),
+            ('repo-b', 'test-org/repo-b', False, True),
+        ]
+        assert self.loader.teams(repos[0]) == [
+            TeamPermission('test-team', 'admin'),
+        ]
+        assert self.loader.teams(repos[1]) == [
+            TeamPermission('test-team', 'admin'),
+            TeamPermission('test-push-team', 'push'),
+        ]
+        assert len(self.queries) == 4
+
+    def test_repo_objects_usable_for_mutations(self):
+
+        # when
+        repos = self.loader.repos()
+
+        # then
+        assert Repository.as_url_param(repos[0]) == 'test-org/repo-a'
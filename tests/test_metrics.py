@@ -0,0 +1,93 @@
+import io
+import unittest
+
+from github_access.metrics import Metrics, endpoint
+
+
+class TestEndpoint(unittest.TestCase):
+
+    def test_names_replaced(self):
+        assert endpoint('/orgs/test-org/teams?per_page=100') == \
+            '/orgs/{org}/teams'
+        assert endpoint('/repos/test-org/test-repo/teams') == \
+            '/repos/{owner}/{repo}/teams'
+        assert endpoint('/teams/123/repos/test-org/test-repo') == \
+            '/teams/{team}/repos/{owner}/{repo}'
+        assert endpoint('/orgs/test-org/teams/test-team') == \
+            '/orgs/{org}/teams/{team}'
+        assert endpoint('/graphql') == '/graphql'
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.metrics = Metrics(clock=lambda: self.now)
+
+    def test_requests_summarised(self):
+
+        # given
+        self.metrics.record_request(
+            'GET', '/repos/o/a/teams', 200, 0.07,
+            {'x-ratelimit-remaining': '4999'}
+        )
+        self.now = 1.0
+        self.metrics.record_request(
+            'GET', '/repos/o/b/teams', 200, 0.3,
+            {'x-ratelimit-remaining': '4998'}
+        )
+
+        # when
+        summary = self.metrics.summary()
+
+        # then
+        assert summary['requests'] == [{
+            'method': 'GET', 'endpoint': '/repos/{owner}/{repo}/teams',
+            'status': 200, 'count': 2
+        }]
+        assert summary['latency'][0]['buckets']['0.1'] == 1
+        assert summary['latency'][0]['buckets']['0.5'] == 1
+        assert summary['latency'][0]['sum'] == 0.37
+        assert summary['rate_limit_remaining'] == [[0.0, 4999], [1.0, 4998]]
+
+    def test_phases_timed(self):
+
+        # given
+        def pages():
+            self.now += 2.0
+            yield 'repo-a'
+            self.now += 3.0
+
+        # when
+        with self.metrics.phase('team load'):
+            self.now += 1.0
+        items = list(self.metrics.timed_iter('repo listing', pages()))
+
+        # then
+        assert items == ['repo-a']
+        assert self.metrics.summary()['phases'] == {
+            'repo listing': {'seconds': 5.0, 'count': 2},
+            'team load': {'seconds': 1.0, 'count': 1},
+        }
+
+    def test_prometheus(self):
+
+        # given
+        self.metrics.record_request(
+            'PUT', '/teams/1/repos/o/a', 204, 0.2,
+            {'x-ratelimit-remaining': '10'}
+        )
+        f = io.StringIO()
+
+        # when
+        self.metrics.write_prometheus(f)
+
+        # then
+        lines = f.getvalue().splitlines()
+        assert 'github_access_requests_total{method="PUT",' \
+            'endpoint="/teams/{team}/repos/{owner}/{repo}",status="204"} 1' \
+            in lines
+        assert 'github_access_request_duration_seconds_bucket{method="PUT",' \
+            'endpoint="/teams/{team}/repos/{owner}/{repo}",le="+Inf"} 1' \
+            in lines
+        assert 'github_access_rate_limit_remaining 10' in lines
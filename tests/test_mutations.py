@@ -0,0 +1,57 @@
+import unittest
+
+from github_access.mutations import MutationQueue
+from github_access.plan import Change
+
+
+class TestMutationQueue(unittest.TestCase):
+
+    def test_later_change_replaces_earlier(self):
+
+        # given
+        queue = MutationQueue([
+            Change('repo-a', 'team-a', None, 'pull'),
+            Change('repo-a', 'team-a', 'pull', 'push'),
+            Change('repo-b', 'team-a', None, 'pull'),
+        ])
+
+        # then
+        assert list(queue) == [
+            Change('repo-a', 'team-a', None, 'push'),
+            Change('repo-b', 'team-a', None, 'pull'),
+        ]
+
+    def test_changes_that_cancel_out_are_dropped(self):
+
+        # given
+        queue = MutationQueue([
+            Change('repo-a', 'team-a', 'push', None),
+            Change('repo-a', 'team-a', None, 'push'),
+            Change('repo-b', 'team-a', 'pull', 'pull'),
+        ])
+
+        # then
+        assert len(queue) == 0
+        assert queue.stages() == []
+
+    def test_admin_is_granted_before_it_is_revoked(self):
+
+        # given
+        queue = MutationQueue([
+            Change('repo-a', 'team-a', 'admin', None),
+            Change('repo-a', 'team-b', 'push', 'pull'),
+            Change('repo-a', 'team-c', 'push', 'admin'),
+            Change('repo-b', 'team-d', None, 'pull'),
+        ])
+
+        # then
+        assert queue.stages() == [
+            [
+                Change('repo-a', 'team-c', 'push', 'admin'),
+                Change('repo-b', 'team-d', None, 'pull'),
+            ],
+            [
+                Change('repo-a', 'team-a', 'admin', None),
+                Change('repo-a', 'team-b', 'push', 'pull'),
+            ],
+        ]
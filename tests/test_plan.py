@@ -0,0 +1,84 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import ANY, patch
+
+import github_access.github
+from github_access.cli import parse_apply
+from github_access.plan import Change, Plan, read_plan, write_plan
+
+
+class TestPlanFile(unittest.TestCase):
+
+    def test_round_trip(self):
+
+        # given
+        plan = Plan('test-org', 'test-team', [
+            Change('repo-b', 'team-a', 'push', None),
+            Change('repo-a', 'team-a', None, 'pull'),
+        ])
+        f = io.StringIO()
+
+        # when
+        write_plan(f, plan)
+        f.seek(0)
+        result = read_plan(f)
+
+        # then
+        assert result == Plan('test-org', 'test-team', [
+            Change('repo-a', 'team-a', None, 'pull'),
+            Change('repo-b', 'team-a', 'push', None),
+        ])
+
+    def test_format(self):
+
+        # given
+        f = io.StringIO()
+
+        # when
+        write_plan(f, Plan('test-org', 'test-team', [
+            Change('repo-a', 'team-a', 'pull', 'push'),
+        ]))
+
+        # then
+        assert json.loads(f.getvalue()) == {
+            'org': 'test-org',
+            'team': 'test-team',
+            'changes': [
+                {'repo': 'repo-a', 'team': 'team-a', 'from': 'pull',
+                 'to': 'push'},
+            ],
+        }
+
+
+class TestApply(unittest.TestCase):
+
+    @patch('github_access.github.App')
+    def test_engine_arguments(self, App):
+
+        # given
+        changes = [Change('repo-a', 'team-a', None, 'pull')]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'plan.json')
+            with open(path, 'w') as f:
+                write_plan(f, Plan('test-org', 'test-team', changes))
+
+            # when
+            with patch.dict(
+                'github_access.github.os.environ',
+                {'GITHUB_TOKEN': 'test-github-token'}
+            ):
+                github_access.github.apply(parse_apply([
+                    '--plan', path, '--asyncio', '--write-concurrency', '4',
+                    '--write-interval', '0.25'
+                ]), None)
+
+        # then
+        App.assert_called_once_with(
+            'test-org', 'test-team', 'test-github-token', None,
+            concurrency=4, base_url=ANY, use_asyncio=True,
+            write_concurrency=4, write_interval=0.25
+        )
+        App.return_value.apply.assert_called_once_with(changes)
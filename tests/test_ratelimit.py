@@ -0,0 +1,175 @@
+import asyncio
+import unittest
+from unittest.mock import Mock, patch
+
+from github import GithubException, RateLimitExceededException
+
+from github_access.ratelimit import (
+    UNLIMITED, RateLimitScheduler, github_budget
+)
+
+
+class TestRateLimitScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.budget = (5000, 1000.0)
+        self.sleeps = []
+        self.scheduler = RateLimitScheduler(
+            lambda: self.budget, reserve=100,
+            clock=lambda: 0.0, sleep=self.sleeps.append
+        )
+
+    def test_no_delay_with_healthy_budget(self):
+
+        # given
+        fn = Mock(return_value='result')
+
+        # when
+        result = self.scheduler.call(fn, 'arg')
+
+        # then
+        assert result == 'result'
+        fn.assert_called_once_with('arg')
+        assert self.sleeps == []
+
+    def test_spreads_remaining_budget_until_reset(self):
+
+        # given
+        self.budget = (50, 1000.0)
+
+        # when
+        self.scheduler.call(Mock())
+
+        # then
+        assert self.sleeps == [20.0]
+
+    def test_waits_for_reset_when_budget_exhausted(self):
+
+        # given
+        self.budget = (0, 1000.0)
+
+        # when
+        self.scheduler.call(Mock())
+
+        # then
+        assert self.sleeps == [1000.0]
+
+    def test_retries_after_retry_after_header(self):
+
+        # given
+        fn = Mock(side_effect=[
+            GithubException(403, {}, {'retry-after': '60'}),
+            'result'
+        ])
+
+        # when
+        result = self.scheduler.call(fn)
+
+        # then
+        assert result == 'result'
+        assert self.sleeps == [60.0]
+
+    def test_waits_for_reset_on_primary_rate_limit(self):
+
+        # given
+        fn = Mock(side_effect=[
+            RateLimitExceededException(403, {}, {
+                'x-ratelimit-remaining': '0',
+                'x-ratelimit-reset': '500'
+            }),
+            'result'
+        ])
+
+        # when
+        result = self.scheduler.call(fn)
+
+        # then
+        assert result == 'result'
+        assert self.sleeps == [501.0]
+
+    def test_exponential_backoff_without_headers(self):
+
+        # given
+        fn = Mock(side_effect=[
+            GithubException(429, {}, {}),
+            GithubException(429, {}, {}),
+            'result'
+        ])
+
+        # when
+        self.scheduler.call(fn)
+
+        # then
+        assert self.sleeps == [1.0, 2.0]
+
+    def test_other_errors_not_retried(self):
+
+        # given
+        fn = Mock(side_effect=GithubException(404, {}, {}))
+
+        # when / then
+        with self.assertRaises(GithubException):
+            self.scheduler.call(fn)
+        fn.assert_called_once_with()
+
+    def test_writes_spaced_apart(self):
+
+        # given
+        now = [0.0]
+        self.scheduler.clock = lambda: now[0]
+        self.scheduler.sleep = lambda delay: self.sleeps.append(delay)
+
+        # when
+        self.scheduler.call_write(Mock())
+        now[0] = 0.25
+        self.scheduler.call_write(Mock())
+
+        # then
+        assert self.sleeps == [0.75]
+
+    def test_async_calls_spread_remaining_budget(self):
+
+        # given
+        self.budget = (50, 1000.0)
+        waits = []
+
+        async def sleep(delay):
+            waits.append(delay)
+
+        async def fn():
+            pass
+
+        async def calls():
+            await asyncio.gather(*(
+                self.scheduler.call_async(fn) for _ in range(3)
+            ))
+
+        # when
+        with patch('github_access.ratelimit.asyncio.sleep', sleep):
+            asyncio.run(calls())
+
+        # then
+        assert waits == [20.0, 40.0, 60.0]
+
+
+class TestGithubBudget(unittest.TestCase):
+
+    def test_last_reported_budget(self):
+
+        # given
+        github = Mock()
+        github.requester.rate_limiting = (4000, 5000)
+        github.requester.rate_limiting_resettime = 1000
+
+        # then
+        assert github_budget(github)() == (4000, 1000)
+
+    def test_unlimited_until_reported(self):
+
+        # given
+        github = Mock()
+        github.requester.rate_limiting = (-1, -1)
+
+        # then
+        assert github_budget(github)() == (UNLIMITED, 0)
+        github.get_rate_limit.assert_not_called()
@@ -0,0 +1,73 @@
+import io
+import unittest
+
+from github_access.loaders import rest_permission
+from github_access.plan import Change
+from github_access.report import PermissionMatrix, drift, write_rows
+
+
+class TestPermissionMatrix(unittest.TestCase):
+
+    def setUp(self):
+        self.matrix = PermissionMatrix()
+        self.matrix.set('repo-a', 'main-team', 'admin')
+        self.matrix.set('repo-a', 'push-team', 'push')
+        self.matrix.set('repo-b', 'main-team', 'admin')
+        self.matrix.set('repo-c', 'pull-team', 'pull')
+
+    def test_one_byte_per_repo_per_team(self):
+        assert [len(column) for column in self.matrix.columns] == [2, 1, 3]
+        assert self.matrix.get('repo-a', 'push-team') == 'push'
+        assert self.matrix.get('repo-b', 'push-team') is None
+        assert self.matrix.get('repo-c', 'push-team') is None
+        assert self.matrix.get('unknown', 'push-team') is None
+
+    def test_queries(self):
+        assert self.matrix.teams('repo-a') == {
+            'main-team': 'admin', 'push-team': 'push'
+        }
+        assert self.matrix.repos('main-team') == {'repo-a', 'repo-b'}
+        assert self.matrix.repos('push-team', minimum='maintain') == set()
+        assert list(self.matrix.entries()) == [
+            ('repo-a', 'main-team', 'admin'),
+            ('repo-a', 'push-team', 'push'),
+            ('repo-b', 'main-team', 'admin'),
+            ('repo-c', 'pull-team', 'pull'),
+        ]
+
+    def test_drift(self):
+
+        # given
+        access_config = {
+            'repo-a': {'teams': {'push-team': 'maintain'}},
+            'repo-b': {'teams': {'pull-team': 'pull'}},
+        }
+
+        # when
+        changes = list(drift(self.matrix, access_config, 'main-team'))
+
+        # then
+        assert changes == [
+            Change('repo-a', 'push-team', 'push', 'maintain'),
+            Change('repo-b', 'pull-team', None, 'pull'),
+        ]
+
+    def test_write_csv(self):
+
+        # given
+        f = io.StringIO()
+
+        # when
+        write_rows(f, 'csv', ['repo', 'team', 'from', 'to'], [
+            Change('repo-a', 'push-team', 'push', None)
+        ])
+
+        # then
+        assert f.getvalue() == 'repo,team,from,to\nrepo-a,push-team,push,\n'
+
+    def test_rest_permission(self):
+        assert rest_permission({
+            'admin': False, 'maintain': False, 'push': True, 'triage': True,
+            'pull': True
+        }) == 'push'
+        assert rest_permission({}) is None
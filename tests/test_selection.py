@@ -0,0 +1,151 @@
+import unittest
+
+import github_access.github
+from github_access.selection import AccessConfig, RepoMatcher
+from tests.fake_github import FakeGitHub, FakeOrg
+
+
+def matcher(*selectors):
+    result = RepoMatcher()
+    for i, selector in enumerate(selectors):
+        result.add(selector, {'teams': {f'team-{i}': 'pull'}})
+    result.compile()
+    return result
+
+
+def selected_team(matcher, name, topics=()):
+    config = matcher.match(name, lambda: topics)
+    return None if config is None else list(config['teams'])[0]
+
+
+class TestRepoMatcher(unittest.TestCase):
+
+    def test_first_matching_selector_wins(self):
+
+        # given
+        rules = matcher(
+            {'prefix': 'web-admin'}, {'regex': r'web-\d+'},
+            {'glob': 'web-*'}, {'prefix': 'web-'},
+        )
+
+        # then
+        assert selected_team(rules, 'web-admin-ui') == 'team-0'
+        assert selected_team(rules, 'web-42') == 'team-1'
+        assert selected_team(rules, 'web-shop') == 'team-2'
+        assert selected_team(rules, 'api') is None
+
+    def test_earlier_prefix_beats_longer_prefix(self):
+
+        # given
+        rules = matcher({'prefix': 'web'}, {'prefix': 'web-admin'})
+
+        # then
+        assert selected_team(rules, 'web-admin') == 'team-0'
+
+    def test_patterns_match_whole_name(self):
+
+        # given
+        rules = matcher({'regex': 'svc'}, {'glob': 'api-?'})
+
+        # then
+        assert selected_team(rules, 'svc-a') is None
+        assert selected_team(rules, 'api-12') is None
+        assert selected_team(rules, 'api-1') == 'team-1'
+
+    def test_regexes_with_group_references(self):
+
+        # given
+        rules = matcher(
+            {'regex': r'(x)y'}, {'regex': r'(ab)\1'},
+            {'regex': r'(?P<env>dev|prod)-(?P=env)'},
+            {'regex': r'(?P<env>qa)-svc'}, {'prefix': 'abab'},
+        )
+
+        # then
+        assert selected_team(rules, 'abab') == 'team-1'
+        assert selected_team(rules, 'abx') is None
+        assert selected_team(rules, 'dev-dev') == 'team-2'
+        assert selected_team(rules, 'dev-prod') is None
+        assert selected_team(rules, 'qa-svc') == 'team-3'
+        assert selected_team(rules, 'xy') == 'team-0'
+
+    def test_topics_after_names(self):
+
+        # given
+        rules = matcher({'topic': 'frontend'}, {'prefix': 'web-'})
+
+        # then
+        assert selected_team(rules, 'web-shop', ['frontend']) == 'team-1'
+        assert selected_team(rules, 'shop', ['frontend']) == 'team-0'
+        assert selected_team(rules, 'shop', ['backend']) is None
+
+    def test_topics_only_read_with_topic_selectors(self):
+
+        # given
+        rules = matcher({'prefix': 'web-'})
+
+        # when
+        config = rules.match('shop', lambda: self.fail('topics read'))
+
+        # then
+        assert config is None
+
+
+class TestSelectedRepos(unittest.TestCase):
+
+    def setUp(self):
+        self.org = FakeOrg('test-org')
+        main_team = self.org.add_team('Test Team')
+        self.org.add_team('Web Team')
+        self.org.add_team('Frontend Team')
+        for name, topics in [
+            ('web-shop', ()), ('web-blog', ()), ('shop-ui', ('frontend',)),
+            ('listed', ('frontend',)),
+        ]:
+            self.org.add_repo(name, topics=topics)
+            self.org.grant(main_team, name, 'admin')
+        self.access_config = AccessConfig({
+            'listed': {'teams': {}},
+        })
+        self.access_config.matcher.add(
+            {'prefix': 'web-'}, {'teams': {'Web Team': 'push'}}
+        )
+        self.access_config.matcher.add(
+            {'topic': 'frontend'}, {'teams': {'Frontend Team': 'pull'}}
+        )
+        self.access_config.matcher.compile()
+        self.errors = []
+
+    def run_app(self, **kwargs):
+        with FakeGitHub(self.org) as fake:
+            app = github_access.github.App(
+                'test-org', 'Test Team', 'test-github-token',
+                self.errors.append, base_url=fake.url, **kwargs
+            )
+            app.scheduler.write_interval = 0.0
+            app.run(self.access_config)
+
+    def assert_reconciled(self):
+        assert self.errors == []
+        assert self.org.permissions_by_team['web-team'] == {
+            'web-shop': 'push', 'web-blog': 'push'
+        }
+        assert self.org.permissions_by_team['frontend-team'] == {
+            'shop-ui': 'pull'
+        }
+
+    def test_rest(self):
+
+        # when
+        self.run_app()
+
+        # then
+        self.assert_reconciled()
+
+    def test_graphql(self):
+
+        # when
+        self.run_app(graphql=True)
+
+        # then
+        self.assert_reconciled()
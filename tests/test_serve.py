@@ -0,0 +1,211 @@
+import hashlib
+import hmac
+import json
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from unittest.mock import Mock
+
+import requests
+
+import github_access.github
+from github_access.selection import AccessConfig
+from github_access.serve import Reconciler, webhook_handler
+from tests.fake_github import FakeGitHub
+from tests.test_end_to_end import build_org
+
+ORG = {'login': 'test-org'}
+
+
+class TestReconciler(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Mock()
+        self.app.org_name = 'test-org'
+        self.access_config = {'repo-a': {'teams': {}}}
+        self.now = [0.0]
+        self.reconciler = Reconciler(
+            self.app, self.access_config, sweep_interval=60.0,
+            clock=lambda: self.now[0]
+        )
+
+    def test_sweeps_on_start_and_then_periodically(self):
+
+        # when
+        self.reconciler.step(timeout=0)
+        self.reconciler.step(timeout=0)
+        self.now[0] = 60.0
+        self.reconciler.step(timeout=0)
+
+        # then
+        assert self.app.run.call_count == 2
+        self.app.reconcile_repos.assert_not_called()
+
+    def test_repo_events_go_before_sweep(self):
+
+        # given
+        self.reconciler.handle('team_add', {
+            'organization': ORG, 'repository': {'name': 'repo-b'}
+        })
+        self.reconciler.handle('repository', {
+            'organization': ORG, 'repository': {'name': 'repo-a'}
+        })
+
+        # when
+        self.reconciler.step(timeout=0)
+
+        # then
+        self.app.reconcile_repos.assert_called_once_with(
+            self.access_config, ['repo-a', 'repo-b']
+        )
+        self.app.run.assert_not_called()
+
+    def test_ignores_other_events_and_orgs(self):
+
+        # then
+        assert not self.reconciler.handle('push', {
+            'organization': ORG, 'repository': {'name': 'repo-a'}
+        })
+        assert not self.reconciler.handle('repository', {
+            'organization': {'login': 'other-org'},
+            'repository': {'name': 'repo-a'}
+        })
+        assert self.reconciler.repos == set()
+
+    def test_team_event_forgets_teams_and_sweeps(self):
+
+        # given
+        self.reconciler.step(timeout=0)
+        self.reconciler.handle('team', {
+            'organization': ORG, 'action': 'edited', 'team': {'name': 'a'}
+        })
+
+        # when
+        self.reconciler.step(timeout=0)
+
+        # then
+        self.app.forget_teams.assert_called_once_with()
+        assert self.app.run.call_count == 2
+
+    def test_failure_is_reported(self):
+
+        # given
+        self.app.run.side_effect = Exception('test-failure')
+
+        # when
+        self.reconciler.step(timeout=0)
+
+        # then
+        self.app.on_error.assert_called_once_with(
+            'reconciliation failed: test-failure'
+        )
+
+
+class TestWebhookHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.reconciler = Mock()
+        self.reconciler.handle.return_value = True
+        self.server = ThreadingHTTPServer(
+            ('127.0.0.1', 0), webhook_handler(self.reconciler, 'test-secret')
+        )
+        threading.Thread(target=self.server.serve_forever).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/'
+        self.body = json.dumps({'organization': ORG}).encode('utf-8')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def post(self, signature):
+        return requests.post(self.url, data=self.body, headers={
+            'X-GitHub-Event': 'team',
+            'X-Hub-Signature-256': signature,
+        })
+
+    def test_signed_event_is_queued(self):
+
+        # when
+        response = self.post('sha256=' + hmac.new(
+            b'test-secret', self.body, hashlib.sha256
+        ).hexdigest())
+
+        # then
+        assert response.status_code == 202
+        self.reconciler.handle.assert_called_once_with(
+            'team', {'organization': ORG}
+        )
+
+    def test_bad_signature_is_rejected(self):
+
+        # when
+        response = self.post('sha256=0000')
+
+        # then
+        assert response.status_code == 401
+        self.reconciler.handle.assert_not_called()
+
+
+class TestReconcileRepos(unittest.TestCase):
+
+    def test_reads_only_named_repos(self):
+
+        # given
+        org = build_org()
+        access_config = {
+            'repo-0': {'teams': {'Test Push Team': 'push'}},
+            'repo-4': {'teams': {'Test Pull Team': 'pull'}},
+        }
+        errors = []
+
+        # when
+        with FakeGitHub(org) as fake:
+            app = github_access.github.App(
+                'test-org', 'Test Team', 'test-github-token', errors.append,
+                base_url=fake.url
+            )
+            app.scheduler.write_interval = 0.0
+            app.reconcile_repos(access_config, ['repo-4', 'repo-1'])
+
+        # then
+        assert errors == []
+        assert org.permissions_by_repo['repo-4'] == {
+            'test-team': 'admin', 'test-pull-team': 'pull'
+        }
+        assert org.permissions_by_repo['repo-0'] == {
+            'test-team': 'admin', 'test-push-team': 'push',
+            'test-pull-team': 'pull'
+        }
+        assert fake.requests[('GET', r'/repos/([^/]+)/([^/]+)/teams')] == 1
+
+    def test_ignores_selected_repos_without_admin_access(self):
+
+        # given
+        org = build_org()
+        org.add_repo('repo-other')
+        org.grant('test-pull-team', 'repo-other', 'admin')
+        access_config = AccessConfig({
+            'pull-repo': {'teams': {'Test Pull Team': 'pull'}},
+        })
+        access_config.matcher.add(
+            {'prefix': 'repo-'}, {'teams': {'Test Push Team': 'push'}}
+        )
+        access_config.matcher.compile()
+        errors = []
+
+        # when
+        with FakeGitHub(org) as fake:
+            app = github_access.github.App(
+                'test-org', 'Test Team', 'test-github-token', errors.append,
+                base_url=fake.url
+            )
+            app.scheduler.write_interval = 0.0
+            app.reconcile_repos(access_config, ['repo-other', 'pull-repo'])
+
+        # then
+        assert errors == [
+            'team does not have admin access to repo pull-repo'
+        ]
+        assert org.permissions_by_repo['repo-other'] == {
+            'test-pull-team': 'admin'
+        }
@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+import github_access.github
+from github_access.cli import parse_merge, parse_repo_access
+from github_access.shard import Shard, merge, missing_shards
+from tests.fake_github import FakeGitHub
+from tests.test_end_to_end import build_org
+
+
+class TestShard(unittest.TestCase):
+
+    def test_shards_are_disjoint_and_complete(self):
+
+        # given
+        names = [f'repo-{i}' for i in range(1000)]
+        shards = [Shard(i, 4) for i in range(1, 5)]
+
+        # then
+        for name in names:
+            assert sum(name in shard for shard in shards) == 1
+        for shard in shards:
+            assert 200 < sum(name in shard for name in names) < 300
+
+    def test_parse_argument(self):
+
+        # when
+        arguments = parse_repo_access([
+            '--org', 'test-org', '--team', 'test-team', '--access', 'a.json',
+            '--shard', '2/3'
+        ])
+
+        # then
+        assert arguments.shard == Shard(2, 3)
+
+    def test_invalid_argument(self):
+        for value in ['0/3', '4/3', '1', 'a/b']:
+            with self.assertRaises(SystemExit):
+                parse_repo_access([
+                    '--org', 'test-org', '--team', 'test-team',
+                    '--access', 'a.json', '--shard', value
+                ])
+
+    def test_missing_shards(self):
+        assert missing_shards(['1/4', '3/4']) == [Shard(2, 4), Shard(4, 4)]
+
+
+class TestShardedRun(unittest.TestCase):
+
+    def test_shards_reconcile_every_repo_once(self):
+
+        # given
+        org = build_org()
+        access_config = {
+            f'repo-{i}': {'teams': {'Test Push Team': 'push'}}
+            for i in range(4)
+        }
+        access_config['repo-4'] = {'teams': {'Test Pull Team': 'pull'}}
+        access_config['unknown-repo'] = {'teams': {}}
+        errors = []
+
+        # when
+        with FakeGitHub(org) as fake:
+            for shard in [Shard(1, 2), Shard(2, 2)]:
+                app = github_access.github.App(
+                    'test-org', 'Test Team', 'test-github-token',
+                    errors.append, base_url=fake.url, shard=shard
+                )
+                app.scheduler.write_interval = 0.0
+                app.run(access_config)
+
+        # then
+        assert errors == [
+            'config contained repo unknown-repo, but team does not have '
+            'admin access'
+        ]
+        assert org.permissions_by_repo['repo-0'] == {
+            'test-team': 'admin', 'test-push-team': 'push'
+        }
+        assert org.permissions_by_repo['repo-4'] == {
+            'test-team': 'admin', 'test-pull-team': 'pull'
+        }
+        assert fake.requests[('GET', r'/repos/([^/]+)/([^/]+)/teams')] == 5
+
+
+class TestMerge(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_result(self, shard, changes, errors):
+        path = os.path.join(self.directory.name, f'{shard[0]}.json')
+        with open(path, 'w') as f:
+            json.dump({
+                'shard': shard, 'changes': changes, 'requests': 10,
+                'errors': errors,
+            }, f)
+        return path
+
+    def test_combines_results(self):
+
+        # given
+        results = [
+            self.write_result('1/3', 2, ['error-a']),
+            self.write_result('3/3', 1, ['error-b']),
+        ]
+        out = os.path.join(self.directory.name, 'merged.json')
+        handle_error = Mock()
+
+        # when
+        merge(parse_merge(results + ['--out', out]), handle_error)
+
+        # then
+        assert [call[0][0] for call in handle_error.call_args_list] == [
+            'no result for shard 2/3', 'error-a', 'error-b'
+        ]
+        with open(out, 'r') as f:
+            assert json.loads(f.read()) == {
+                'shards': ['1/3', '3/3'], 'changes': 3, 'requests': 20,
+                'errors': ['error-a', 'error-b'],
+            }
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import Mock
+
+from github_access.snapshot import Snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'snapshot.json')
+
+        self.repo = Mock()
+        self.repo.name = 'test-repo'
+        self.repo.updated_at = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        self.repo.pushed_at = datetime(2020, 1, 2, tzinfo=timezone.utc)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_missing_file_is_empty(self):
+        assert Snapshot.load(self.path).repos == {}
+
+    def test_round_trip(self):
+
+        # given
+        repo_access_config = {'teams': {'test-push-team': 'push'}}
+        snapshot = Snapshot()
+        snapshot.update(self.repo, repo_access_config, True)
+
+        # when
+        snapshot.save(self.path)
+        loaded = Snapshot.load(self.path)
+
+        # then
+        assert loaded.is_current(self.repo, repo_access_config)
+        assert not loaded.is_current(self.repo, {'teams': {}})
+
+    def test_retain_drops_other_repos(self):
+
+        # given
+        snapshot = Snapshot()
+        snapshot.update(self.repo, {'teams': {}}, True)
+
+        # when
+        snapshot.retain(['other-repo'])
+
+        # then
+        assert snapshot.repos == {}
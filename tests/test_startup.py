@@ -0,0 +1,97 @@
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# The most the entry point's own imports may take before it parses the
+# command line, in microseconds. Importing PyGithub alone takes ~250ms.
+IMPORT_BUDGET = 50000
+
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+def imports(*args):
+    '''
+    Runs python with -X importtime, returning the cumulative import time of
+    each top level import and the name of every module imported.
+    '''
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', *args],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True
+    )
+    matches = [
+        IMPORT_TIME.match(line) for line in result.stderr.splitlines()
+    ]
+    matches = [match for match in matches if match is not None]
+    return {
+        match.group(4): int(match.group(2))
+        for match in matches if not match.group(3)
+    }, {match.group(4) for match in matches}
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_bad_arguments_do_not_import_github(self):
+
+        # when
+        _, modules = imports('-m', 'github_access', '--org', 'test-org')
+
+        # then
+        assert 'github_access.cli' in modules
+        assert 'github' not in modules
+        assert 'requests' not in modules
+
+    def test_bad_access_file_does_not_import_github(self):
+
+        # given
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'access.json')
+            with open(path, 'w') as f:
+                f.write('[{"teams": {"team-a": "write"}, "repos": ["a"]}]')
+
+            # when
+            _, modules = imports(
+                '-m', 'github_access', '--org', 'test-org', '--team',
+                'test-team', '--access', path
+            )
+
+        # then
+        assert 'github_access.access' in modules
+        assert 'github' not in modules
+
+    def test_validate_does_not_import_github(self):
+
+        # given
+        with tempfile.TemporaryDirectory() as directory:
+            access = os.path.join(directory, 'access.json')
+            with open(access, 'w') as f:
+                f.write('[{"teams": {"team-a": "pull"}, "repos": ["a"]}]')
+            teams_cache = os.path.join(directory, 'teams.json')
+            with open(teams_cache, 'w') as f:
+                f.write('{"_listed": {"test-org": 0}, "test-org": {}}')
+
+            # when
+            _, modules = imports(
+                '-m', 'github_access', 'validate', access, '--org',
+                'test-org', '--teams-cache', teams_cache
+            )
+
+        # then
+        assert 'github_access.team_cache' in modules
+        assert 'github' not in modules
+        assert 'requests' not in modules
+
+    def test_import_time_budget(self):
+
+        # when
+        times, _ = imports('-c', 'import github_access.cli')
+
+        # then
+        own = sum(
+            time for name, time in times.items()
+            if name.startswith('github_access')
+        )
+        assert own < IMPORT_BUDGET, f'imports took {own}us'
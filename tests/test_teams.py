@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, Mock
+
+from github import UnknownObjectException
+
+from github_access.metrics import Metrics
+from github_access.ratelimit import RateLimitScheduler
+from github_access.team_cache import TeamCache
+from github_access.teams import TeamDirectory, slug
+
+
+def team(name, team_slug, team_id=1):
+    team = Mock()
+    team.name = name
+    team.slug = team_slug
+    team.id = team_id
+    team.url = f'https://api.github.com/teams/{team_id}'
+    return team
+
+
+class TestTeamDirectory(unittest.TestCase):
+
+    def setUp(self):
+        self.org = Mock()
+        self.org.login = 'test-org'
+        self.org.url = 'https://api.github.com/orgs/test-org'
+        self.github = Mock()
+        self.scheduler = RateLimitScheduler(lambda: (5000, 0.0))
+
+    def directory(self, cache=None):
+        return TeamDirectory(
+            self.github, self.org, self.scheduler, Metrics(), cache
+        )
+
+    def test_resolves_by_slug(self):
+
+        # given
+        self.org.get_team_by_slug.return_value = team('My Team', 'my-team')
+
+        # when
+        found = self.directory().get('My Team')
+
+        # then
+        assert found.name == 'My Team'
+        self.org.get_team_by_slug.assert_called_once_with('my-team')
+        self.org.get_teams.assert_not_called()
+
+    def test_lists_teams_when_slug_differs(self):
+
+        # given
+        self.org.get_team_by_slug.side_effect = UnknownObjectException(
+            404, {}, {}
+        )
+        self.org.get_teams.return_value = [
+            team('Team.Dots', 'team-dots-1', 1), team('Other', 'other', 2)
+        ]
+        directory = self.directory()
+
+        # when
+        found = directory.get('Team.Dots')
+
+        # then
+        assert found.slug == 'team-dots-1'
+        assert 'Other' in directory
+        assert 'Missing' not in directory
+        self.org.get_teams.assert_called_once_with()
+        self.org.get_team_by_slug.assert_called_once_with('team-dots')
+
+    def test_cache_reused_until_expired(self):
+
+        # given
+        self.org.get_team_by_slug.return_value = team('My Team', 'my-team')
+        now = [1000.0]
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, 'teams.json')
+            self.directory(TeamCache(path, clock=lambda: now[0])).get(
+                'My Team'
+            )
+            self.github.create_from_raw_data = MagicMock()
+
+            # when
+            self.directory(TeamCache(path, clock=lambda: now[0])).get(
+                'My Team'
+            )
+            now[0] += 7200
+            self.directory(TeamCache(path, clock=lambda: now[0])).get(
+                'My Team'
+            )
+
+        # then
+        assert self.org.get_team_by_slug.call_count == 2
+        raw = self.github.create_from_raw_data.call_args[0][1]
+        assert raw == {
+            'id': 1, 'name': 'My Team', 'slug': 'my-team',
+            'url': 'https://api.github.com/teams/1',
+            'organization': {
+                'login': 'test-org',
+                'url': 'https://api.github.com/orgs/test-org',
+            },
+        }
+
+    def test_cache_records_full_listing(self):
+
+        # given
+        self.org.get_team_by_slug.return_value = team('My Team', 'my-team')
+        self.org.get_teams.return_value = [
+            team('My Team', 'my-team', 1), team('Other', 'other', 2)
+        ]
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, 'teams.json')
+            directory = self.directory(TeamCache(path))
+
+            # when
+            directory.get('My Team')
+            looked_up = TeamCache(path).known_teams('test-org')
+            directory.all()
+            listed = TeamCache(path).known_teams('test-org')
+
+        # then
+        assert looked_up is None
+        assert listed == {'My Team', 'my-team', 'Other', 'other'}
+
+    def test_slug(self):
+        assert slug('Platform Team (EU)') == 'platform-team-eu'
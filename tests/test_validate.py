@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from github_access.cli import parse_validate
+from github_access.validate import validate
+
+
+class TestValidate(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.handle_error = Mock()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def write_access(self, name, teams):
+        return self.write(name, json.dumps([
+            {'teams': teams, 'repos': [f'{name}-repo']}
+        ]))
+
+    def test_reports_problems_in_file_order(self):
+
+        # given
+        valid = self.write_access('valid', {'team-a': 'pull'})
+        invalid = self.write('invalid', '[{"teams": {"team-a": "write"}}]')
+        missing = os.path.join(self.directory.name, 'missing')
+
+        # when
+        validate(parse_validate([
+            valid, invalid, missing, '--concurrency', '2'
+        ]), self.handle_error)
+
+        # then
+        assert [
+            call[0][0] for call in self.handle_error.call_args_list
+        ] == [
+            f'{invalid}:1:23: unknown permission write for team team-a',
+            f'{missing}: No such file or directory',
+        ]
+
+    def test_unknown_teams(self):
+
+        # given
+        access = self.write_access('access', {
+            'Team A': 'pull', 'team-b': 'push', 'team-c': 'push'
+        })
+        teams_cache = self.write('teams.json', json.dumps({
+            '_listed': {'test-org': 0},
+            'test-org': {
+                'Team A': {'time': 0, 'team': {
+                    'id': 1, 'name': 'Team A', 'slug': 'team-a', 'url': ''
+                }},
+                'Team B': {'time': 0, 'team': {
+                    'id': 2, 'name': 'Team B', 'slug': 'team-b', 'url': ''
+                }},
+            }
+        }))
+
+        # when
+        validate(parse_validate([
+            access, '--team', 'main-team', '--org', 'test-org',
+            '--teams-cache', teams_cache
+        ]), self.handle_error)
+
+        # then
+        self.handle_error.assert_called_once_with(
+            f'{access}: unknown team team-c'
+        )
+
+    def test_rejects_teams_cache_without_listing(self):
+
+        # given
+        access = self.write_access('access', {'Team A': 'pull'})
+        teams_cache = self.write('teams.json', json.dumps({
+            'test-org': {
+                'Team A': {'time': 0, 'team': {
+                    'id': 1, 'name': 'Team A', 'slug': 'team-a', 'url': ''
+                }},
+            }
+        }))
+
+        # when
+        with self.assertRaises(Exception) as context:
+            validate(parse_validate([
+                access, '--team', 'main-team', '--org', 'test-org',
+                '--teams-cache', teams_cache
+            ]), self.handle_error)
+
+        # then
+        assert str(context.exception) == (
+            f'teams cache {teams_cache} has not listed every team in org '
+            'test-org'
+        )
+        self.handle_error.assert_not_called()